@@ -0,0 +1,608 @@
+"""Headless benchmarks for the renderer and the rules.
+
+Runs under the SDL dummy video and audio drivers, so no display is needed:
+
+    python benchmarks/bench.py                     # print results
+    python benchmarks/bench.py --json results.json # also write them as JSON
+    python benchmarks/bench.py --save-baseline     # store benchmarks/baseline.json
+    python benchmarks/bench.py --compare           # flag regressions against it
+    python benchmarks/bench.py -k draw_            # only benchmarks matching 'draw_'
+
+Every benchmark reports the median and best time per call over several
+repeats. --compare exits with status 1 if any median is slower than the
+baseline by more than --threshold.
+"""
+
+import os
+import sys
+import tempfile
+
+# Must be set before pygame is imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+# Keep autosaves made by main.py out of the real save directory
+os.environ['LUDO_SAVE_DIR'] = tempfile.mkdtemp(prefix='ludo-bench-')
+
+import argparse
+import itertools
+import json
+import platform
+import random
+import statistics
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+
+import main
+from ludo import ai, board, dice, engine, events, history, packed, persistence, tablebase
+from ludo.ui import board_view, thumbnails
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+BENCHMARKS = {}
+# Six arms twice the classic length with six tokens each, for the cost of bigger variants
+LARGE_BOARD = board.make_board(12, 6, 6)
+
+
+def benchmark(name):
+    """Register a setup function that returns the callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def measure(fn, repeat=5, min_time=0.05):
+    """Returns (median, best) seconds per call."""
+    # Calibrate the loop count so one repeat takes at least min_time
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - start) / loops)
+    return statistics.median(timings), min(timings)
+
+
+# --- Synthetic positions ---
+def random_position(rng, num_players=4, game_board=board.CLASSIC):
+    path_indices = []
+    for _ in range(num_players):
+        indices = []
+        for _ in range(game_board.tokens_per_player):
+            roll = rng.random()
+            if roll < 0.2:
+                indices.append(engine.IN_YARD)
+            elif roll < 0.25:
+                indices.append(game_board.path_length)
+            else:
+                indices.append(rng.randrange(game_board.path_length))
+        path_indices.append(indices)
+    return engine.GameState(num_players, rng.randrange(num_players), path_indices, board=game_board)
+
+
+def dense_kill_position(rng, num_players=4, dice_roll=3):
+    """Mid-game position where the mover's token 0 lands on an unsafe square
+    holding a token of every opponent."""
+    index_of = [{square: i for i, square in enumerate(path)} for path in board.PATH_SQUARES]
+    while True:
+        state = random_position(rng, num_players)
+        mover = state.current_player
+        start = rng.randrange(board.PATH_LENGTH - 6 - dice_roll)
+        target = board.PATH_SQUARES[mover][start + dice_roll]
+        if target in board.SAFE_SQUARES:
+            continue
+        if any(target not in index_of[opp] for opp in range(num_players) if opp != mover):
+            continue
+        path_indices = [list(indices) for indices in state.path_indices]
+        path_indices[mover][0] = start
+        for opp in range(num_players):
+            if opp != mover:
+                path_indices[opp][0] = index_of[opp][target]
+        return engine.GameState(num_players, mover, path_indices)
+
+
+def legal_moves(states, rng):
+    moves = []
+    for state in states:
+        for dice_roll in range(1, 7):
+            movable = engine.movable_tokens(state, state.current_player, dice_roll)
+            if movable:
+                moves.append((state, rng.choice(movable), dice_roll))
+    return moves
+
+
+def setup_game(num_players=4, seed=1, game_board=board.CLASSIC):
+    if main.game_board is not game_board:
+        # Sprites of the old board's tokens would linger
+        for key in list(main.token_sprites.tokens):
+            main.token_sprites.remove_token(key)
+        main.game_board = game_board
+    main.resize_window(main.BASE_WIDTH, main.BASE_HEIGHT)
+    main.num_players = num_players
+    main.players[:] = [{'name': f"Player {i + 1}", 'color': main.PLAYER_COLORS[i]} for i in range(num_players)]
+    main.initialize_tokens()
+    main.state = random_position(random.Random(seed), num_players, game_board)
+    main.invalidate_board_layer()
+
+
+# --- Renderer ---
+@benchmark('draw_board')
+def bench_draw_board():
+    setup_game()
+    return main.draw_board
+
+
+@benchmark('update_board_idle')
+def bench_update_board_idle():
+    setup_game()
+    main.update_board()
+    return main.update_board
+
+
+@benchmark('update_board_token_moved')
+def bench_update_board_token_moved(game_board=board.CLASSIC):
+    setup_game(game_board.max_players, game_board=game_board)
+    main.update_board()
+    indices = main.state.path_indices[0]
+    def frame():
+        # Move one token back and forth so every frame has a dirty token
+        indices[1] = 10 if indices[1] != 10 else 11
+        main.update_board()
+    return frame
+
+
+@benchmark('draw_static_board')
+def bench_draw_static_board(game_board=board.CLASSIC):
+    setup_game(game_board.max_players, game_board=game_board)
+    return lambda: main.draw_static_board(main.screen)
+
+
+@benchmark('draw_static_board_large')
+def bench_draw_static_board_large():
+    return bench_draw_static_board(LARGE_BOARD)
+
+
+@benchmark('update_board_token_moved_large')
+def bench_update_board_token_moved_large():
+    return bench_update_board_token_moved(LARGE_BOARD)
+
+
+@benchmark('draw_token_area')
+def bench_draw_token_area():
+    setup_game()
+    return lambda: main.draw_token_area(main.screen, main.GREEN, 0, 0, player_id=0)
+
+
+@benchmark('draw_tile')
+def bench_draw_tile():
+    return lambda: main.draw_tile(main.screen, 7, 2, main.YELLOW, safe=True)
+
+
+@benchmark('draw_cross_paths')
+def bench_draw_cross_paths():
+    return lambda: main.draw_cross_paths(main.screen)
+
+
+@benchmark('draw_colored_left_tiles')
+def bench_draw_colored_left_tiles():
+    return lambda: main.draw_colored_left_tiles(main.screen)
+
+
+@benchmark('draw_center')
+def bench_draw_center():
+    return lambda: main.draw_center(main.screen)
+
+
+@benchmark('draw_tokens')
+def bench_draw_tokens():
+    setup_game()
+    return lambda: main.draw_tokens(main.screen)
+
+
+@benchmark('draw_dice')
+def bench_draw_dice():
+    return lambda: main.draw_dice(main.screen, 6, main.GREEN)
+
+
+@benchmark('draw_roll_button')
+def bench_draw_roll_button():
+    return lambda: main.draw_roll_button(main.screen, main.GREEN)
+
+
+@benchmark('draw_control_buttons')
+def bench_draw_control_buttons():
+    return lambda: main.draw_control_buttons(main.screen)
+
+
+@benchmark('draw_message')
+def bench_draw_message():
+    return lambda: main.draw_message(main.screen, "Player 1 killed Player 2!", main.GREEN)
+
+
+@benchmark('setup_screen_frame')
+def bench_setup_screen_frame():
+    num_box = main.InputBox(main.WIDTH // 2 - 70, main.HEIGHT // 2 + 60, 140, 55, '4')
+    return lambda: main.draw_setup_screen(main.screen, 1, num_box, True)
+
+
+@benchmark('resize_cached_sizes')
+def bench_resize_cached_sizes():
+    setup_game()
+    sizes = itertools.cycle(((1280, 720), (1920, 1080)))
+    def frame():
+        main.resize_window(*next(sizes))
+        main.draw_board()
+    return frame
+
+
+@benchmark('resize_drag_1080p')
+def bench_resize_drag():
+    setup_game()
+    # Every call is a size not seen before, like each step of a window drag
+    widths = itertools.count(1920)
+    def frame():
+        main.resize_window(next(widths), 1080)
+        main.draw_board()
+    return frame
+
+
+# --- Board and rules ---
+@benchmark('build_board')
+def bench_build_board():
+    # Uncached, as make_board() does once per spec
+    return lambda: board.Board(board.BoardSpec(6, 4, 4))
+
+
+@benchmark('build_rules')
+def bench_build_rules():
+    return lambda: engine.Rules(board.CLASSIC)
+
+
+def bench_moves(moves):
+    def run():
+        for state, token_id, dice_roll in moves:
+            engine.apply_move(state.copy(), state.current_player, token_id, dice_roll)
+    return run
+
+
+@benchmark('state_copy_x1000')
+def bench_state_copy():
+    states = [random_position(random.Random(i)) for i in range(1000)]
+    def run():
+        for state in states:
+            state.copy()
+    return run
+
+
+@benchmark('apply_move_x1000')
+def bench_apply_move(game_board=board.CLASSIC):
+    rng = random.Random(2)
+    moves = legal_moves([random_position(rng, 4, game_board) for _ in range(400)], rng)[:1000]
+    return bench_moves(moves)
+
+
+@benchmark('apply_move_large_x1000')
+def bench_apply_move_large():
+    return bench_apply_move(LARGE_BOARD)
+
+
+@benchmark('apply_move_dense_kills_x1000')
+def bench_apply_move_dense_kills():
+    rng = random.Random(3)
+    moves = [(state, 0, 3) for state in (dense_kill_position(rng) for _ in range(1000))]
+    return bench_moves(moves)
+
+
+@benchmark('move_token_x1000')
+def bench_move_token():
+    # main.move_token, including event handling and the autosave journal
+    setup_game()
+    rng = random.Random(4)
+    moves = legal_moves([random_position(rng) for _ in range(400)], rng)[:1000]
+    def run():
+        for state, token_id, dice_roll in moves:
+            main.state = state.copy()
+            main.move_token(state.current_player, token_id, dice_roll)
+    return run
+
+
+@benchmark('can_move_any_token_x1000')
+def bench_can_move_any_token():
+    rng = random.Random(5)
+    positions = [(random_position(rng), rng.randint(1, 6)) for _ in range(1000)]
+    def run():
+        for state, dice_roll in positions:
+            main.state = state
+            main.can_move_any_token(state.current_player, dice_roll)
+    return run
+
+
+@benchmark('movable_tokens_x1000')
+def bench_movable_tokens(game_board=board.CLASSIC):
+    rng = random.Random(6)
+    positions = [(random_position(rng, 4, game_board), rng.randint(1, 6)) for _ in range(1000)]
+    def run():
+        for state, dice_roll in positions:
+            engine.movable_tokens(state, state.current_player, dice_roll)
+    return run
+
+
+@benchmark('movable_tokens_large_x1000')
+def bench_movable_tokens_large():
+    return bench_movable_tokens(LARGE_BOARD)
+
+
+@benchmark('pack_x1000')
+def bench_pack():
+    states = [random_position(random.Random(i)) for i in range(1000)]
+    def run():
+        for state in states:
+            packed.pack(state)
+    return run
+
+
+def game_keys(count, seed=0):
+    # Keys of consecutive positions of random games, as history jumps decode them
+    rng = random.Random(seed)
+    keys = []
+    state = engine.new_game(4)
+    while len(keys) < count:
+        if state.winner is not None:
+            state = engine.new_game(4)
+        dice_roll = rng.randint(1, 6)
+        movable = engine.movable_tokens(state, state.current_player, dice_roll)
+        if movable:
+            engine.apply_move(state, state.current_player, rng.choice(movable), dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+        keys.append(packed.pack(state))
+    return keys
+
+
+@benchmark('unpack_x1000')
+def bench_unpack():
+    keys = game_keys(1000)
+    def run():
+        for key in keys:
+            packed.unpack(key)
+    return run
+
+
+@benchmark('unpack_into_x1000')
+def bench_unpack_into():
+    # The same keys decoded into one reused state
+    keys = game_keys(1000)
+    state = packed.unpack(keys[-1])
+    def run():
+        for key in keys:
+            packed.unpack(key, into=state)
+    return run
+
+
+def history_game(moves, rng):
+    # A game of random moves and its history; a won game is taken back a few moves
+    state = engine.new_game(4)
+    game = history.History(state)
+    while game.size <= moves:
+        if state.winner is not None:
+            for _ in range(8):
+                game.undo(state)
+        player_id, dice_roll = state.current_player, rng.randint(1, 6)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if movable:
+            token_id = rng.choice(movable)
+            engine.apply_move(state, player_id, token_id, dice_roll)
+            game.record(state, persistence.MOVE, player_id, token_id, dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+            game.record(state, persistence.PASS, player_id, 0, dice_roll)
+    return state, game
+
+
+@benchmark('history_undo_redo_x1000')
+def bench_history_undo_redo():
+    # 500 moves back and forward again
+    state, game = history_game(500, random.Random(14))
+    def run():
+        for _ in range(500):
+            game.undo(state)
+        for _ in range(500):
+            game.redo(state)
+    return run
+
+
+@benchmark('history_goto_x1000')
+def bench_history_goto():
+    # Jumps between random positions of one game
+    state, game = history_game(1000, random.Random(15))
+    nodes = []
+    node = game.node
+    while node is not None:
+        nodes.append(node)
+        node = node.parent
+    random.Random(16).shuffle(nodes)
+    def run():
+        for node in nodes[:1000]:
+            game.goto(node, state)
+    return run
+
+
+@benchmark('tablebase_probe_x1000')
+def bench_tablebase_probe():
+    # Win chances and best move of late positions; lookups cost the same on
+    # any table size, so a small one is generated
+    arm_length, tokens = 6, 2
+    path = tablebase.default_tablebase_path(arm_length, tokens)
+    tablebase.generate(path, arm_length, tokens, workers=1)
+    table = tablebase.Tablebase(path)
+    game_board = board.make_board(arm_length, 4, tokens)
+    rng = random.Random(10)
+    finished = game_board.path_length
+    positions = [(engine.GameState(2, rng.randrange(2), [[finished - rng.randint(1, arm_length) for _ in range(tokens)]
+                                                         for _ in range(2)], board=game_board), rng.randint(1, 6))
+                 for _ in range(1000)]
+    def run():
+        for state, dice_roll in positions:
+            table.win_rates(state)
+            table.best_move(state, dice_roll)
+    return run
+
+
+# --- Thumbnails ---
+@benchmark('thumbnail_render_x100')
+def bench_thumbnail_render():
+    # Stamping tokens on the cached board layer, without the PNG encoding
+    view = board_view.BoardView()
+    states = ai.random_positions(random.Random(12), 100)
+    surface = pygame.Surface((128, 128))
+    def run():
+        for state in states:
+            view.render(state, (128, 128), surface=surface)
+    return run
+
+
+@benchmark('thumbnail_png_x10')
+def bench_thumbnail_png():
+    surface = board_view.BoardView().render(ai.random_positions(random.Random(13), 1)[0], (128, 128))
+    def run():
+        for _ in range(10):
+            thumbnails.encode_png(surface)
+    return run
+
+
+# --- Event export ---
+@benchmark('events_turn_x1000')
+def bench_events_turn():
+    # What exporting adds to a game's turns; the writer thread formats and writes them
+    log = events.EventLog(os.path.join(os.environ['LUDO_SAVE_DIR'], 'events'), prefix='bench')
+    state = engine.new_game(4)
+    rng = random.Random(11)
+    turns = []
+    for _ in range(1000):
+        player_id = state.current_player
+        dice_roll = rng.randint(1, 6)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if state.winner is None and movable:
+            result = engine.apply_move(state, player_id, rng.choice(movable), dice_roll)
+        else:
+            result = engine.pass_turn(state, dice_roll)
+        turns.append((player_id, dice_roll, result))
+    def run():
+        game = events.GameEvents(log, 'bench')
+        for player_id, dice_roll, result in turns:
+            game.turn(player_id, dice_roll, result)
+    return run
+
+
+# --- Dice ---
+@benchmark('dice_roll_x1000')
+def bench_dice_roll():
+    # Per-player rolls as the game and simulations draw them
+    game_dice = dice.GameDice(8)
+    def run():
+        for turn in range(1000):
+            game_dice.roll(turn & 3)
+    return run
+
+
+@benchmark('dice_rolls_bulk_x100000')
+def bench_dice_rolls_bulk():
+    stream = dice.DiceStream(9)
+    return lambda: stream.rolls(100000)
+
+
+@benchmark('ai_search_depth2')
+def bench_ai_search():
+    # Fresh table each call so every search does the full work
+    rng = random.Random(7)
+    state = legal_moves([random_position(rng)], rng)[0][0]
+    dice_roll = next(d for d in range(1, 7) if len(engine.movable_tokens(state, state.current_player, d)) > 1)
+    return lambda: ai.Searcher(budget=None, max_depth=2).choose(state, state.current_player, dice_roll)
+
+
+def run_benchmarks(pattern=None, repeat=5, min_time=0.05):
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern and pattern not in name:
+            continue
+        median, best = measure(setup(), repeat, min_time)
+        results[name] = {'median_us': median * 1e6, 'best_us': best * 1e6}
+        print(f"{name:<32} {median * 1e6:12.1f} us  (best {best * 1e6:.1f})", flush=True)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'video_driver': os.environ['SDL_VIDEODRIVER'],
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Returns the names of benchmarks slower than baseline by more than threshold."""
+    regressions = []
+    print(f"\n{'benchmark':<32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f"{name:<32} {'-':>12} {result['median_us']:12.1f}      new")
+            continue
+        change = result['median_us'] / base['median_us'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"{name:<32} {base['median_us']:12.1f} {result['median_us']:12.1f} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Headless Ludo benchmarks")
+    parser.add_argument('-k', dest='pattern', help="only run benchmarks whose name contains this")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05, help="seconds per repeat")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="store the results as the baseline")
+    parser.add_argument('--compare', action='store_true', help="compare against the baseline")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="slowdown counted as a regression (default 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    main.init_display()
+    results = run_benchmarks(args.pattern, args.repeat, args.min_time)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+    if args.compare:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+        print("\nno regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main_cli())
@@ -0,0 +1,4 @@
+"""Ludo rules and tools that run without pygame."""
+
+from .engine import (GameState, IllegalMoveError, new_game, apply_move, pass_turn,
+                     can_move_token, can_move_any_token, movable_tokens, movable_mask)
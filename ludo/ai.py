@@ -0,0 +1,294 @@
+"""Computer opponent: expectiminimax search over dice rolls.
+
+Decision nodes (a player with a known roll picks a token) alternate with
+chance nodes (the next roll, averaged over 1-6). Moves are played with
+ludo.engine, so the search follows the real rules: a 6 keeps the turn, tokens
+must land exactly on the last square and captures never happen on safe
+squares. The search plays and takes back moves on one copy of the position
+(engine.undo_move()), so no node copies the token lists.
+
+Every node scores all players; the player to move picks the token that
+maximises its own score minus the best opponent's. Values are cached in a
+transposition table keyed by the packed position (see ludo.packed), which is
+exact, so two positions never share an entry; decision nodes put the dice
+roll above the position's fields. The root is searched with iterative
+deepening until the time budget runs out, and the move from the deepest
+completed iteration is played.
+
+Usage:
+    python -m ludo.ai --positions 100 --budget 0.05
+"""
+
+import argparse
+import random
+import time
+
+from . import engine
+from .packed import pack, packing_for
+
+DEFAULT_BUDGET = 0.05
+MAX_DEPTH = 12
+# The table is cleared once it holds this many entries
+TABLE_SIZE = 1 << 18
+# How many nodes to search between clock checks; a 4-player node can take
+# tens of microseconds, so this keeps the overrun well under a millisecond
+CHECK_EVERY = 16
+# No deeper iteration is started once this share of the budget is used: it
+# would take several times longer than all the previous ones together and be
+# cut off unfinished
+ITERATION_CUTOFF = 0.5
+
+WIN_SCORE = 10000
+ENTER_BONUS = 10
+FINISH_BONUS = 20
+
+
+def evaluate(state):
+    """Heuristic score of every player."""
+    if state.winner is not None:
+        return tuple(WIN_SCORE if player_id == state.winner else 0 for player_id in range(state.num_players))
+    finished = state.rules.finished
+    scores = []
+    for indices in state.path_indices:
+        score = 0
+        for index in indices:
+            if index == finished:
+                score += ENTER_BONUS + finished + FINISH_BONUS
+            elif index != engine.IN_YARD:
+                score += ENTER_BONUS + index
+        scores.append(score)
+    return tuple(scores)
+
+
+def relative(scores, player_id):
+    # A player's score against its strongest opponent
+    return scores[player_id] - max(score for i, score in enumerate(scores) if i != player_id)
+
+
+def distinct_moves(state, player_id, dice_roll):
+    """Movable tokens of player_id, one per path index.
+
+    Tokens on the same path index lead to the same position, so only the
+    first of them is worth trying.
+    """
+    indices = state.path_indices[player_id]
+    seen = set()
+    candidates = []
+    for token_id in engine.movable_tokens(state, player_id, dice_roll):
+        if indices[token_id] not in seen:
+            seen.add(indices[token_id])
+            candidates.append(token_id)
+    return candidates
+
+
+class TimeUp(Exception):
+    pass
+
+
+class SearchResult:
+    __slots__ = ('token', 'depth', 'nodes', 'probes', 'hits', 'elapsed')
+
+    def __init__(self, token, depth, nodes, probes, hits, elapsed):
+        self.token = token
+        self.depth = depth
+        self.nodes = nodes
+        self.probes = probes
+        self.hits = hits
+        self.elapsed = elapsed
+
+    @property
+    def nodes_per_sec(self):
+        return self.nodes / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def __repr__(self):
+        return (f"SearchResult(token={self.token}, depth={self.depth}, nodes={self.nodes}, "
+                f"nodes_per_sec={self.nodes_per_sec:.0f}, hit_rate={self.hit_rate:.2f})")
+
+
+class Searcher:
+    """Expectiminimax with a transposition table kept between moves.
+
+    budget is the wall-clock time per move in seconds; None searches every
+    depth up to max_depth, which makes the choice deterministic. Positions a
+    tablebase (see ludo.tablebase) covers are looked up there instead.
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, max_depth=MAX_DEPTH, table_size=TABLE_SIZE, tablebase=None):
+        self.budget = budget
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.tablebase = tablebase
+        # key -> (depth, scores)
+        self.table = {}
+        self.deadline = None
+        self.nodes = self.probes = self.hits = 0
+
+    def choose(self, state, player_id, dice_roll):
+        """Pick a token for player_id to move by dice_roll. Returns a SearchResult.
+
+        The token is None if no move is legal. state is not modified.
+        """
+        start = time.perf_counter()
+        self.deadline = None if self.budget is None else start + self.budget
+        self.nodes = self.probes = self.hits = 0
+        if len(self.table) > self.table_size:
+            self.table.clear()
+
+        candidates = self._candidates(state, player_id, dice_roll)
+        best, depth = (candidates[0] if candidates else None), 0
+        if (len(candidates) > 1 and self.tablebase is not None and player_id == state.current_player
+                and self.tablebase.covers(state)):
+            best = self.tablebase.best_move(state, dice_roll)
+        elif len(candidates) > 1:
+            root = state.copy()
+            root.current_player = player_id
+            cutoff = None if self.budget is None else start + self.budget * ITERATION_CUTOFF
+            try:
+                for depth_limit in range(1, self.max_depth + 1):
+                    best = self._root(root, dice_roll, candidates, depth_limit)
+                    depth = depth_limit
+                    if cutoff is not None and time.perf_counter() > cutoff:
+                        break
+            except TimeUp:
+                pass
+        return SearchResult(best, depth, self.nodes, self.probes, self.hits, time.perf_counter() - start)
+
+    def _candidates(self, state, player_id, dice_roll):
+        return distinct_moves(state, player_id, dice_roll)
+
+    def _root(self, state, dice_roll, candidates, depth):
+        player_id = state.current_player
+        best, best_score = None, None
+        for token_id in candidates:
+            events = engine.apply_move(state, player_id, token_id, dice_roll)
+            score = relative(self._chance(state, depth - 1), player_id)
+            engine.undo_move(state, events)
+            if best_score is None or score > best_score:
+                best, best_score = token_id, score
+        return best
+
+    def _tick(self):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+            raise TimeUp
+
+    def _probe(self, key, depth):
+        self.probes += 1
+        entry = self.table.get(key)
+        if entry is not None and entry[0] >= depth:
+            self.hits += 1
+            return entry[1]
+        return None
+
+    def _chance(self, state, depth):
+        # Expected scores before the player to move rolls
+        self._tick()
+        if depth == 0 or state.winner is not None:
+            return evaluate(state)
+        key = pack(state)
+        scores = self._probe(key, depth)
+        if scores is not None:
+            return scores
+        totals = [0.0] * state.num_players
+        for dice_roll in range(1, 7):
+            for player_id, score in enumerate(self._decision(state, key, dice_roll, depth)):
+                totals[player_id] += score
+        scores = tuple(total / 6 for total in totals)
+        self.table[key] = (depth, scores)
+        return scores
+
+    def _decision(self, state, key, dice_roll, depth):
+        # Scores after the player to move makes its best move with dice_roll
+        self._tick()
+        decision_key = key | dice_roll << packing_for(state.rules.board).bits
+        scores = self._probe(decision_key, depth)
+        if scores is not None:
+            return scores
+        player_id = state.current_player
+        candidates = self._candidates(state, player_id, dice_roll)
+        if not candidates:
+            events = engine.pass_turn(state, dice_roll)
+            scores = self._chance(state, depth - 1)
+            engine.undo_move(state, events)
+        else:
+            best_score = None
+            for token_id in candidates:
+                events = engine.apply_move(state, player_id, token_id, dice_roll)
+                child_scores = self._chance(state, depth - 1)
+                engine.undo_move(state, events)
+                score = relative(child_scores, player_id)
+                if best_score is None or score > best_score:
+                    scores, best_score = child_scores, score
+        self.table[decision_key] = (depth, scores)
+        return scores
+
+
+_strategy_searcher = Searcher(budget=None, max_depth=2)
+
+
+def search_strategy(state, player_id, dice_roll, movable, rng):
+    """Strategy (see ludo.strategies) using a fixed-depth search, so games stay reproducible."""
+    return _strategy_searcher.choose(state, player_id, dice_roll).token
+
+
+def random_positions(rng, count, num_players=4):
+    # Positions from random play, for measuring search speed
+    positions = []
+    while len(positions) < count:
+        state = engine.new_game(num_players)
+        for _ in range(rng.randrange(20, 200)):
+            dice_roll = rng.randint(1, 6)
+            movable = engine.movable_tokens(state, state.current_player, dice_roll)
+            if movable:
+                engine.apply_move(state, state.current_player, rng.choice(movable), dice_roll)
+            else:
+                engine.pass_turn(state, dice_roll)
+            if state.winner is not None:
+                break
+        if state.winner is None:
+            positions.append(state)
+    return positions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.ai', description=__doc__.splitlines()[0])
+    parser.add_argument('--positions', type=int, default=100)
+    parser.add_argument('--players', type=int, default=4, choices=(2, 3, 4))
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET, help="seconds per move")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    searcher = Searcher(budget=args.budget)
+    nodes = probes = hits = searched = 0
+    depths = []
+    elapsed = worst = 0.0
+    for state in random_positions(rng, args.positions, args.players):
+        result = searcher.choose(state, state.current_player, rng.randint(1, 6))
+        if result.depth == 0:
+            # Forced move, nothing searched
+            continue
+        searched += 1
+        nodes += result.nodes
+        probes += result.probes
+        hits += result.hits
+        depths.append(result.depth)
+        elapsed += result.elapsed
+        worst = max(worst, result.elapsed)
+    if not searched:
+        print("no position needed a search")
+        return 0
+    print(f"{searched} searched moves, budget {args.budget * 1000:.0f} ms")
+    print(f"depth reached: {min(depths)}-{max(depths)}, average {sum(depths) / searched:.1f}")
+    print(f"nodes/sec: {nodes / elapsed:,.0f}")
+    print(f"table hit rate: {hits / probes if probes else 0:.1%}")
+    print(f"time per move: {elapsed / searched * 1000:.1f} ms average, {worst * 1000:.1f} ms worst")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
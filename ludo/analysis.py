@@ -0,0 +1,360 @@
+"""Win chances and move hints from Monte Carlo rollouts, computed off the UI thread.
+
+A position is estimated by playing it out many times with a fast strategy
+(see ludo.strategies) and counting who wins. When the player to move has
+already rolled, every distinct move is tried in turn and the one whose
+rollouts the mover wins most often is the hint; the win chances shown are
+those of the position after the hinted move.
+
+Analyst runs the rollouts in chunks on a pool of worker processes. The first
+chunk of a position is small so an estimate shows up quickly; later ones are
+sized from the measured time per rollout to take about chunk_seconds, which
+keeps the hand-offs to and from the pool (each costs the calling thread a
+little time) to a few per second. Results stream back through a queue as
+chunks finish, and the estimate is refined until max_rollouts have been
+played:
+
+    analyst = Analyst(on_result=wake_up)
+    analyst.analyse(state, dice_roll)   # cancels work on the previous position
+    ...
+    estimate = analyst.poll()           # each frame; None if nothing new
+
+Chunks of a stale position that no worker has picked up are cancelled; the
+ones already handed to a worker finish and are dropped, so a new position
+waits for a chunk or two (about chunk_seconds each) at most. A chunk that
+fails is run again, and if a worker process dies the pool is replaced and the
+chunks it lost are run again, so poll() never raises on the caller's thread
+and a complete estimate has all its rollouts (up to MAX_RETRIES failures).
+
+Given a tablebase (see ludo.tablebase), positions it covers are looked up
+instead: the estimate is exact and complete at once, and no rollouts run.
+
+Usage:
+    python -m ludo.analysis --positions 10 --rollouts 2000
+"""
+
+import argparse
+import os
+import queue
+import random
+import sys
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from . import engine
+from .ai import distinct_moves, random_positions
+from .dice import GameDice
+from .strategies import STRATEGIES
+from .tournament import play_game
+
+DEFAULT_POLICY = 'furthest'
+# Rollouts in the first task, then seconds per task; short enough that stale
+# work ends quickly
+FIRST_CHUNK = 8
+CHUNK_SECONDS = 0.1
+MAX_ROLLOUTS = 4000
+# Failed or lost chunks per position that are run again; past this they are
+# dropped, so a chunk that always fails cannot keep the workers busy
+MAX_RETRIES = 8
+
+
+def run_rollouts(state, dice_roll, token_id, count, seed, policy=DEFAULT_POLICY):
+    """Worker entry point. Returns (wins per player, rollouts played, seconds taken).
+
+    With a dice_roll the player to move first plays token_id (or passes if it
+    is None); every seat then follows policy until the game ends.
+    """
+    strategies = [STRATEGIES[policy]] * state.num_players
+    start = state.copy()
+    if dice_roll is not None:
+        if token_id is None:
+            engine.pass_turn(start, dice_roll)
+        else:
+            engine.apply_move(start, start.current_player, token_id, dice_roll)
+    # One set of dice for the whole chunk; each rollout carries on the streams
+    rng = random.Random(seed)
+    dice = GameDice(seed)
+    wins = [0] * state.num_players
+    started = time.perf_counter()
+    for _ in range(count):
+        winner, _ = play_game(strategies, rng, state=start.copy(), dice=dice)
+        if winner is not None:
+            wins[winner] += 1
+    return wins, count, time.perf_counter() - started
+
+
+def lower_priority():
+    # Worker initializer: leave the CPU to the render loop when it needs it
+    if hasattr(os, 'nice'):
+        os.nice(5)
+
+
+class Estimate:
+    __slots__ = ('win_rates', 'hint', 'move_rates', 'rollouts', 'complete', 'exact')
+
+    def __init__(self, win_rates, hint, move_rates, rollouts, complete, exact=False):
+        # Chance of winning for every player, after the hinted move if any
+        self.win_rates = win_rates
+        # Token the player to move should play, or None before the roll or
+        # when there is no choice
+        self.hint = hint
+        # token -> the mover's win rate after playing it
+        self.move_rates = move_rates
+        self.rollouts = rollouts
+        # Whether every planned rollout has been played
+        self.complete = complete
+        # Whether the rates come from the tablebase rather than rollouts
+        self.exact = exact
+
+    def __repr__(self):
+        rates = ', '.join(f"{rate:.3f}" for rate in self.win_rates)
+        source = 'exact' if self.exact else f"rollouts={self.rollouts}"
+        return f"Estimate(win_rates=[{rates}], hint={self.hint}, {source})"
+
+
+class Analyst:
+    """Rollout analysis on a background pool, one position at a time.
+
+    on_result, if given, is called from a pool thread whenever a chunk
+    finishes, so it must be thread-safe; the pygame front end uses it to post
+    a wake-up event. Everything else is called from the owner's thread.
+    """
+
+    def __init__(self, workers=None, chunk_seconds=CHUNK_SECONDS, max_rollouts=MAX_ROLLOUTS,
+                 policy=DEFAULT_POLICY, on_result=None, processes=True, tablebase=None):
+        # Leave a core for the render loop
+        self.workers = workers or max(1, (os.cpu_count() or 1) - 1)
+        self.chunk_seconds = chunk_seconds
+        self.max_rollouts = max_rollouts
+        self.policy = policy
+        self.on_result = on_result
+        self.processes = processes
+        self.tablebase = tablebase
+        self.estimate = None
+        self._pool = None
+        # (generation, candidate index, future) of every finished chunk
+        self._results = queue.SimpleQueue()
+        # Bumped by analyse(); results of older generations are dropped
+        self._generation = 0
+        # future -> rollouts it was asked for, of every chunk not yet merged
+        self._pending = {}
+        # (state, dice_roll, candidates) being analysed, or None
+        self._job = None
+        self._wins = []
+        self._games = []
+        self._chunks = 0
+        self._submitted = 0
+        self._retries = 0
+        # Seconds per rollout measured by the workers, kept across positions
+        self._rollout_seconds = None
+        # Exact estimate from the tablebase, until poll() hands it over
+        self._exact = None
+
+    def _executor(self):
+        if self._pool is None:
+            if self.processes:
+                self._pool = ProcessPoolExecutor(self.workers, initializer=lower_priority)
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='ludo-analysis')
+        return self._pool
+
+    def analyse(self, state, dice_roll=None):
+        """Start estimating state, where the player to move rolled dice_roll (None: not yet)."""
+        self.cancel()
+        self._generation += 1
+        if self.tablebase is not None and self.tablebase.covers(state):
+            self._exact = self._lookup(state, dice_roll)
+            return
+        candidates = [None]
+        if dice_roll is not None:
+            candidates = distinct_moves(state, state.current_player, dice_roll) or [None]
+        self._job = (state.copy(), dice_roll, candidates)
+        self._wins = [[0] * state.num_players for _ in candidates]
+        self._games = [0] * len(candidates)
+        self._chunks = self._submitted = self._retries = 0
+        self._top_up()
+
+    def cancel(self):
+        # Queued chunks never start; running ones finish and are dropped by poll()
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
+        self._job = None
+        self._exact = None
+        self.estimate = None
+
+    @property
+    def busy(self):
+        return bool(self._pending)
+
+    def _lookup(self, state, dice_roll):
+        # Estimate of a position the tablebase covers (two players)
+        table = self.tablebase
+        mover = state.current_player
+        if dice_roll is None:
+            return Estimate(table.win_rates(state), None, {}, 0, True, exact=True)
+        move_rates = table.move_chances(state, dice_roll)
+        if move_rates:
+            hint = table.best_move(state, dice_roll)
+            chance = move_rates[hint]
+        else:
+            hint = None
+            chance = table.pass_chance(state, dice_roll)
+        win_rates = (chance, 1.0 - chance) if mover == 0 else (1.0 - chance, chance)
+        return Estimate(win_rates, hint if len(move_rates) > 1 else None, move_rates, 0, True, exact=True)
+
+    def _top_up(self):
+        # Keep every worker fed, with one chunk each queued behind the running one
+        state, dice_roll, candidates = self._job
+        while len(self._pending) < 2 * self.workers and self._submitted < self.max_rollouts:
+            count = FIRST_CHUNK
+            if self._chunks and self._rollout_seconds:
+                count = max(1, round(self.chunk_seconds / self._rollout_seconds))
+            count = min(count, self.max_rollouts - self._submitted)
+            index = self._chunks % len(candidates)
+            generation = self._generation
+            seed = f"ludo-analysis:{generation}:{self._chunks}"
+            future = self._executor().submit(run_rollouts, state, dice_roll, candidates[index],
+                                             count, seed, self.policy)
+            self._chunks += 1
+            self._submitted += count
+            self._pending[future] = count
+            future.add_done_callback(lambda future, generation=generation, index=index:
+                                     self._finished(generation, index, future))
+
+    def _finished(self, generation, index, future):
+        # Runs on a pool thread
+        if future.cancelled():
+            return
+        self._results.put((generation, index, future))
+        if self.on_result is not None:
+            self.on_result()
+
+    def poll(self):
+        """Merge the chunks finished since the last call. Returns the new Estimate, or None."""
+        if self._exact is not None:
+            self.estimate, self._exact = self._exact, None
+            return self.estimate
+        finished = False
+        while True:
+            try:
+                generation, index, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            # Stale, or lost with a broken pool
+            if generation != self._generation or future not in self._pending:
+                continue
+            count = self._pending.pop(future)
+            finished = True
+            try:
+                wins, games, elapsed = future.result()
+            except BrokenProcessPool as e:
+                self._replace_pool(e, count)
+                continue
+            except (CancelledError, Exception) as e:
+                print(f"analysis chunk failed: {e!r}", file=sys.stderr)
+                self._retry(count)
+                continue
+            self._rollout_seconds = elapsed / games
+            self._wins[index] = [a + b for a, b in zip(self._wins[index], wins)]
+            self._games[index] += games
+        if not finished:
+            return None
+        self._top_up()
+        if not any(self._games):
+            return None
+        self.estimate = self._estimate()
+        return self.estimate
+
+    def _retry(self, count):
+        # Hand the rollouts of a failed chunk back to _top_up()
+        if self._retries < MAX_RETRIES:
+            self._retries += 1
+            self._submitted -= count
+        else:
+            print("analysis chunk dropped, too many failures", file=sys.stderr)
+
+    def _replace_pool(self, error, count):
+        # A worker died and took every pending chunk with it; _top_up() runs
+        # them again on a new pool
+        print(f"analysis worker died, restarting the pool: {error!r}", file=sys.stderr)
+        self._retry(count + sum(self._pending.values()))
+        self._pending.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = None
+
+    def _estimate(self):
+        state, _, candidates = self._job
+        mover = state.current_player
+        move_rates = {}
+        best = None
+        for index, token_id in enumerate(candidates):
+            games = self._games[index]
+            if not games:
+                continue
+            rate = self._wins[index][mover] / games
+            if token_id is not None:
+                move_rates[token_id] = rate
+            if best is None or rate > self._wins[best][mover] / self._games[best]:
+                best = index
+        games = self._games[best]
+        win_rates = tuple(wins / games for wins in self._wins[best])
+        hint = candidates[best] if len(candidates) > 1 else None
+        rollouts = sum(self._games)
+        complete = not self._pending and self._submitted >= self.max_rollouts
+        return Estimate(win_rates, hint, move_rates, rollouts, complete)
+
+    def close(self):
+        self.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.analysis', description=__doc__.splitlines()[0])
+    parser.add_argument('--positions', type=int, default=10)
+    parser.add_argument('--players', type=int, default=4, choices=(2, 3, 4))
+    parser.add_argument('--rollouts', type=int, default=MAX_ROLLOUTS, help="rollouts per position")
+    parser.add_argument('--chunk-ms', type=float, default=CHUNK_SECONDS * 1000, help="target time per worker task")
+    parser.add_argument('--workers', type=int, default=None, help="defaults to one less than the number of CPUs")
+    parser.add_argument('--policy', default=DEFAULT_POLICY, choices=sorted(STRATEGIES))
+    parser.add_argument('--threads', action='store_true', help="use worker threads instead of processes")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    analyst = Analyst(args.workers, args.chunk_ms / 1000, args.rollouts, args.policy, processes=not args.threads)
+    print(f"{analyst.workers} {'threads' if args.threads else 'processes'}, "
+          f"{args.rollouts} rollouts per position, policy {args.policy}")
+    total_rollouts = 0
+    total_time = 0.0
+    try:
+        for state in random_positions(rng, args.positions, args.players):
+            dice_roll = rng.randint(1, 6)
+            start = time.perf_counter()
+            first = None
+            analyst.analyse(state, dice_roll)
+            estimate = None
+            while estimate is None or not estimate.complete:
+                time.sleep(0.005)
+                estimate = analyst.poll() or estimate
+                if estimate is not None and first is None:
+                    first = time.perf_counter() - start
+            elapsed = time.perf_counter() - start
+            total_rollouts += estimate.rollouts
+            total_time += elapsed
+            rates = ' '.join(f"{rate:.2f}" for rate in estimate.win_rates)
+            hint = '-' if estimate.hint is None else estimate.hint
+            print(f"player {state.current_player} rolled {dice_roll}: win chances {rates}, hint {hint}, "
+                  f"first estimate {first * 1000:.0f} ms, done in {elapsed:.2f}s")
+    finally:
+        analyst.close()
+    if total_time:
+        print(f"{total_rollouts / total_time:,.0f} rollouts/sec")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,249 @@
+"""NumPy batch simulator: plays thousands of games in lockstep.
+
+Each game's state is stored in arrays shaped (games, players, 4) and every
+step rolls one die per game, picks a token, moves it and resolves captures for
+the whole batch with array operations. Rules match ludo.engine exactly;
+run_scalar() plays the same games one at a time through engine.apply_move with
+the same random draws, so the two can be compared.
+
+Requires numpy.
+
+Usage:
+    python -m ludo.batch --games 10000 --players 4 --policy random --seed 1
+    python -m ludo.batch --games 200 --verify
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from . import engine
+from . import board
+from .board import GRID_SIZE, PATH_LENGTH, TOKENS_PER_PLAYER
+
+POLICIES = ('first', 'furthest', 'random')
+
+IN_YARD = engine.IN_YARD
+FINISHED = engine.FINISHED
+OFF_TRACK = -1
+
+# Shared square id for every (player, path index), see board.PATH_SQUARES
+SQUARE_IDS = np.array(board.PATH_SQUARES, dtype=np.int16)
+SAFE_SQUARES = np.zeros(GRID_SIZE * GRID_SIZE, dtype=bool)
+SAFE_SQUARES[list(board.SAFE_SQUARES)] = True
+
+
+class BatchResult:
+    __slots__ = ('winners', 'turns', 'elapsed')
+
+    def __init__(self, winners, turns, elapsed):
+        self.winners = winners
+        self.turns = turns
+        self.elapsed = elapsed
+
+    @property
+    def games_per_sec(self):
+        return len(self.winners) / self.elapsed if self.elapsed else float('inf')
+
+
+class BatchState:
+    """Token state for a batch of games.
+
+    path_indices and is_home follow the engine's conventions (see
+    ludo.engine); current_player and winner are per game, winner is -1 while
+    the game is still running.
+    """
+
+    def __init__(self, num_games, num_players):
+        shape = (num_games, num_players, TOKENS_PER_PLAYER)
+        self.num_games = num_games
+        self.num_players = num_players
+        self.path_indices = np.full(shape, IN_YARD, dtype=np.int8)
+        self.is_home = np.ones(shape, dtype=bool)
+        self.current_player = np.zeros(num_games, dtype=np.int8)
+        self.winner = np.full(num_games, -1, dtype=np.int8)
+        self.turns = np.zeros(num_games, dtype=np.int32)
+
+
+def draw_step(rng, num_games, policy):
+    # Random numbers consumed by one lockstep turn, shared with run_scalar()
+    dice = rng.integers(1, 7, size=num_games)
+    choice = rng.random(num_games) if policy == 'random' else None
+    return dice, choice
+
+
+def movable_mask(tokens, dice):
+    # tokens: (games, 4) path indices of the player to move
+    dice = dice[:, None]
+    return ((tokens == IN_YARD) & (dice == 6)) | ((tokens >= 0) & (tokens + dice <= PATH_LENGTH))
+
+
+def choose_tokens(tokens, movable, policy, choice):
+    if policy == 'first':
+        return movable.argmax(axis=1)
+    if policy == 'furthest':
+        # Yard tokens score -1, so anything on the track is preferred
+        return np.where(movable, tokens, -2).argmax(axis=1)
+    if policy == 'random':
+        counts = movable.sum(axis=1)
+        pick = (choice * counts).astype(np.int64)
+        ranks = np.cumsum(movable, axis=1) - 1
+        return (movable & (ranks == pick[:, None])).argmax(axis=1)
+    raise ValueError(f"unknown policy {policy!r}, expected one of {POLICIES}")
+
+
+def step(batch, dice, policy, choice=None):
+    """Play one turn in every running game."""
+    # Work on flat views: row = game * players + player, index = row * 4 + token
+    rows = batch.path_indices.reshape(-1, TOKENS_PER_PLAYER)
+    flat_indices = batch.path_indices.reshape(-1)
+    flat_home = batch.is_home.reshape(-1)
+
+    games = np.flatnonzero(batch.winner < 0)
+    dice = dice[games].astype(np.int8)
+    if choice is not None:
+        choice = choice[games]
+    player = batch.current_player[games].astype(np.intp)
+    row = games * batch.num_players + player
+    tokens = rows[row]
+
+    movable = movable_mask(tokens, dice)
+    moved = movable.any(axis=1)
+    token = choose_tokens(tokens, movable, policy, choice)
+
+    g = games[moved]
+    p = player[moved]
+    r = row[moved]
+    t = token[moved]
+    old = tokens[moved, t]
+    new = np.where(old == IN_YARD, 0, old + dice[moved]).astype(np.int8)
+    flat = r * TOKENS_PER_PLAYER + t
+    flat_indices[flat] = new
+    flat_home[flat] = new == FINISHED
+
+    # Winner: every token of the mover finished
+    finished = new == FINISHED
+    if finished.any():
+        won = finished & (rows[r] == FINISHED).all(axis=1)
+        batch.winner[g[won]] = p[won]
+
+    # Kill rule, skipped for tokens that just entered (start squares are safe)
+    landed = (old != IN_YARD) & ~finished
+    square = SQUARE_IDS[p, np.minimum(new, PATH_LENGTH - 1)]
+    hits = landed & ~SAFE_SQUARES[square]
+    if hits.any():
+        hg, hp, hs = g[hits], p[hits], square[hits]
+        opp = batch.path_indices[hg]
+        on_track = (opp >= 0) & (opp < PATH_LENGTH)
+        players = np.arange(batch.num_players)[None, :, None]
+        opp_squares = np.where(on_track, SQUARE_IDS[players, np.clip(opp, 0, PATH_LENGTH - 1)], OFF_TRACK)
+        captured = (opp_squares == hs[:, None, None]) & (players != hp[:, None, None])
+        if captured.any():
+            cg, cp, ct = np.nonzero(captured)
+            batch.path_indices[hg[cg], cp, ct] = IN_YARD
+            batch.is_home[hg[cg], cp, ct] = True
+
+    # A 6 earns another roll, moved or not
+    advance = games[dice != 6]
+    batch.current_player[advance] = (batch.current_player[advance] + 1) % batch.num_players
+    batch.turns[games] += 1
+
+
+def run_batch(num_games, num_players=4, seed=None, policy='random', max_turns=10000):
+    rng = np.random.default_rng(seed)
+    batch = BatchState(num_games, num_players)
+    start = time.perf_counter()
+    for _ in range(max_turns):
+        if (batch.winner >= 0).all():
+            break
+        dice, choice = draw_step(rng, num_games, policy)
+        step(batch, dice, policy, choice)
+    elapsed = time.perf_counter() - start
+    return BatchResult(batch.winner.copy(), batch.turns.copy(), elapsed), batch
+
+
+def choose_token_scalar(state, movable, policy, choice):
+    if policy == 'first':
+        return movable[0]
+    if policy == 'furthest':
+        return max(movable, key=lambda t: (state.path_indices[state.current_player][t], -t))
+    return movable[int(choice * len(movable))]
+
+
+def run_scalar(num_games, num_players=4, seed=None, policy='random', max_turns=10000):
+    """Reference run through ludo.engine, consuming the same draws as run_batch()."""
+    rng = np.random.default_rng(seed)
+    states = [engine.new_game(num_players) for _ in range(num_games)]
+    turns = [0] * num_games
+    start = time.perf_counter()
+    for _ in range(max_turns):
+        if all(state.winner is not None for state in states):
+            break
+        dice, choice = draw_step(rng, num_games, policy)
+        for i, state in enumerate(states):
+            if state.winner is not None:
+                continue
+            roll = int(dice[i])
+            movable = engine.movable_tokens(state, state.current_player, roll)
+            if movable:
+                token = choose_token_scalar(state, movable, policy, None if choice is None else choice[i])
+                engine.apply_move(state, state.current_player, token, roll)
+            else:
+                engine.pass_turn(state, roll)
+            turns[i] += 1
+    elapsed = time.perf_counter() - start
+    winners = np.array([-1 if state.winner is None else state.winner for state in states], dtype=np.int8)
+    return BatchResult(winners, np.array(turns, dtype=np.int32), elapsed), states
+
+
+def verify(num_games, num_players=4, seed=None, policy='random', max_turns=10000):
+    """Returns the indices of games where batch and scalar runs disagree."""
+    if seed is None:
+        # Both runs must consume the same draws
+        seed = int(np.random.SeedSequence().entropy)
+    batch_result, batch = run_batch(num_games, num_players, seed, policy, max_turns)
+    scalar_result, states = run_scalar(num_games, num_players, seed, policy, max_turns)
+    mismatched = []
+    for i, state in enumerate(states):
+        if (batch_result.winners[i] != scalar_result.winners[i]
+                or batch_result.turns[i] != scalar_result.turns[i]
+                or batch.path_indices[i].tolist() != state.path_indices
+                or batch.current_player[i] != state.current_player):
+            mismatched.append(i)
+    return mismatched, batch_result, scalar_result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.batch', description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--players', type=int, default=4, choices=(2, 3, 4))
+    parser.add_argument('--policy', default='random', choices=POLICIES)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--max-turns', type=int, default=10000)
+    parser.add_argument('--verify', action='store_true',
+                        help="also play the games through ludo.engine and compare")
+    args = parser.parse_args(argv)
+
+    if args.verify:
+        mismatched, result, scalar = verify(args.games, args.players, args.seed, args.policy, args.max_turns)
+        print(f"scalar: {scalar.games_per_sec:,.0f} games/sec")
+    else:
+        result, _ = run_batch(args.games, args.players, args.seed, args.policy, args.max_turns)
+
+    finished = result.winners >= 0
+    print(f"batch:  {result.games_per_sec:,.0f} games/sec "
+          f"({len(result.winners)} games in {result.elapsed:.2f}s)")
+    print(f"average length: {result.turns[finished].mean():.1f} turns")
+    for player in range(args.players):
+        print(f"player {player} win rate: {(result.winners == player).mean():.3f}")
+    if args.verify:
+        if mismatched:
+            print(f"MISMATCH in {len(mismatched)} games, first: {mismatched[:10]}")
+            return 1
+        print("batch and scalar results match")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,276 @@
+"""Board geometry, generated from a board spec, in grid coordinates.
+
+A board is a star of ``arms`` arms around a central polygon, each arm three
+lanes wide and ``arm_length`` squares long, with a yard between every pair of
+arms. make_board() derives everything the rules and the renderer need from
+the spec (paths, yard slots, safe squares, tile outlines) and caches the
+result, so every board is built once and shared. The classic board is
+make_board(6, 4, 4), and the module-level constants below describe it.
+
+Positions are (x, y) in cells with y pointing down; a square at (x, y) covers
+x..x+1, y..y+1. Four-arm boards lie on a square grid and use integer cells;
+other arm counts use fractional positions. Nothing here knows about pixels
+or pygame; the front end converts grid squares to screen positions itself.
+"""
+
+import functools
+import math
+from collections import namedtuple
+
+MIN_ARMS, MAX_ARMS = 3, 8
+MIN_ARM_LENGTH = 3
+
+BoardSpec = namedtuple('BoardSpec', 'arm_length arms tokens_per_player')
+# A square drawn on the track: its position, its outline (four corners) and
+# the player whose colour it has, or None for a white square
+Tile = namedtuple('Tile', 'pos corners owner')
+
+# Arms are numbered clockwise from the left one. The classic board seats
+# green, yellow, blue and red on the left, top, bottom and right arms; other
+# boards seat players clockwise.
+FOUR_ARM_SEATING = (0, 1, 3, 2)
+
+
+class Board:
+    """Lookup tables for one board spec. Build boards with make_board(), never directly.
+
+    Every table is a tuple or frozenset, and boards are shared between
+    games, so treat them as immutable.
+    """
+
+    __slots__ = ('spec', 'arm_length', 'arms', 'tokens_per_player', 'seating', 'grid', 'size',
+                 'full_paths', 'path_length', 'home_slots', 'safe_tiles', 'path_squares',
+                 'home_squares', 'safe_squares', 'tiles', 'yards', 'centre', 'centre_sides',
+                 '_ids', '_coords')
+
+    def __init__(self, spec):
+        arm_length, arms, tokens = spec
+        self.spec = spec
+        self.arm_length = arm_length
+        self.arms = arms
+        self.tokens_per_player = tokens
+        self.seating = FOUR_ARM_SEATING if arms == 4 else tuple(range(arms))
+        self.grid = arms == 4
+        layout = _Layout(arm_length, arms)
+        lanes = arm_length, arm_length + 1, arm_length + 2
+        top, middle, bottom = lanes
+
+        # Arm-local squares are (arm, x, lane), x = 0 at the tip of the arm
+        def arm_path(own):
+            path = [(own, x, top) for x in range(1, arm_length)]
+            for step in range(1, arms + 1):
+                arm = (own + step) % arms
+                path += [(arm, x, bottom) for x in range(arm_length - 1, -1, -1)]
+                path += [(arm, 0, middle), (arm, 0, top)]
+                if arm != own:
+                    path += [(arm, x, top) for x in range(1, arm_length)]
+            # Up the home column to the square before the centre
+            return path + [(own, x, middle) for x in range(1, arm_length + 1)]
+
+        paths = [arm_path(arm) for arm in self.seating]
+        cells = [(arm, x, lane) for arm in range(arms) for x in range(arm_length) for lane in lanes]
+        yards = [layout.yard(arm) for arm in self.seating]
+        slots = [layout.slots(yard, tokens) for yard in yards]
+        if slots[0] is None:
+            raise ValueError(f"{tokens} tokens do not fit in the yard of a board with arm length {arm_length}")
+
+        # Centre everything in a square of whole cells starting at (0, 0)
+        points = [corner for cell in cells for corner in layout.corners(cell)]
+        points += [(x + dx, y + dy) for x, y in yards for dx in (0, arm_length) for dy in (0, arm_length)]
+        xs, ys = [x for x, _ in points], [y for _, y in points]
+        self.size = math.ceil(max(max(xs) - min(xs), max(ys) - min(ys)) - 1e-9)
+        offset = ((self.size - max(xs) - min(xs)) / 2, (self.size - max(ys) - min(ys)) / 2)
+        place = functools.partial(_shift, offset, self.grid)
+
+        self.full_paths = tuple(tuple(place(layout.square(cell)) for cell in path) for path in paths)
+        self.path_length = len(self.full_paths[0])
+        self.home_slots = tuple(tuple(place(slot) for slot in player_slots) for player_slots in slots)
+        self.safe_tiles = frozenset(place(layout.square((arm, 1, lane)))
+                                    for arm in range(arms) for lane in (top, bottom))
+        self.yards = tuple(place(yard) for yard in yards)
+
+        owners = {}
+        for player_id, arm in enumerate(self.seating):
+            owners[(arm, 1, top)] = player_id
+            for x in range(1, arm_length):
+                owners[(arm, x, middle)] = player_id
+        self.tiles = tuple(Tile(place(layout.square(cell)), tuple(place(corner) for corner in layout.corners(cell)),
+                                owners.get(cell))
+                           for cell in cells)
+        # Centre point of the board
+        self.centre = round(offset[0], 4), round(offset[1], 4)
+        # Side of the centre polygon facing each player's arm; with the
+        # centre point it makes that player's home triangle
+        self.centre_sides = tuple(tuple(place(point) for point in layout.centre_side(arm)) for arm in self.seating)
+
+        # --- Square ids ---
+        # Grid boards number squares y * size + x like the cells of the grid;
+        # other boards number them in order
+        positions = [pos for path in self.full_paths for pos in path]
+        positions += [pos for player_slots in self.home_slots for pos in player_slots]
+        ids = {}
+        for pos in positions:
+            if pos not in ids:
+                ids[pos] = pos[1] * self.size + pos[0] if self.grid else len(ids)
+        self._ids = ids
+        self._coords = {square: pos for pos, square in ids.items()}
+        self.path_squares = tuple(tuple(ids[pos] for pos in path) for path in self.full_paths)
+        self.home_squares = tuple(tuple(ids[pos] for pos in player_slots) for player_slots in self.home_slots)
+        self.safe_squares = frozenset(ids[pos] for pos in self.safe_tiles)
+
+    def __reduce__(self):
+        # Unpickle through the cache, so boards sent to worker processes stay shared
+        return make_board, tuple(self.spec)
+
+    def __repr__(self):
+        return "make_board(arm_length={}, arms={}, tokens_per_player={})".format(*self.spec)
+
+    @property
+    def max_players(self):
+        return self.arms
+
+    def square_id(self, x, y):
+        return self._ids[(x, y)]
+
+    def square_coords(self, square):
+        return self._coords[square]
+
+    def square_at(self, x, y):
+        """Id of the track square or yard slot covering the point (x, y), or None."""
+        if self.grid:
+            return self._ids.get((math.floor(x), math.floor(y)))
+        for (sx, sy), square in self._ids.items():
+            if abs(x - sx - 0.5) <= 0.5 and abs(y - sy - 0.5) <= 0.5:
+                return square
+        return None
+
+    def is_safe_tile(self, x, y):
+        return (x, y) in self.safe_tiles
+
+
+def _shift(offset, grid, point):
+    x, y = point[0] + offset[0], point[1] + offset[1]
+    if grid:
+        return round(x), round(y)
+    return round(x, 4), round(y, 4)
+
+
+class _Layout:
+    # Positions around the centre of the board (0, 0), before they are
+    # shifted into grid coordinates. Arm k points along direction k, rotated
+    # k / arms of a turn clockwise from the left; its lanes are spaced along
+    # the normal.
+
+    def __init__(self, arm_length, arms):
+        self.arm_length = arm_length
+        self.arms = arms
+        # Distance from the centre to each side of the centre polygon, whose
+        # sides are three squares long to meet the three lanes
+        self.apothem = 1.5 / math.tan(math.pi / arms)
+
+    def _axes(self, angle):
+        c, s = math.cos(angle), math.sin(angle)
+        # Unit direction pointing out of the arm, and the lane normal
+        return (-c, -s), (-s, c)
+
+    def axes(self, arm):
+        return self._axes(2 * math.pi * arm / self.arms)
+
+    def _centre(self, cell):
+        arm, x, lane = cell
+        (dx, dy), (nx, ny) = self.axes(arm)
+        u = self.apothem + 0.5 + (self.arm_length - 1 - x)
+        v = lane - (self.arm_length + 1)
+        return u * dx + v * nx, u * dy + v * ny
+
+    def square(self, cell):
+        # Top-left of the square the cell is drawn in
+        cx, cy = self._centre(cell)
+        return cx - 0.5, cy - 0.5
+
+    def corners(self, cell):
+        cx, cy = self._centre(cell)
+        (dx, dy), (nx, ny) = self.axes(cell[0])
+        return tuple((cx + (a * dx + b * nx) / 2, cy + (a * dy + b * ny) / 2)
+                     for a, b in ((1, -1), (1, 1), (-1, 1), (-1, -1)))
+
+    def centre_side(self, arm):
+        (dx, dy), (nx, ny) = self.axes(arm)
+        a = self.apothem
+        return (a * dx - 1.5 * nx, a * dy - 1.5 * ny), (a * dx + 1.5 * nx, a * dy + 1.5 * ny)
+
+    def yard(self, arm):
+        # Top-left of the square yard between an arm and the next one
+        # clockwise, on the line halfway between them and just far enough
+        # out to clear both arms (which sit within 1.5 of their middle lane)
+        half = self.arm_length / 2
+        bx, by = self._axes(2 * math.pi * (arm + 0.5) / self.arms)[0]
+        distance = 0.0
+        for side in (arm, arm + 1):
+            nx, ny = self.axes(side)[1]
+            reach = half * (abs(nx) + abs(ny))
+            distance = max(distance, (1.5 + reach) / abs(bx * nx + by * ny))
+        return distance * bx - half, distance * by - half
+
+    def slots(self, yard, tokens):
+        # Tokens sit two cells apart in a square block inside the yard's
+        # inner box, or None if the block does not fit
+        rows = math.ceil(math.sqrt(tokens))
+        if 2 * rows - 1 > self.arm_length - 2:
+            return None
+        margin = (self.arm_length - 2 * rows + 1) // 2
+        x, y = yard
+        return tuple((x + margin + 2 * (token // rows), y + margin + 2 * (token % rows))
+                     for token in range(tokens))
+
+
+def make_board(arm_length=6, arms=4, tokens_per_player=4):
+    """The Board for a spec, built on first use and shared afterwards."""
+    if not MIN_ARMS <= arms <= MAX_ARMS:
+        raise ValueError(f"arms must be between {MIN_ARMS} and {MAX_ARMS}, got {arms}")
+    if arm_length < MIN_ARM_LENGTH:
+        raise ValueError(f"arm_length must be at least {MIN_ARM_LENGTH}, got {arm_length}")
+    if tokens_per_player < 1:
+        raise ValueError(f"tokens_per_player must be at least 1, got {tokens_per_player}")
+    return _cached_board(BoardSpec(arm_length, arms, tokens_per_player))
+
+
+@functools.lru_cache(maxsize=None)
+def _cached_board(spec):
+    return Board(spec)
+
+
+CLASSIC = make_board()
+
+# --- The classic board ---
+GRID_SIZE = CLASSIC.size
+TOKENS_PER_PLAYER = CLASSIC.tokens_per_player
+MAX_PLAYERS = CLASSIC.max_players
+
+FULL_PATHS = CLASSIC.full_paths
+PATH_LENGTH = CLASSIC.path_length
+
+# Yard slot for every token, in the same player order as PLAYER_COLORS
+HOME_SLOTS = CLASSIC.home_slots
+
+SAFE_TILES = CLASSIC.safe_tiles
+
+
+def is_safe_tile(x, y):
+    return (x, y) in SAFE_TILES
+
+
+# --- Shared square ids ---
+# Every grid square gets one integer id so tokens of different players can be
+# compared without going through their own paths.
+def square_id(x, y):
+    return y * GRID_SIZE + x
+
+def square_coords(square):
+    return square % GRID_SIZE, square // GRID_SIZE
+
+# PATH_SQUARES[player][path_index] -> square id
+PATH_SQUARES = CLASSIC.path_squares
+# HOME_SQUARES[player][token] -> square id of the yard slot
+HOME_SQUARES = CLASSIC.home_squares
+SAFE_SQUARES = CLASSIC.safe_squares
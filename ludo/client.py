@@ -0,0 +1,56 @@
+"""Blocking client for ludo.server, for front ends with their own main loop.
+
+Messages from the server are read on a background thread and handed to the
+on_message callback, which must be thread-safe (the pygame front end posts
+them to its event queue). A closed connection is reported as
+``{"type": "disconnected"}``.
+"""
+
+import json
+import socket
+import threading
+
+from .server import DEFAULT_PORT, encode
+
+
+def parse_address(address):
+    """'host', 'host:port' or ':port' -> (host, port)."""
+    host, _, port = address.rpartition(':') if ':' in address else (address, '', '')
+    return host or '127.0.0.1', int(port) if port else DEFAULT_PORT
+
+
+class Client:
+    def __init__(self, address, on_message):
+        self.sock = socket.create_connection(parse_address(address))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.on_message = on_message
+        self.reader = threading.Thread(target=self._read, name='ludo-client', daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        try:
+            with self.sock.makefile('rb') as stream:
+                for line in stream:
+                    self.on_message(json.loads(line))
+        except (OSError, ValueError):
+            pass
+        self.on_message({'type': 'disconnected'})
+
+    def send(self, message):
+        self.sock.sendall(encode(message))
+
+    def join(self, room, name, seats):
+        self.send({'type': 'join', 'room': room, 'name': name, 'seats': seats})
+
+    def roll(self):
+        self.send({'type': 'roll'})
+
+    def move(self, token_id):
+        self.send({'type': 'move', 'token': token_id})
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
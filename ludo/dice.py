@@ -0,0 +1,118 @@
+"""Deterministic, splittable dice streams.
+
+A stream is named by a root seed and a path of keys, and its generator is
+seeded from the whole name (random.Random hashes string seeds with SHA-512,
+whatever PYTHONHASHSEED is):
+
+    root = DiceStream(7)
+    game = root.split('game', 12)        # same as DiceStream(7, 'game', 12)
+    game.roll(), game.rolls(1000)
+
+A stream never depends on how many rolls another stream has drawn, or on the
+process that draws them, so simulations split over any number of workers
+reproduce the same games bit for bit from one root seed. GameDice gives every
+player of a game a stream of their own, plus a cosmetic stream for the roll
+animation, so animation frames never use up game rolls.
+
+Rolls are generated in bulk: each block of BLOCK_BYTES random bytes is mapped
+to die faces by one bytes.translate() call, which drops the 4 byte values that
+would bias the faces (252 = 42 * 6). Blocks have a fixed size, so the nth roll
+of a stream is the same whether it is drawn with roll() or rolls().
+
+Usage:
+    python -m ludo.dice --seed 7 --rolls 1000000
+"""
+
+import argparse
+import random
+import time
+
+BLOCK_BYTES = 4096
+# Byte -> face for the 252 unbiased byte values; the other 4 are deleted
+_FACES = bytes(value % 6 + 1 for value in range(252)) + bytes(4)
+_BIASED = bytes(range(252, 256))
+
+
+class DiceStream:
+    __slots__ = ('name', '_rng', '_buffer', '_pos')
+
+    def __init__(self, seed, *path):
+        self.name = (seed,) + path
+        self._rng = random.Random(f"ludo-dice:{self.name!r}")
+        self._buffer = b''
+        self._pos = 0
+
+    def __repr__(self):
+        return f"DiceStream{self.name!r}"
+
+    def split(self, *keys):
+        """The child stream named by this stream's name plus keys."""
+        return DiceStream(*self.name, *keys)
+
+    def _block(self):
+        return self._rng.randbytes(BLOCK_BYTES).translate(_FACES, _BIASED)
+
+    def roll(self):
+        if self._pos == len(self._buffer):
+            self._buffer = self._block()
+            self._pos = 0
+        value = self._buffer[self._pos]
+        self._pos += 1
+        return value
+
+    def rolls(self, count):
+        """The next count rolls, as bytes holding the values 1-6."""
+        while len(self._buffer) - self._pos < count:
+            self._buffer = self._buffer[self._pos:] + self._block()
+            self._pos = 0
+        start = self._pos
+        self._pos += count
+        return self._buffer[start:self._pos]
+
+
+class GameDice:
+    """Dice for one game: a stream per player, and a cosmetic one for animations."""
+
+    __slots__ = ('stream', 'cosmetic', '_players')
+
+    def __init__(self, seed, *path):
+        self.stream = DiceStream(seed, *path)
+        self.cosmetic = self.stream.split('cosmetic')
+        self._players = {}
+
+    def __repr__(self):
+        return f"GameDice{self.stream.name!r}"
+
+    def player(self, player_id):
+        stream = self._players.get(player_id)
+        if stream is None:
+            stream = self._players[player_id] = self.stream.split('player', player_id)
+        return stream
+
+    def roll(self, player_id):
+        return self.player(player_id).roll()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.dice', description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rolls', type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    stream = DiceStream(args.seed)
+    start = time.perf_counter()
+    rolls = stream.rolls(args.rolls)
+    bulk = time.perf_counter() - start
+    stream = DiceStream(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.rolls):
+        stream.roll()
+    single = time.perf_counter() - start
+    counts = ' '.join(f"{face}:{rolls.count(face) / len(rolls):.4f}" for face in range(1, 7))
+    print(f"faces {counts}")
+    print(f"rolls(): {args.rolls / bulk:,.0f} rolls/sec, roll(): {args.rolls / single:,.0f} rolls/sec")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
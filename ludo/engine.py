@@ -0,0 +1,319 @@
+"""Headless Ludo rules.
+
+The engine works on an explicit GameState and never touches pygame, so it can
+be imported on servers and in batch jobs. Moves are applied with apply_move(),
+which updates the state in place and returns a list of events describing what
+happened; it is up to the caller to turn those into messages or sounds.
+undo_move() takes a move back from its events.
+
+Token progress is stored per token in ``path_indices``:
+
+* ``-1`` - waiting in the yard, needs a 6 to enter the track
+* ``0 .. path_length - 1`` - on the player's path in the board's ``full_paths``
+* ``path_length`` - finished (``FINISHED`` on the classic board)
+
+``is_home`` is True for tokens that are off the track (in the yard or
+finished); those are drawn at their yard slot.
+
+Every state also keeps an occupancy index, square id -> tokens drawn there
+(see Board.path_squares), updated as tokens move. Captures and hit-testing
+look squares up in it instead of scanning every opponent token.
+
+Move legality and outcomes come from tables built once per board (see
+Rules), so generating moves is a handful of list lookups whatever the size of
+the board; movable_mask() returns the movable tokens of a player as a
+bitmask. Games are on the classic board unless new_game() is given another
+one from board.make_board(); the module-level tables (LEGAL_MOVES, OUTCOMES,
+...) are those of the classic board.
+"""
+
+import functools
+from collections import namedtuple
+
+from .board import CLASSIC, PATH_LENGTH
+
+IN_YARD = -1
+# Path index of a finished token on the classic board; see Rules.finished
+FINISHED = PATH_LENGTH
+
+# --- Events ---
+TokenEntered = namedtuple('TokenEntered', 'player token')
+TokenMoved = namedtuple('TokenMoved', 'player token start end')
+TokenCaptured = namedtuple('TokenCaptured', 'player victim victim_token square')
+TokenHome = namedtuple('TokenHome', 'player token')
+PlayerWon = namedtuple('PlayerWon', 'player')
+TurnPassed = namedtuple('TurnPassed', 'player dice')
+
+
+class IllegalMoveError(ValueError):
+    pass
+
+
+# --- Move tables ---
+# Rows are indexed by path index directly: IN_YARD (-1) wraps round to the
+# last entry, which holds the yard. Index 0 of the outer tables (dice 0) is unused.
+Outcome = namedtuple('Outcome', 'index square finishes safe')
+
+
+class Rules:
+    """Move tables for one board. Get them with rules_for(), which builds them once per board."""
+
+    __slots__ = ('board', 'finished', 'tokens_per_player', 'path_squares', 'home_squares',
+                 'legal_moves', 'outcomes', 'mask_tokens', 'track_index')
+
+    def __init__(self, board):
+        self.board = board
+        self.finished = board.path_length
+        self.tokens_per_player = board.tokens_per_player
+        self.path_squares = board.path_squares
+        self.home_squares = board.home_squares
+        indices = list(range(self.finished + 1)) + [IN_YARD]
+        # legal_moves[dice][index] -> bool
+        self.legal_moves = tuple(tuple(dice_roll > 0 and self._is_legal(index, dice_roll) for index in indices)
+                                 for dice_roll in range(7))
+        # outcomes[player][dice][index] -> Outcome, or None for an illegal move
+        self.outcomes = tuple(tuple(tuple(self._outcome(player_id, index, dice_roll) if dice_roll else None
+                                          for index in indices)
+                                    for dice_roll in range(7))
+                              for player_id in range(board.max_players))
+        # Token ids set in a movable_mask() result
+        self.mask_tokens = tuple(tuple(token_id for token_id in range(self.tokens_per_player) if mask >> token_id & 1)
+                                 for mask in range(1 << self.tokens_per_player))
+        # track_index[player][square] -> path index of a square on the player's path
+        self.track_index = tuple({square: index for index, square in enumerate(squares)}
+                                 for squares in self.path_squares)
+
+    def __reduce__(self):
+        # Sent to worker processes as the board alone; the tables are rebuilt there once
+        return rules_for, (self.board,)
+
+    def _is_legal(self, index, dice_roll):
+        if index == IN_YARD:
+            # Needs a 6 to leave the yard
+            return dice_roll == 6
+        # Must land exactly on the last square; finished tokens never move
+        return index + dice_roll <= self.finished
+
+    def _outcome(self, player_id, index, dice_roll):
+        if not self._is_legal(index, dice_roll):
+            return None
+        new_index = 0 if index == IN_YARD else index + dice_roll
+        if new_index == self.finished:
+            return Outcome(new_index, None, True, True)
+        square = self.path_squares[player_id][new_index]
+        return Outcome(new_index, square, False, square in self.board.safe_squares)
+
+    def token_square(self, player_id, token_id, index):
+        # Square a token with the given path index is drawn on
+        if 0 <= index < self.finished:
+            return self.path_squares[player_id][index]
+        return self.home_squares[player_id][token_id]
+
+
+@functools.lru_cache(maxsize=None)
+def rules_for(board):
+    return Rules(board)
+
+
+CLASSIC_RULES = rules_for(CLASSIC)
+LEGAL_MOVES = CLASSIC_RULES.legal_moves
+OUTCOMES = CLASSIC_RULES.outcomes
+MASK_TOKENS = CLASSIC_RULES.mask_tokens
+token_square = CLASSIC_RULES.token_square
+
+
+class GameState:
+    __slots__ = ('num_players', 'current_player', 'path_indices', 'is_home', 'winner', 'occupancy', 'rules')
+
+    def __init__(self, num_players, current_player=0, path_indices=None, is_home=None, winner=None, board=CLASSIC):
+        rules = self.rules = rules_for(board)
+        if not 0 <= num_players <= board.max_players:
+            raise ValueError(f"num_players must be between 0 and {board.max_players}, got {num_players}")
+        self.num_players = num_players
+        self.current_player = current_player
+        if path_indices is None:
+            path_indices = [[IN_YARD] * board.tokens_per_player for _ in range(num_players)]
+        if is_home is None:
+            is_home = [[index == IN_YARD or index == rules.finished for index in player] for player in path_indices]
+        self.path_indices = path_indices
+        self.is_home = is_home
+        self.winner = winner
+        # square id -> [(player, token), ...]
+        self.occupancy = {}
+        for player_id, indices in enumerate(path_indices):
+            for token_id, index in enumerate(indices):
+                square = rules.token_square(player_id, token_id, index)
+                self.occupancy.setdefault(square, []).append((player_id, token_id))
+
+    @property
+    def board(self):
+        return self.rules.board
+
+    def copy(self):
+        state = GameState.__new__(GameState)
+        state.num_players = self.num_players
+        state.current_player = self.current_player
+        state.path_indices = [list(player) for player in self.path_indices]
+        state.is_home = [list(player) for player in self.is_home]
+        state.winner = self.winner
+        state.occupancy = {square: list(tokens) for square, tokens in self.occupancy.items()}
+        state.rules = self.rules
+        return state
+
+    def place(self, player_id, token_id, index):
+        # Set a token's path index, keeping the occupancy index in step
+        rules = self.rules
+        indices = self.path_indices[player_id]
+        old_square = rules.token_square(player_id, token_id, indices[token_id])
+        new_square = rules.token_square(player_id, token_id, index)
+        indices[token_id] = index
+        self.is_home[player_id][token_id] = not 0 <= index < rules.finished
+        if old_square != new_square:
+            tokens = self.occupancy[old_square]
+            tokens.remove((player_id, token_id))
+            if not tokens:
+                del self.occupancy[old_square]
+            self.occupancy.setdefault(new_square, []).append((player_id, token_id))
+
+    def occupants(self, square):
+        # Tokens drawn on a square (track square or yard slot)
+        return self.occupancy.get(square, ())
+
+    def square(self, player_id, token_id):
+        # Grid square of a token on the track, or None when it is off the board
+        index = self.path_indices[player_id][token_id]
+        if 0 <= index < self.rules.finished:
+            return self.rules.board.full_paths[player_id][index]
+        return None
+
+    def __eq__(self, other):
+        if not isinstance(other, GameState):
+            return NotImplemented
+        return (self.rules is other.rules
+                and self.num_players == other.num_players
+                and self.current_player == other.current_player
+                and self.path_indices == other.path_indices
+                and self.winner == other.winner)
+
+    def __repr__(self):
+        board = '' if self.rules is CLASSIC_RULES else f", board={self.rules.board!r}"
+        return (f"GameState(num_players={self.num_players}, current_player={self.current_player}, "
+                f"path_indices={self.path_indices}, winner={self.winner}{board})")
+
+
+def new_game(num_players, board=CLASSIC):
+    return GameState(num_players, board=board)
+
+
+def can_move_token(state, player_id, token_id, dice_roll):
+    return state.rules.legal_moves[dice_roll][state.path_indices[player_id][token_id]]
+
+
+def movable_mask(state, player_id, dice_roll):
+    """Bitmask of the player's tokens that can move by dice_roll (bit n = token n)."""
+    legal = state.rules.legal_moves[dice_roll]
+    indices = state.path_indices[player_id]
+    if len(indices) == 4:
+        a, b, c, d = indices
+        return legal[a] | legal[b] << 1 | legal[c] << 2 | legal[d] << 3
+    mask = 0
+    for token_id, index in enumerate(indices):
+        mask |= legal[index] << token_id
+    return mask
+
+
+def movable_tokens(state, player_id, dice_roll):
+    return state.rules.mask_tokens[movable_mask(state, player_id, dice_roll)]
+
+
+def can_move_any_token(state, player_id, dice_roll):
+    return movable_mask(state, player_id, dice_roll) != 0
+
+
+def destination(state, player_id, token_id, dice_roll):
+    # Path index a legal move would land on
+    return state.rules.outcomes[player_id][dice_roll][state.path_indices[player_id][token_id]].index
+
+
+def would_capture(state, player_id, token_id, dice_roll):
+    """True if moving the token would send at least one opponent home."""
+    outcome = state.rules.outcomes[player_id][dice_roll][state.path_indices[player_id][token_id]]
+    if outcome is None or outcome.safe:
+        # Illegal, finishing, or landing on a safe square (start squares included)
+        return False
+    return any(owner != player_id for owner, _ in state.occupants(outcome.square))
+
+
+def end_turn(state, dice_roll):
+    # A 6 earns another roll, anything else passes the dice on
+    if dice_roll != 6 and state.num_players:
+        state.current_player = (state.current_player + 1) % state.num_players
+
+
+def apply_move(state, player_id, token_id, dice_roll):
+    """Move a token and advance the turn. Returns the list of events.
+
+    Raises IllegalMoveError if it is not player_id's turn or the token
+    cannot move by dice_roll.
+    """
+    if player_id != state.current_player:
+        raise IllegalMoveError(f"it is player {state.current_player}'s turn, not player {player_id}'s")
+    if not can_move_token(state, player_id, token_id, dice_roll):
+        raise IllegalMoveError(f"token {token_id} of player {player_id} cannot move {dice_roll}")
+
+    index = state.path_indices[player_id][token_id]
+    outcome = state.rules.outcomes[player_id][dice_roll][index]
+    state.place(player_id, token_id, outcome.index)
+    if index == IN_YARD:
+        events = [TokenEntered(player_id, token_id)]
+    else:
+        events = [TokenMoved(player_id, token_id, index, outcome.index)]
+        if outcome.finishes:
+            events.append(TokenHome(player_id, token_id))
+            if state.winner is None and all(i == state.rules.finished for i in state.path_indices[player_id]):
+                state.winner = player_id
+                events.append(PlayerWon(player_id))
+        elif not outcome.safe:
+            _capture(state, player_id, outcome.square, events)
+
+    end_turn(state, dice_roll)
+    return events
+
+
+def _capture(state, player_id, square, events):
+    # Kill rule: send opponent tokens on the same (unsafe) square back to their yard
+    victims = sorted(token for token in state.occupancy[square] if token[0] != player_id)
+    for opp_id, opp_token in victims:
+        state.place(opp_id, opp_token, IN_YARD)
+        events.append(TokenCaptured(player_id, opp_id, opp_token, state.rules.board.square_coords(square)))
+
+
+def pass_turn(state, dice_roll):
+    """Record that the current player had no legal move for dice_roll."""
+    player_id = state.current_player
+    end_turn(state, dice_roll)
+    return [TurnPassed(player_id, dice_roll)]
+
+
+def undo_move(state, events):
+    """Take back the move or pass that returned events, in place.
+
+    It must be the last one applied to state. Only the tokens the move touched
+    are put back, so search can play moves on one state and take them back
+    instead of copying it for every node.
+    """
+    rules = state.rules
+    first = events[0]
+    for event in reversed(events):
+        kind = type(event)
+        if kind is TokenCaptured:
+            # The victim stood where the mover landed
+            square = rules.path_squares[first.player][first.end]
+            state.place(event.victim, event.victim_token, rules.track_index[event.victim][square])
+        elif kind is TokenMoved:
+            state.place(event.player, event.token, event.start)
+        elif kind is TokenEntered:
+            state.place(event.player, event.token, IN_YARD)
+        elif kind is PlayerWon:
+            state.winner = None
+    state.current_player = first.player
@@ -0,0 +1,269 @@
+"""Game events as NDJSON, written in the background for analytics.
+
+Every game gets an id, and each event is one JSON object per line:
+
+    {"t":1792286111.483,"game":"9f3c...","seq":0,"type":"start","players":2,"board":[6,4,4],"current":0,"path_indices":[[-1,-1,-1,-1],[-1,-1,-1,-1]]}
+    {"t":1792286111.484,"game":"9f3c...","seq":1,"type":"roll","player":0,"dice":6}
+    {"t":1792286111.484,"game":"9f3c...","seq":2,"type":"enter","player":0,"token":1}
+    {"t":1792286111.502,"game":"9f3c...","seq":9,"type":"move","player":1,"token":0,"start":3,"end":8}
+    {"t":1792286111.502,"game":"9f3c...","seq":10,"type":"capture","player":1,"victim":0,"victim_token":1,"square":[6,8]}
+
+The types are start, roll, enter (a token leaves the yard), move, capture,
+home (a token finishes), pass (no legal move for the roll) and win; apart
+from start and roll they are the engine's events (see ludo.engine) with their
+fields. start holds the position the game starts (or resumes) from, and is
+sent again with "rewound":true when an undo or redo moves the game; t is the
+Unix time and seq numbers a game's events from 0.
+
+Emitting only appends to a deque, under a lock the writer holds just long
+enough to take the deque, so it never waits on the disk. A writer thread
+wakes every flush_seconds, or sooner once flush_records are pending, turns
+the pending events into lines (engine events through fixed templates, which
+is several times cheaper than json.dumps) and appends them to the current
+file. If that fails, the events pending then and every later one are
+counted in dropped instead, so the game goes on. Files are written as
+NAME.ndjson.part and renamed to NAME.ndjson when they reach max_file_bytes
+or max_file_seconds, or when the log closes, so consumers can take every
+.ndjson file as complete:
+
+    log = EventLog('events')
+    game = GameEvents(log)
+    game.start(state)
+    game.roll(player_id, dice_roll)
+    game.record(engine.apply_move(state, player_id, token_id, dice_roll))
+    game.turn(player_id, dice_roll, engine.pass_turn(state, dice_roll))   # both at once
+    ...
+    log.close()
+"""
+
+import json
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from . import engine
+
+FLUSH_RECORDS = 4096
+FLUSH_SECONDS = 1.0
+MAX_FILE_BYTES = 64 << 20
+MAX_FILE_SECONDS = 3600
+
+# Numbers files across every log in the process, so names never collide
+_file_numbers = itertools.count(1)
+
+# Fields of a roll event; the others are the engine's events
+Rolled = namedtuple('Rolled', 'player dice')
+
+EVENT_TYPES = {
+    Rolled: 'roll',
+    engine.TokenEntered: 'enter',
+    engine.TokenMoved: 'move',
+    engine.TokenCaptured: 'capture',
+    engine.TokenHome: 'home',
+    engine.PlayerWon: 'win',
+    engine.TurnPassed: 'pass',
+}
+
+
+def _template(kind, fields):
+    # Line for (t, game id as JSON, seq, *fields); square is an (x, y) pair
+    parts = ''.join(',"square":[%s,%s]' if field == 'square' else f',"{field}":%s' for field in fields)
+    return '{"t":%.3f,"game":%s,"seq":%s,"type":"' + kind + '"' + parts + '}\n'
+
+
+_TEMPLATES = {event_type: _template(kind, event_type._fields) for event_type, kind in EVENT_TYPES.items()}
+
+
+def _lines(items, encode):
+    """NDJSON for queued items: dicts, or GameEvents' (t, game, seq, player, dice or None, events)."""
+    templates = _TEMPLATES
+    roll_line = templates[Rolled]
+    captured = engine.TokenCaptured
+    lines = []
+    append = lines.append
+    for item in items:
+        if type(item) is dict:
+            append(encode(item) + '\n')
+            continue
+        t, game, seq, player_id, dice_roll, events = item
+        if dice_roll is not None:
+            append(roll_line % (t, game, seq, player_id, dice_roll))
+            seq += 1
+        for event in events:
+            if type(event) is captured:
+                append(templates[captured] % (t, game, seq, *event[:3], *event.square))
+            else:
+                append(templates[type(event)] % (t, game, seq, *event))
+            seq += 1
+    return lines
+
+
+class EventLog:
+    """NDJSON files in a directory, written by a background thread."""
+
+    def __init__(self, directory, prefix='events', flush_records=FLUSH_RECORDS, flush_seconds=FLUSH_SECONDS,
+                 max_file_bytes=MAX_FILE_BYTES, max_file_seconds=MAX_FILE_SECONDS):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self.max_file_bytes = max_file_bytes
+        self.max_file_seconds = max_file_seconds
+        # Records written, items emitted but never written, and paths of the
+        # files finished so far
+        self.written = 0
+        self.dropped = 0
+        self.files = []
+        # dicts, or a turn's events from GameEvents (see _lines)
+        self._pending = deque()
+        # Guards _pending, _closed, _failed and dropped
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._file = None
+        self._path = None
+        self._file_bytes = 0
+        self._file_opened = 0.0
+        self._failed = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='ludo-events', daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        """Queue a dict to be written as one line. Never waits on the disk.
+
+        Raises ValueError once the log is closed. After a write failure the
+        record is counted in dropped instead.
+        """
+        with self._lock:
+            if self._closed:
+                raise ValueError("emit on a closed event log")
+            if self._failed:
+                self.dropped += 1
+                return
+            pending = self._pending
+            pending.append(record)
+        if len(pending) >= self.flush_records:
+            self._wake.set()
+
+    def close(self):
+        # Writes everything emitted so far and finishes the current file
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        encode = json.JSONEncoder(separators=(',', ':')).encode
+        try:
+            while True:
+                self._wake.wait(self.flush_seconds)
+                self._wake.clear()
+                # Once closing is seen no emit can add to the deque taken here
+                with self._lock:
+                    closing = self._closed
+                    items, self._pending = self._pending, deque()
+                try:
+                    self._write(items, encode)
+                except Exception as e:
+                    self._fail(e, len(items))
+                if closing:
+                    self._finish_file()
+                    return
+        finally:
+            # Should the thread die anyway, emits are dropped instead of piling up
+            with self._lock:
+                self._failed = True
+
+    def _fail(self, error, count):
+        print(f"event log failed, no more events are written: {error!r}", file=sys.stderr)
+        with self._lock:
+            self._failed = True
+            self.dropped += count
+
+    def _write(self, items, encode):
+        # Runs on the writer thread; after a failure, records are dropped
+        if not items:
+            return
+        if self._failed:
+            with self._lock:
+                self.dropped += len(items)
+            return
+        lines = _lines(items, encode)
+        data = ''.join(lines)
+        try:
+            if self._file is not None and (self._file_bytes + len(data) > self.max_file_bytes
+                                           or time.monotonic() - self._file_opened > self.max_file_seconds):
+                self._finish_file()
+            if self._file is None:
+                self._open_file()
+            self._file.write(data)
+            self._file.flush()
+        except OSError as e:
+            self._fail(e, len(items))
+            return
+        self._file_bytes += len(data)
+        self.written += len(lines)
+
+    def _open_file(self):
+        name = f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_file_numbers)}.ndjson"
+        self._path = os.path.join(self.directory, name)
+        self._file = open(self._path + '.part', 'w', encoding='utf-8', newline='\n')
+        self._file_bytes = 0
+        self._file_opened = time.monotonic()
+
+    def _finish_file(self):
+        if self._file is None:
+            return
+        try:
+            self._file.close()
+            os.replace(self._path + '.part', self._path)
+            self.files.append(self._path)
+        except OSError as e:
+            print(f"event log failed to finish {self._path}: {e}", file=sys.stderr)
+        self._file = None
+
+
+class GameEvents:
+    """The events of one game, sent to an EventLog with the game's id."""
+
+    __slots__ = ('log', 'game_id', 'seq', '_game')
+
+    def __init__(self, log, game_id=None):
+        self.log = log
+        self.game_id = game_id or uuid.uuid4().hex
+        self.seq = 0
+        self._game = json.dumps(self.game_id)
+
+    def start(self, state, **info):
+        """The game starts (or resumes) at state; info adds fields such as the dice seed."""
+        self.log.emit({'t': round(time.time(), 3), 'game': self.game_id, 'seq': self.seq, 'type': 'start',
+                       'players': state.num_players, 'board': list(state.board.spec),
+                       'current': state.current_player,
+                       'path_indices': [list(indices) for indices in state.path_indices], **info})
+        self.seq += 1
+
+    def roll(self, player_id, dice_roll):
+        self.turn(player_id, dice_roll, ())
+
+    def record(self, events):
+        """Engine events returned by apply_move() or pass_turn()."""
+        if events:
+            self.turn(None, None, events)
+
+    def turn(self, player_id, dice_roll, events):
+        """A roll and the engine events it led to, queued as one item."""
+        self.log.emit((time.time(), self._game, self.seq, player_id, dice_roll, events))
+        self.seq += len(events) + 1 if dice_roll is not None else len(events)
@@ -0,0 +1,224 @@
+"""Undo, redo and branching game history over packed positions.
+
+Every position a game passes through is a Node holding its packed key (see
+ludo.packed) and the move that led to it, as a (kind, player, token, dice)
+record like those of ludo.replay, with kind persistence.MOVE or
+persistence.PASS. A move therefore costs one small node whatever the size of
+the board, and nodes never hold token lists, so nothing is copied as the game
+goes on. Playing a different move after undoing starts a branch next to the
+old line instead of throwing it away:
+
+    history = History(state)
+    events = engine.apply_move(state, player_id, token_id, dice_roll)
+    history.record(state, MOVE, player_id, token_id, dice_roll)
+    history.undo(state)             # state is back before the move
+    history.redo(state)             # and after it again
+    history.goto(node, state)       # any position in any branch
+
+undo(), redo() and goto() change the given state in place with
+Packing.restore(), which only moves the tokens that differ, so jumping
+between branches never rebuilds the position's lists. Redo follows the
+branch last played or visited from a position; select_branch() picks
+another.
+
+For search, engine.undo_move() takes a single move back from its events,
+which is cheaper still than restoring a key; ludo.ai plays and takes back
+moves on one state that way.
+
+Usage:
+    python -m ludo.history --moves 100000
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from . import engine
+from .packed import pack, packing_for
+from .persistence import MOVE, PASS
+
+
+class Node:
+    """One position in the history tree."""
+
+    __slots__ = ('key', 'parent', 'move', 'depth', 'children', 'redo')
+
+    def __init__(self, key, parent=None, move=None):
+        self.key = key
+        self.parent = parent
+        # (kind, player, token, dice) that led here from parent, None at the root
+        self.move = move
+        # Moves from the root
+        self.depth = 0 if parent is None else parent.depth + 1
+        # Child nodes, in the order they were first played; None until there is one
+        self.children = None
+        # Index of the child redo() goes to
+        self.redo = 0
+
+    def __repr__(self):
+        return f"Node(depth={self.depth}, move={self.move}, branches={len(self.children or ())})"
+
+
+class History:
+    """The tree of positions of one game, and the node the game is at."""
+
+    def __init__(self, state):
+        self.packing = packing_for(state.rules.board)
+        self.root = self.node = Node(pack(state))
+        self.size = 1
+
+    def record(self, state, kind, player_id, token_id, dice_roll):
+        """Add the move or pass just applied to state. Returns its node.
+
+        A move already played from this position (after an undo) is
+        followed again instead of being added twice.
+        """
+        node = self.node
+        move = (kind, player_id, token_id, dice_roll)
+        if node.children is None:
+            node.children = []
+        for i, child in enumerate(node.children):
+            if child.move == move:
+                node.redo = i
+                self.node = child
+                return child
+        child = Node(pack(state), node, move)
+        node.redo = len(node.children)
+        node.children.append(child)
+        self.size += 1
+        self.node = child
+        return child
+
+    def can_undo(self):
+        return self.node.parent is not None
+
+    def can_redo(self):
+        return bool(self.node.children)
+
+    def undo(self, state):
+        """Step state back one move. Returns the move taken back, or None at the start."""
+        node = self.node
+        if node.parent is None:
+            return None
+        self._jump(node.parent, state)
+        return node.move
+
+    def redo(self, state):
+        """Step state forward along the current branch. Returns the move, or None at its end."""
+        node = self.node
+        if not node.children:
+            return None
+        child = node.children[node.redo]
+        self._jump(child, state)
+        return child.move
+
+    def goto(self, node, state):
+        """Move state to any node of this history, in place.
+
+        Redo from every position on the way back to the root then leads to
+        node. The cost grows with the number of moves between the two
+        positions, not with the length of the game.
+        """
+        # Redo from the root leads to self.node, so only the positions below
+        # the one both lines share need their redo changed
+        old = self.node
+        self._jump(node, state)
+        while old.depth > node.depth:
+            old = old.parent
+        while node.depth > old.depth:
+            node = self._lead_to(node)
+        while node is not old:
+            node = self._lead_to(node)
+            old = old.parent
+
+    def _lead_to(self, node):
+        # Make redo from node's parent go to node; returns the parent
+        parent = node.parent
+        if parent.children[parent.redo] is not node:
+            parent.redo = parent.children.index(node)
+        return parent
+
+    def _jump(self, node, state):
+        # state is at self.node, so only the fields the two keys disagree on
+        # are read. Undo and redo stay on the line redo from the root
+        # follows, so they need no other change
+        self.packing.restore(state, node.key, self.node.key)
+        self.node = node
+
+    def branches(self):
+        """The moves redo() can follow from here, in the order they were first played."""
+        return [child.move for child in self.node.children or ()]
+
+    def select_branch(self, index):
+        """Make redo() follow branch index (see branches())."""
+        if not 0 <= index < len(self.node.children or ()):
+            raise IndexError(f"no branch {index} here")
+        self.node.redo = index
+
+    def line(self, node=None):
+        """Moves from the start to node (the current one by default)."""
+        node = node or self.node
+        moves = []
+        while node.parent is not None:
+            moves.append(node.move)
+            node = node.parent
+        moves.reverse()
+        return moves
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.history', description=__doc__.splitlines()[0])
+    parser.add_argument('--moves', type=int, default=100000)
+    parser.add_argument('--players', type=int, default=4, choices=(2, 3, 4))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    # Random play with an undo of a few moves and a new branch now and then
+    rng = random.Random(args.seed)
+    state = engine.new_game(args.players)
+    history = History(state)
+    start = time.perf_counter()
+    while history.size < args.moves:
+        if state.winner is not None or rng.random() < 0.02:
+            for _ in range(rng.randint(1, 8)):
+                history.undo(state)
+            continue
+        player_id, dice_roll = state.current_player, rng.randint(1, 6)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if movable:
+            token_id = rng.choice(movable)
+            engine.apply_move(state, player_id, token_id, dice_roll)
+            history.record(state, MOVE, player_id, token_id, dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+            history.record(state, PASS, player_id, 0, dice_roll)
+    played = time.perf_counter() - start
+
+    # Every node, visited in random order
+    nodes = []
+    pending = [history.root]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.children or ())
+    rng.shuffle(nodes)
+    start = time.perf_counter()
+    for node in nodes:
+        history.goto(node, state)
+        if pack(state) != node.key:
+            print(f"goto failed at {node}", file=sys.stderr)
+            return 1
+    jumps = time.perf_counter() - start
+    branched = sum(1 for node in nodes if node.children and len(node.children) > 1)
+
+    per_node = sys.getsizeof(history.root) + sys.getsizeof(history.root.key) + sys.getsizeof(nodes[0].move or ())
+    print(f"{history.size} positions, {branched} with more than one branch, deepest line {max(n.depth for n in nodes)}")
+    print(f"played and recorded {history.size / played:,.0f} moves/sec, goto {len(nodes) / jumps:,.0f} jumps/sec "
+          f"between random positions")
+    print(f"about {per_node} bytes per position (node, packed key and move) plus its list slot")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,195 @@
+"""Load test for ludo.server with simulated clients over localhost.
+
+Starts a server in a subprocess (or uses --connect HOST:PORT), fills --rooms
+rooms with one connection per seat and lets every seat roll and move a random
+token as fast as allowed by --think-ms. Reports throughput and the latency
+from sending a roll or move to receiving the server's broadcast.
+
+Usage:
+    python -m ludo.loadtest --rooms 2000 --seats 4 --duration 20
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from .board import MAX_PLAYERS, TOKENS_PER_PLAYER
+from .server import MAX_LINE, encode
+
+
+class Stats:
+    def __init__(self):
+        self.roll_latency = []
+        self.move_latency = []
+        self.games = 0
+        self.errors = 0
+        # Off during the warmup, while every seat is still connecting
+        self.recording = False
+        # Server CPU seconds used while recording, if known
+        self.server_cpu = None
+
+
+def process_cpu_time(pid):
+    """CPU seconds used so far by a process, or None where /proc is unavailable."""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    # utime and stime, fields 14 and 15 of the whole line
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def play_seat(host, port, room, seats, rng, stats, think, stop):
+    """One simulated player. Returns when the game ends, the room closes or stop is set."""
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+    seat = None
+    sent_at = None
+
+    async def act(message):
+        nonlocal sent_at
+        if think:
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+        if stop.is_set():
+            return
+        sent_at = time.perf_counter()
+        writer.write(encode(message))
+
+    try:
+        writer.write(encode({'type': 'join', 'room': room, 'name': f"bot{rng.randrange(1000)}", 'seats': seats}))
+        while not stop.is_set():
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            kind = message['type']
+            if kind == 'joined':
+                seat = message['seat']
+            elif kind == 'error':
+                stats.errors += 1
+            elif kind == 'left':
+                break
+            elif kind == 'dice' and message['seat'] == seat:
+                if stats.recording:
+                    stats.roll_latency.append(time.perf_counter() - sent_at)
+                movable = [token_id for token_id in range(TOKENS_PER_PLAYER) if message['movable'] >> token_id & 1]
+                if movable:
+                    await act({'type': 'move', 'token': rng.choice(movable)})
+            elif kind == 'move':
+                if message['seat'] == seat and stats.recording:
+                    stats.move_latency.append(time.perf_counter() - sent_at)
+                if 'winner' in message:
+                    if message['winner'] == seat and stats.recording:
+                        stats.games += 1
+                    break
+                if message['next'] == seat:
+                    await act({'type': 'roll'})
+            elif (kind == 'start' and message['current'] == seat) or (kind == 'pass' and message['next'] == seat):
+                await act({'type': 'roll'})
+    finally:
+        writer.close()
+
+
+async def run_room(host, port, index, seats, seed, stats, think, stop):
+    # Rooms are replayed until the test stops, so finished games do not idle their seats
+    game = 0
+    while not stop.is_set():
+        rng = random.Random(f"{seed}:{index}:{game}")
+        room = f"load-{index}-{game}"
+        await asyncio.gather(*(play_seat(host, port, room, seats, random.Random(rng.getrandbits(64)),
+                                         stats, think, stop) for _ in range(seats)))
+        game += 1
+
+
+async def run_load(host, port, rooms, seats, duration, think, seed, warmup, server_pid=None):
+    stats = Stats()
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(run_room(host, port, index, seats, seed, stats, think, stop))
+             for index in range(rooms)]
+    await asyncio.sleep(warmup)
+    stats.recording = True
+    cpu_start = server_pid and process_cpu_time(server_pid)
+    await asyncio.sleep(duration)
+    stats.recording = False
+    cpu_end = server_pid and process_cpu_time(server_pid)
+    if cpu_start is not None and cpu_end is not None:
+        stats.server_cpu = cpu_end - cpu_start
+    stop.set()
+    # Seats blocked on a read are cancelled rather than waiting for the next message
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats
+
+
+def start_server(seed):
+    process = subprocess.Popen([sys.executable, '-m', 'ludo.server', '--port', '0', '--seed', str(seed)],
+                               stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('listening on '):
+        process.kill()
+        raise RuntimeError("server did not start")
+    host, port = line.split()[-1].rsplit(':', 1)
+    return process, host, int(port)
+
+
+def format_report(stats, rooms, seats, duration):
+    moves = len(stats.move_latency)
+    requests = moves + len(stats.roll_latency)
+    lines = [f"{rooms} rooms x {seats} seats ({rooms * seats} connections) for {duration:.0f}s",
+             f"moves: {moves:,} ({moves / duration:,.0f}/sec), rolls: {len(stats.roll_latency):,}, "
+             f"games finished: {stats.games}, errors: {stats.errors}"]
+    if stats.server_cpu:
+        lines.append(f"server CPU: {stats.server_cpu:.1f}s ({stats.server_cpu / duration:.0%} of one core), "
+                     f"{requests / stats.server_cpu:,.0f} requests per CPU-second")
+    for name, values in (('move', stats.move_latency), ('roll', stats.roll_latency)):
+        lines.append(f"{name} latency: p50 {percentile(values, 0.5) * 1000:.2f} ms, "
+                     f"p99 {percentile(values, 0.99) * 1000:.2f} ms, max {max(values, default=0) * 1000:.2f} ms")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.loadtest', description=__doc__.splitlines()[0])
+    parser.add_argument('--connect', metavar='HOST:PORT', help="use a running server instead of starting one")
+    parser.add_argument('--rooms', type=int, default=1000)
+    parser.add_argument('--seats', type=int, default=4, choices=range(2, MAX_PLAYERS + 1))
+    parser.add_argument('--duration', type=float, default=20.0, help="seconds to measure for")
+    parser.add_argument('--warmup', type=float, default=5.0, help="seconds to connect every seat before measuring")
+    parser.add_argument('--think-ms', type=float, default=100.0,
+                        help="average delay before each roll or move, like a person would take")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    process = None
+    # With --connect the server's CPU time is not measured
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        port = int(port)
+    else:
+        process, host, port = start_server(args.seed)
+    try:
+        stats = asyncio.run(run_load(host, port, args.rooms, args.seats, args.duration,
+                                     args.think_ms / 1000, args.seed, args.warmup,
+                                     process and process.pid))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(format_report(stats, args.rooms, args.seats, args.duration))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,246 @@
+"""Positions packed into one int, for hashing, deduplication and compact storage.
+
+A position (every token's path index, the player to move, the winner and the
+number of players) is packed into fixed-width bit fields of a Python int, so
+two positions are equal exactly when their keys are, and a key hashes and
+compares like any int. Bits from the lowest up:
+
+    token fields    token_bits per token, player 0 token 0 first, for every
+                    seat of the board; path index + 1, so 0 is in the yard
+                    and path_length + 1 is finished
+    current player  player_bits
+    winner + 1      count_bits, 0 while nobody has won
+    num_players     count_bits
+
+Field widths come from the board. On the classic board a token takes 6 bits,
+a position 104, and to_bytes() writes it in 16 bytes (keys are stored in
+whole 8-byte words, so records stay aligned in arrays and files).
+
+    key = pack(state)                   # int
+    state = unpack(key)                 # GameState, occupancy index included
+    unpack(key, into=state)             # the same, reusing state in place
+    PackedState.from_state(state).to_bytes()
+
+Usage:
+    python -m ludo.packed --positions 100000
+"""
+
+import argparse
+import functools
+import random
+import sys
+import time
+
+from . import engine
+from .board import CLASSIC
+
+
+class Packing:
+    """Field layout for one board. Get it with packing_for(), which builds it once per board."""
+
+    __slots__ = ('board', 'token_bits', 'token_mask', 'player_bits', 'count_bits', 'header_shift',
+                 'bits', 'size', '_shifts')
+
+    def __init__(self, board):
+        self.board = board
+        # Path index + 1 runs from 0 (yard) to path_length + 1 (finished)
+        self.token_bits = (board.path_length + 1).bit_length()
+        self.token_mask = (1 << self.token_bits) - 1
+        self.player_bits = (board.max_players - 1).bit_length()
+        self.count_bits = board.max_players.bit_length()
+        self.header_shift = board.max_players * board.tokens_per_player * self.token_bits
+        self.bits = self.header_shift + self.player_bits + 2 * self.count_bits
+        self.size = (self.bits + 63) // 64 * 8
+        # _shifts[player][token] -> offset of the token's field
+        self._shifts = tuple(tuple((player_id * board.tokens_per_player + token_id) * self.token_bits
+                                   for token_id in range(board.tokens_per_player))
+                             for player_id in range(board.max_players))
+
+    def __reduce__(self):
+        return packing_for, (self.board,)
+
+    def encode(self, state):
+        width = self.token_bits
+        key = state.num_players
+        key = key << self.count_bits | (0 if state.winner is None else state.winner + 1)
+        key = key << self.player_bits | state.current_player
+        # Seats without a player stay zero
+        key <<= (self.board.max_players - state.num_players) * self.board.tokens_per_player * width
+        for indices in reversed(state.path_indices):
+            for index in reversed(indices):
+                key = key << width | (index + 1)
+        return key
+
+    def decode(self, key, into=None):
+        """The GameState of key. With into, that state is set to key in place and returned."""
+        if into is not None:
+            self.restore(into, key)
+            return into
+        mask = self.token_mask
+        num_players, winner, current_player = self.header(key)
+        path_indices = [[(key >> shift & mask) - 1 for shift in shifts] for shifts in self._shifts[:num_players]]
+        return engine.GameState(num_players, current_player, path_indices, winner=winner, board=self.board)
+
+    def restore(self, state, key, current=None):
+        """Set state, in place, to the position key on the same board and number of players.
+
+        Only tokens whose path index differs are moved, and no new lists are
+        made. current, if given, must be state's own key: the fields that
+        differ are then found from the two keys, so stepping to a nearby
+        position costs about as much as the tokens the step moved.
+        """
+        mask = self.token_mask
+        if current is None:
+            for player_id, (indices, shifts) in enumerate(zip(state.path_indices, self._shifts)):
+                for token_id, shift in enumerate(shifts):
+                    index = (key >> shift & mask) - 1
+                    if indices[token_id] != index:
+                        state.place(player_id, token_id, index)
+        else:
+            width = self.token_bits
+            tokens = self.board.tokens_per_player
+            changed = (key ^ current) & ((1 << self.header_shift) - 1)
+            while changed:
+                # Lowest changed field first
+                field = ((changed & -changed).bit_length() - 1) // width
+                shift = field * width
+                player_id, token_id = divmod(field, tokens)
+                state.place(player_id, token_id, (key >> shift & mask) - 1)
+                changed &= ~(mask << shift)
+        _, state.winner, state.current_player = self.header(key)
+
+    def header(self, key):
+        """(num_players, winner or None, current player) of a key."""
+        header = key >> self.header_shift
+        current_player = header & ((1 << self.player_bits) - 1)
+        header >>= self.player_bits
+        winner = (header & ((1 << self.count_bits) - 1)) - 1
+        return header >> self.count_bits, None if winner < 0 else winner, current_player
+
+    def path_index(self, key, player_id, token_id):
+        return (key >> self._shifts[player_id][token_id] & self.token_mask) - 1
+
+    def to_bytes(self, key):
+        return key.to_bytes(self.size, 'little')
+
+    def from_bytes(self, data):
+        if len(data) != self.size:
+            raise ValueError(f"a packed position on this board is {self.size} bytes, got {len(data)}")
+        key = int.from_bytes(data, 'little')
+        if key >> self.bits:
+            raise ValueError("not a packed position: bits set above the last field")
+        return key
+
+
+@functools.lru_cache(maxsize=None)
+def packing_for(board):
+    return Packing(board)
+
+
+CLASSIC_PACKING = packing_for(CLASSIC)
+
+
+def pack(state):
+    return packing_for(state.rules.board).encode(state)
+
+
+def unpack(key, board=CLASSIC, into=None):
+    # With into, that state (on board) is reused and returned
+    return packing_for(into.rules.board if into is not None else board).decode(key, into)
+
+
+class PackedState:
+    """An immutable position held as its packed key. Equal positions are equal and hash alike."""
+
+    __slots__ = ('key', 'packing')
+
+    def __init__(self, key, board=CLASSIC):
+        self.key = key
+        self.packing = packing_for(board)
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(pack(state), state.rules.board)
+
+    @classmethod
+    def from_bytes(cls, data, board=CLASSIC):
+        return cls(packing_for(board).from_bytes(data), board)
+
+    def __reduce__(self):
+        return PackedState, (self.key, self.packing.board)
+
+    def __eq__(self, other):
+        if not isinstance(other, PackedState):
+            return NotImplemented
+        return self.key == other.key and self.packing is other.packing
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        board = '' if self.packing is CLASSIC_PACKING else f", {self.packing.board!r}"
+        return f"PackedState({self.key:#x}{board})"
+
+    @property
+    def board(self):
+        return self.packing.board
+
+    @property
+    def num_players(self):
+        return self.packing.header(self.key)[0]
+
+    @property
+    def winner(self):
+        return self.packing.header(self.key)[1]
+
+    @property
+    def current_player(self):
+        return self.packing.header(self.key)[2]
+
+    def path_index(self, player_id, token_id):
+        return self.packing.path_index(self.key, player_id, token_id)
+
+    def unpack(self):
+        return self.packing.decode(self.key)
+
+    def to_bytes(self):
+        return self.packing.to_bytes(self.key)
+
+
+def main(argv=None):
+    from .ai import random_positions
+
+    parser = argparse.ArgumentParser(prog='python -m ludo.packed', description=__doc__.splitlines()[0])
+    parser.add_argument('--positions', type=int, default=100000)
+    parser.add_argument('--players', type=int, default=4, choices=(2, 3, 4))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    states = list(random_positions(random.Random(args.seed), args.positions, args.players))
+    start = time.perf_counter()
+    keys = [pack(state) for state in states]
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    decoded = [unpack(key) for key in keys]
+    decode = time.perf_counter() - start
+    state = engine.new_game(args.players)
+    start = time.perf_counter()
+    for key in keys:
+        unpack(key, into=state)
+    restore = time.perf_counter() - start
+    if decoded != states or state != states[-1]:
+        print("round trip failed", file=sys.stderr)
+        return 1
+    lists = sum(sys.getsizeof(state.path_indices) + sum(map(sys.getsizeof, state.path_indices))
+                for state in states) / len(states)
+    print(f"{len(states)} positions, {len(set(keys))} distinct")
+    print(f"pack {len(states) / encode:,.0f}/sec, unpack {len(states) / decode:,.0f}/sec, "
+          f"unpack into a reused state {len(states) / restore:,.0f}/sec")
+    print(f"{CLASSIC_PACKING.bits} bits, {CLASSIC_PACKING.size} bytes stored, "
+          f"{sum(map(sys.getsizeof, keys)) / len(keys):.0f} bytes as an int "
+          f"(path index lists alone: {lists:.0f} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,298 @@
+"""Saving and resuming games: binary snapshots plus an append-only journal.
+
+A save is a pair of files in one directory:
+
+``game.snap``
+    Versioned binary snapshot: seating (names, colours and which seats the
+    computer plays), whose turn it is, the winner and one signed byte per token holding its path index
+    (see ludo.engine). Pixel positions are not stored; the front end
+    recomputes them from the path indices.
+
+``game.journal``
+    Every dice roll, move and passed turn since that snapshot, one 4-byte
+    record each, so autosaving after a move is a single small append.
+
+Both files carry a generation number. A new snapshot gets the next
+generation and then the journal is replaced by an empty one of the same
+generation; a journal whose generation does not match the snapshot predates
+it and is ignored. A crash between the two steps therefore never replays old
+moves onto a newer snapshot.
+
+The old ``ludo_save.json`` format can still be imported with
+load_legacy_json().
+"""
+
+import json
+import os
+import struct
+import tempfile
+
+from . import engine
+from .board import CLASSIC, TOKENS_PER_PLAYER
+
+SNAPSHOT_MAGIC = b'LUDO'
+SNAPSHOT_VERSION = 2
+# magic, version, num_players, current_player, winner (-1 for none), tokens per player, generation
+SNAPSHOT_HEADER = struct.Struct('<4sBBBbBI')
+
+# Per-player flags byte (version 2 onwards)
+FLAG_BOT = 0x01
+
+JOURNAL_MAGIC = b'LJNL'
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct('<4sBI')
+# kind, player, token, dice
+JOURNAL_RECORD = struct.Struct('<BBBB')
+ROLL, MOVE, PASS = 1, 2, 3
+
+# Take a fresh snapshot once the journal holds this many records
+SNAPSHOT_EVERY = 512
+
+
+class SaveFormatError(ValueError):
+    pass
+
+
+def default_save_dir():
+    if os.environ.get('LUDO_SAVE_DIR'):
+        return os.environ['LUDO_SAVE_DIR']
+    base = os.environ.get('XDG_DATA_HOME') or os.path.join(os.path.expanduser('~'), '.local', 'share')
+    return os.path.join(base, 'ludo')
+
+
+def encode_snapshot(state, players, generation=0):
+    if state.board is not CLASSIC:
+        # Path indices of other boards do not fit the format
+        raise ValueError(f"only games on the classic board can be saved, not {state.board!r}")
+    winner = -1 if state.winner is None else state.winner
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, state.num_players,
+                                  state.current_player, winner, TOKENS_PER_PLAYER, generation)]
+    for player in players[:state.num_players]:
+        name = player['name'].encode('utf-8')[:255]
+        flags = FLAG_BOT if player.get('bot') else 0
+        parts.append(bytes(player['color']) + bytes([flags, len(name)]) + name)
+    parts.append(struct.pack(f'<{state.num_players * TOKENS_PER_PLAYER}b',
+                             *(index for indices in state.path_indices for index in indices)))
+    return b''.join(parts)
+
+
+def decode_snapshot(data):
+    """Returns (state, players, generation)."""
+    try:
+        magic, version, num_players, current_player, winner, tokens, generation = \
+            SNAPSHOT_HEADER.unpack_from(data)
+    except struct.error as e:
+        raise SaveFormatError(f"truncated snapshot: {e}") from None
+    if magic != SNAPSHOT_MAGIC:
+        raise SaveFormatError("not a Ludo snapshot")
+    if not 1 <= version <= SNAPSHOT_VERSION:
+        raise SaveFormatError(f"unsupported snapshot version {version}")
+    if tokens != TOKENS_PER_PLAYER:
+        raise SaveFormatError(f"snapshot has {tokens} tokens per player, expected {TOKENS_PER_PLAYER}")
+    offset = SNAPSHOT_HEADER.size
+    players = []
+    try:
+        for _ in range(num_players):
+            color = tuple(data[offset:offset + 3])
+            offset += 3
+            flags = 0
+            if version >= 2:
+                flags = data[offset]
+                offset += 1
+            length = data[offset]
+            name = data[offset + 1:offset + 1 + length].decode('utf-8')
+            offset += 1 + length
+            player = {'name': name, 'color': color}
+            if flags & FLAG_BOT:
+                player['bot'] = True
+            players.append(player)
+        flat = struct.unpack_from(f'<{num_players * TOKENS_PER_PLAYER}b', data, offset)
+    except (IndexError, struct.error, UnicodeDecodeError) as e:
+        raise SaveFormatError(f"corrupt snapshot: {e}") from None
+    path_indices = [list(flat[i:i + TOKENS_PER_PLAYER]) for i in range(0, len(flat), TOKENS_PER_PLAYER)]
+    state = _checked_state(num_players, current_player, path_indices, None if winner < 0 else winner)
+    return state, players, generation
+
+
+def _checked_state(num_players, current_player, path_indices, winner=None):
+    # A corrupt save fails here instead of with an IndexError deep in the engine
+    if not 2 <= num_players <= CLASSIC.max_players:
+        raise SaveFormatError(f"bad player count {num_players}")
+    if not 0 <= current_player < num_players:
+        raise SaveFormatError(f"bad current player {current_player}")
+    if winner is not None and not 0 <= winner < num_players:
+        raise SaveFormatError(f"bad winner {winner}")
+    if len(path_indices) != num_players or any(len(indices) != TOKENS_PER_PLAYER for indices in path_indices):
+        raise SaveFormatError(f"expected {TOKENS_PER_PLAYER} tokens for each of {num_players} players")
+    for indices in path_indices:
+        for index in indices:
+            if type(index) is not int or not engine.IN_YARD <= index <= engine.FINISHED:
+                raise SaveFormatError(f"bad path index {index!r}")
+    return engine.GameState(num_players, current_player, path_indices, winner=winner)
+
+
+def load_legacy_json(path):
+    """Import a ludo_save.json written by older versions. Returns (state, players).
+
+    token_positions is derived data and is ignored. Old versions put a token
+    back to -1 with token_is_home set both when it was captured and when it
+    finished, and let such a token re-enter on a 6 either way, so it is
+    imported in the yard. A token flagged home that still has a path index
+    finished there and is imported as finished.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        players = [{'name': player['name'], 'color': tuple(player['color'])} for player in data['players']]
+        num_players = data['num_players']
+        path_indices = [list(indices) for indices in data['token_path_indices']]
+        is_home = data.get('token_is_home')
+    except (TypeError, AttributeError) as e:
+        raise SaveFormatError(f"corrupt legacy save: {e}") from None
+    if is_home is not None:
+        if len(is_home) != len(path_indices):
+            raise SaveFormatError("token_is_home does not match token_path_indices")
+        for indices, home_flags in zip(path_indices, is_home):
+            if len(home_flags) != len(indices):
+                raise SaveFormatError("token_is_home does not match token_path_indices")
+            for token_id, home in enumerate(home_flags):
+                if home and indices[token_id] != engine.IN_YARD:
+                    indices[token_id] = engine.FINISHED
+                elif not home and indices[token_id] == engine.IN_YARD:
+                    raise SaveFormatError("token off the board but not flagged home")
+    if type(num_players) is not int or len(players) < num_players:
+        raise SaveFormatError(f"bad player count {num_players!r}")
+    current_player = data.get('current_player_idx', 0)
+    if type(current_player) is not int:
+        raise SaveFormatError(f"bad current player {current_player!r}")
+    return _checked_state(num_players, current_player, path_indices), players
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path) or '.'
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except OSError:
+        os.unlink(tmp)
+        raise
+
+
+def read_journal(path):
+    """Returns (generation, [(kind, player, token, dice), ...]).
+
+    A torn record at the end (from a crash mid-write) is dropped.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        magic, version, generation = JOURNAL_HEADER.unpack_from(data)
+    except struct.error:
+        raise SaveFormatError("truncated journal header") from None
+    if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+        raise SaveFormatError("not a Ludo journal")
+    body = data[JOURNAL_HEADER.size:]
+    usable = len(body) - len(body) % JOURNAL_RECORD.size
+    return generation, list(JOURNAL_RECORD.iter_unpack(body[:usable]))
+
+
+def replay(state, records):
+    """Apply journal records to state. Returns the pending dice roll, or None.
+
+    A roll that was not followed by a move or pass is still waiting for the
+    player to pick a token.
+    """
+    pending = None
+    for kind, player_id, token_id, dice_roll in records:
+        if kind == ROLL:
+            pending = dice_roll
+        elif kind == MOVE:
+            engine.apply_move(state, player_id, token_id, dice_roll)
+            pending = None
+        elif kind == PASS:
+            engine.pass_turn(state, dice_roll)
+            pending = None
+        else:
+            raise SaveFormatError(f"unknown journal record kind {kind}")
+    return pending
+
+
+class SaveStore:
+    """Snapshot and journal for the game being played, kept in one directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, 'game.snap')
+        self.journal_path = os.path.join(directory, 'game.journal')
+        self.generation = 0
+        self.journal_records = 0
+        self._journal = None
+
+    def has_save(self):
+        return os.path.exists(self.snapshot_path)
+
+    def start(self, state, players):
+        """Write a snapshot of state and begin a new, empty journal."""
+        os.makedirs(self.directory, exist_ok=True)
+        self.generation += 1
+        _write_atomic(self.snapshot_path, encode_snapshot(state, players, self.generation))
+        _write_atomic(self.journal_path, JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, self.generation))
+        self._open_journal()
+        self.journal_records = 0
+
+    def _open_journal(self):
+        self.close()
+        self._journal = open(self.journal_path, 'ab', buffering=0)
+
+    def _append(self, kind, player_id, token_id, dice_roll):
+        if self._journal is None:
+            return
+        self._journal.write(JOURNAL_RECORD.pack(kind, player_id, token_id, dice_roll))
+        self.journal_records += 1
+
+    def record_roll(self, player_id, dice_roll):
+        self._append(ROLL, player_id, 0, dice_roll)
+
+    def record_move(self, player_id, token_id, dice_roll):
+        self._append(MOVE, player_id, token_id, dice_roll)
+
+    def record_pass(self, player_id, dice_roll):
+        self._append(PASS, player_id, 0, dice_roll)
+
+    def needs_snapshot(self):
+        return self.journal_records >= SNAPSHOT_EVERY
+
+    def resume(self):
+        """Load the snapshot and replay the journal tail.
+
+        Returns (state, players, pending_dice). Further records are appended
+        to the same journal.
+        """
+        with open(self.snapshot_path, 'rb') as f:
+            state, players, generation = decode_snapshot(f.read())
+        self.generation = generation
+        try:
+            journal_generation, records = read_journal(self.journal_path)
+        except (OSError, SaveFormatError):
+            journal_generation, records = None, []
+        if journal_generation != generation:
+            # Missing, unreadable or older than the snapshot, which already holds its moves
+            self.start(state, players)
+            return state, players, None
+        try:
+            pending = replay(state, records)
+        except engine.IllegalMoveError as e:
+            raise SaveFormatError(f"journal does not match snapshot: {e}") from None
+        # Cut off a torn record so new appends stay aligned
+        with open(self.journal_path, 'r+b') as f:
+            f.truncate(JOURNAL_HEADER.size + len(records) * JOURNAL_RECORD.size)
+        self._open_journal()
+        self.journal_records = len(records)
+        return state, players, pending
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -0,0 +1,167 @@
+"""Per-frame timing for the render loop, with Chrome trace export.
+
+Functions are instrumented with the timed() decorator and the main loop
+marks its own phases (events, logic, render, present) with phase(), so no
+code has to be re-indented into ``with`` blocks:
+
+    profiler = FrameProfiler()
+
+    @profiler.timed()
+    def draw_tokens(surface): ...
+
+    profiler.begin_frame()
+    profiler.phase('events')
+    ...
+    profiler.end_frame()
+
+While the profiler is disabled every hook returns after one attribute check,
+so it can stay in the code permanently. summary() averages the last WINDOW
+frames for an on-screen display; start_trace() records the next N frames and
+finish_trace() writes them as Chrome trace-event JSON (open it in
+chrome://tracing or https://ui.perfetto.dev).
+"""
+
+import functools
+import json
+import os
+import time
+from collections import deque
+
+WINDOW = 60
+
+
+class FrameProfiler:
+    def __init__(self, window=WINDOW):
+        self.enabled = False
+        # Whether the on-screen display asked for timing; tracing also turns it on
+        self.hud = False
+        self.frames = deque(maxlen=window)
+        self.frame_starts = deque(maxlen=window)
+        self._frame = None
+        self._frame_start = 0
+        self._phase = None
+        self._phase_start = 0
+        # Trace being recorded: events, frames left and the output path
+        self._trace = None
+        self._trace_frames = 0
+        self._trace_path = None
+        # Events of a trace that reached its frame count, waiting for finish_trace()
+        self._finished = None
+        self._epoch = time.perf_counter_ns()
+
+    def _update_enabled(self):
+        self.enabled = self.hud or self._trace is not None
+
+    def set_hud(self, on):
+        self.hud = on
+        self._update_enabled()
+
+    # --- Recording ---
+    def _record(self, name, start, end):
+        if self._frame is not None:
+            self._frame[name] = self._frame.get(name, 0) + end - start
+        if self._trace is not None:
+            self._trace.append({'name': name, 'ph': 'X', 'pid': os.getpid(), 'tid': 1,
+                                'ts': (start - self._epoch) / 1000, 'dur': (end - start) / 1000})
+
+    def timed(self, name=None):
+        """Decorator timing every call of a function under name (default: its name)."""
+        def decorate(fn):
+            label = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                start = time.perf_counter_ns()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._record(label, start, time.perf_counter_ns())
+            return wrapper
+        return decorate
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self._frame = {}
+        self._frame_start = time.perf_counter_ns()
+
+    def phase(self, name):
+        """End the current loop phase, if any, and start the next one."""
+        if self._frame is None:
+            return
+        now = time.perf_counter_ns()
+        if self._phase is not None:
+            self._record(self._phase, self._phase_start, now)
+        self._phase = name
+        self._phase_start = now
+
+    def end_frame(self):
+        if self._frame is None:
+            return
+        self.phase(None)
+        end = time.perf_counter_ns()
+        self._record('frame', self._frame_start, end)
+        self.frames.append(self._frame)
+        self.frame_starts.append(self._frame_start)
+        self._frame = None
+        if self._trace is not None:
+            self._trace_frames -= 1
+            if self._trace_frames <= 0:
+                self._finished = self._trace
+                self._trace = None
+                self._update_enabled()
+
+    # --- Reporting ---
+    def summary(self, top=4):
+        """Returns (average frame ms, frames per second, [(phase, average ms), ...]).
+
+        Phases are the most expensive top entries; nested timings are
+        inclusive, so a function also counts towards the phase it ran in.
+        """
+        if not self.frames:
+            return 0.0, 0.0, []
+        count = len(self.frames)
+        totals = {}
+        for frame in self.frames:
+            for name, ns in frame.items():
+                totals[name] = totals.get(name, 0) + ns
+        frame_ms = totals.pop('frame', 0) / count / 1e6
+        span = self.frame_starts[-1] - self.frame_starts[0]
+        fps = (count - 1) * 1e9 / span if span else 0.0
+        phases = sorted(((name, ns / count / 1e6) for name, ns in totals.items()), key=lambda item: -item[1])
+        return frame_ms, fps, phases[:top]
+
+    # --- Trace export ---
+    def start_trace(self, frames, path):
+        """Record the next frames frames for finish_trace() to write to path as trace-event JSON."""
+        self._trace = []
+        self._trace_frames = frames
+        self._trace_path = path
+        self._update_enabled()
+
+    @property
+    def tracing(self):
+        return self._trace is not None
+
+    @property
+    def trace_ready(self):
+        # The trace has all its frames and can be written with finish_trace()
+        return self._finished is not None
+
+    def finish_trace(self):
+        """Write the trace recorded so far. Returns its path, or None if there is none.
+
+        Written files can be large, so writing is left to the caller rather
+        than done in the middle of a frame.
+        """
+        events = self._finished if self._finished is not None else self._trace
+        if events is None:
+            return None
+        path = self._trace_path
+        self._trace = self._finished = None
+        self._update_enabled()
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return path
@@ -0,0 +1,202 @@
+"""Game recordings and a seekable replay engine.
+
+A recording holds everything needed to re-run one game without pygame: the
+dice seed (when known), the starting position and seating as a
+persistence snapshot, and every move and passed turn in order:
+
+    header      RECORDING_HEADER: magic, version, seed (-1 if unknown), snapshot length
+    snapshot    persistence.encode_snapshot() of the starting position
+    records     persistence.JOURNAL_RECORD each, MOVE or PASS with its dice value
+
+Records are appended as the game is played, so a crash loses at most the
+move being written; a torn record at the end is ignored when reading.
+
+Replay re-applies the records with ludo.engine and keeps a keyframe of the
+token path indices every KEYFRAME_INTERVAL moves (is_home follows from the
+path index, see ludo.engine), so seeking to any move costs at most one
+keyframe interval of moves.
+
+Usage:
+    python -m ludo.replay game.ludorec
+    python -m ludo.replay game.ludorec --at 120
+"""
+
+import argparse
+import os
+import struct
+import time
+
+from . import engine, persistence
+from .persistence import JOURNAL_RECORD, MOVE, PASS, SaveFormatError
+
+RECORDING_MAGIC = b'LREC'
+RECORDING_VERSION = 1
+RECORDING_HEADER = struct.Struct('<4sBqI')
+RECORDING_SUFFIX = '.ludorec'
+
+KEYFRAME_INTERVAL = 64
+
+
+def default_recording_dir():
+    return os.path.join(persistence.default_save_dir(), 'recordings')
+
+
+class Recording:
+    __slots__ = ('seed', 'state', 'players', 'records')
+
+    def __init__(self, seed, state, players, records):
+        # Dice seed, or None if the dice came from elsewhere (a server)
+        self.seed = seed
+        # Position the recording starts from
+        self.state = state
+        self.players = players
+        # [(kind, player, token, dice), ...] with kind MOVE or PASS
+        self.records = records
+
+
+def read_recording(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        magic, version, seed, snapshot_length = RECORDING_HEADER.unpack_from(data)
+    except struct.error:
+        raise SaveFormatError("truncated recording header") from None
+    if magic != RECORDING_MAGIC:
+        raise SaveFormatError("not a Ludo recording")
+    if version != RECORDING_VERSION:
+        raise SaveFormatError(f"unsupported recording version {version}")
+    body_start = RECORDING_HEADER.size + snapshot_length
+    state, players, _ = persistence.decode_snapshot(data[RECORDING_HEADER.size:body_start])
+    body = data[body_start:]
+    usable = len(body) - len(body) % JOURNAL_RECORD.size
+    records = list(JOURNAL_RECORD.iter_unpack(body[:usable]))
+    return Recording(None if seed < 0 else seed, state, players, records)
+
+
+class Recorder:
+    """Appends one game to a recording file as it is played."""
+
+    def __init__(self, path, state, players, seed=None):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        snapshot = persistence.encode_snapshot(state, players)
+        self.path = path
+        self.moves = 0
+        self._file = open(path, 'wb', buffering=0)
+        self._file.write(RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION,
+                                               -1 if seed is None else seed, len(snapshot)) + snapshot)
+
+    def record_move(self, player_id, token_id, dice_roll):
+        self._file.write(JOURNAL_RECORD.pack(MOVE, player_id, token_id, dice_roll))
+        self.moves += 1
+
+    def record_pass(self, player_id, dice_roll):
+        self._file.write(JOURNAL_RECORD.pack(PASS, player_id, 0, dice_roll))
+        self.moves += 1
+
+    def close(self):
+        self._file.close()
+
+
+def new_recording_path(directory=None):
+    directory = directory or default_recording_dir()
+    name = time.strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(directory, name + RECORDING_SUFFIX)
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(directory, f"{name}-{n}{RECORDING_SUFFIX}")
+    return path
+
+
+class Replay:
+    """Steps through a recording; seek() jumps to any move number.
+
+    state is the position after the first ``position`` moves. Treat it as
+    read-only: seek() may replace it with a new object.
+    """
+
+    def __init__(self, recording, keyframe_interval=KEYFRAME_INTERVAL):
+        self.recording = recording
+        self.records = recording.records
+        self.interval = keyframe_interval
+        # keyframes[i] is the position after i * interval moves
+        self.keyframes = []
+        self.state = recording.state.copy()
+        self.position = 0
+        # Index the whole game once so every later seek is bounded by the interval
+        self.keyframes.append(self._keyframe())
+        while self.position < len(self.records):
+            self.step()
+        self.seek(0)
+
+    def __len__(self):
+        return len(self.records)
+
+    def _keyframe(self):
+        state = self.state
+        return state.current_player, state.winner, tuple(tuple(indices) for indices in state.path_indices)
+
+    def _restore(self, k):
+        current_player, winner, path_indices = self.keyframes[k]
+        self.state = engine.GameState(self.recording.state.num_players, current_player,
+                                      [list(indices) for indices in path_indices], winner=winner)
+        self.position = k * self.interval
+
+    def step(self):
+        """Apply the next record. Returns its events, or [] at the end."""
+        if self.position >= len(self.records):
+            return []
+        kind, player_id, token_id, dice_roll = self.records[self.position]
+        try:
+            if kind == MOVE:
+                events = engine.apply_move(self.state, player_id, token_id, dice_roll)
+            elif kind == PASS:
+                events = engine.pass_turn(self.state, dice_roll)
+            else:
+                raise SaveFormatError(f"unknown record kind {kind} at move {self.position}")
+        except engine.IllegalMoveError as e:
+            raise SaveFormatError(f"move {self.position} does not fit the game: {e}") from None
+        self.position += 1
+        if self.position % self.interval == 0 and self.position // self.interval == len(self.keyframes):
+            self.keyframes.append(self._keyframe())
+        return events
+
+    def seek(self, position):
+        position = max(0, min(position, len(self.records)))
+        if position < self.position or position - self.position > self.interval:
+            self._restore(min(position // self.interval, len(self.keyframes) - 1))
+        while self.position < position:
+            self.step()
+
+    def last_dice(self):
+        # Dice value of the most recent record, or None at the start
+        return self.records[self.position - 1][3] if self.position else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.replay', description=__doc__.splitlines()[0])
+    parser.add_argument('recording')
+    parser.add_argument('--at', type=int, default=None, help="print the position after this many moves")
+    parser.add_argument('--interval', type=int, default=KEYFRAME_INTERVAL, help="moves between keyframes")
+    args = parser.parse_args(argv)
+
+    recording = read_recording(args.recording)
+    start = time.perf_counter()
+    replay = Replay(recording, args.interval)
+    indexed = time.perf_counter() - start
+    names = ', '.join(player['name'] for player in recording.players)
+    print(f"players: {names}")
+    print(f"seed: {recording.seed if recording.seed is not None else 'unknown'}")
+    replay.seek(len(replay))
+    winner = replay.state.winner
+    print(f"moves: {len(replay)}, winner: {recording.players[winner]['name'] if winner is not None else 'none yet'}")
+    if indexed:
+        print(f"replayed at {len(replay) / indexed:,.0f} moves/sec, {len(replay.keyframes)} keyframes")
+    if args.at is not None:
+        replay.seek(args.at)
+        print(f"after move {replay.position}: {replay.state}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
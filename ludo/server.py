@@ -0,0 +1,289 @@
+"""Multiplayer server: many Ludo rooms in one asyncio process.
+
+Clients talk newline-delimited JSON over TCP. The server owns the dice and
+the rules (ludo.engine); clients only ask to roll or to move a token and are
+sent small deltas describing what happened.
+
+Client -> server:
+
+    {"type": "join", "room": "abc", "name": "Ann", "seats": 4}
+        Join room "abc", creating it with 2-4 seats if it does not exist.
+    {"type": "roll"}
+    {"type": "move", "token": 2}
+
+Server -> client:
+
+    {"type": "joined", "room": "abc", "seat": 1, "seats": 4, "players": ["Bob", "Ann"]}
+    {"type": "player", "seat": 2, "name": "Cy"}        someone else joined
+    {"type": "start", "current": 0}                     every seat is taken
+    {"type": "dice", "seat": 0, "value": 6, "movable": 5}
+        movable is a bitmask of the tokens that can move (engine.movable_mask)
+    {"type": "pass", "seat": 0, "next": 1}              no legal move
+    {"type": "move", "seat": 0, "token": 2, "to": 17, "next": 1,
+     "captures": [[1, 3]], "winner": 0}
+        captures and winner are only present when something was captured or won
+    {"type": "left", "seat": 2}                         the room is closed
+    {"type": "error", "message": "..."}
+
+Every game's events can be exported as NDJSON for analytics (see
+ludo.events); game ids are "room-SEED-N" for the Nth room the server opened.
+
+Usage:
+    python -m ludo.server --port 8765
+    python -m ludo.server --port 8765 --events events/
+"""
+
+import argparse
+import asyncio
+import json
+import random
+
+from . import engine
+from .board import MAX_PLAYERS
+from .dice import GameDice
+from .events import EventLog, GameEvents
+
+DEFAULT_PORT = 8765
+MAX_LINE = 4096
+MAX_NAME = 20
+
+_encoder = json.JSONEncoder(separators=(',', ':'))
+
+
+def encode(message):
+    return _encoder.encode(message).encode() + b'\n'
+
+
+def move_message(events, seat, token_id, state):
+    """Delta for one move, built from the events apply_move() returned."""
+    message = {'type': 'move', 'seat': seat, 'token': token_id,
+               'to': state.path_indices[seat][token_id], 'next': state.current_player}
+    captures = [[event.victim, event.victim_token] for event in events
+                if isinstance(event, engine.TokenCaptured)]
+    if captures:
+        message['captures'] = captures
+    if state.winner is not None:
+        message['winner'] = state.winner
+    return message
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class Room:
+    __slots__ = ('name', 'seats', 'connections', 'names', 'state', 'dice', 'game_dice', 'events', 'started', 'closed')
+
+    def __init__(self, name, seats, game_dice, events=None):
+        self.name = name
+        self.seats = seats
+        self.connections = []
+        self.names = []
+        self.state = engine.new_game(seats)
+        # Dice rolled but not yet used, or None
+        self.dice = None
+        self.game_dice = game_dice
+        # events.GameEvents for the export, or None
+        self.events = events
+        self.started = False
+        self.closed = False
+
+    def broadcast(self, message):
+        data = encode(message)
+        for connection in self.connections:
+            connection.send(data)
+
+    def join(self, connection, name):
+        if self.started or self.closed:
+            raise ProtocolError(f"room {self.name} is full")
+        seat = len(self.connections)
+        self.broadcast({'type': 'player', 'seat': seat, 'name': name})
+        self.connections.append(connection)
+        self.names.append(name)
+        connection.send(encode({'type': 'joined', 'room': self.name, 'seat': seat,
+                                'seats': self.seats, 'players': self.names}))
+        if len(self.connections) == self.seats:
+            self.started = True
+            if self.events is not None:
+                self.events.start(self.state, room=self.name)
+            self.broadcast({'type': 'start', 'current': self.state.current_player})
+        return seat
+
+    def _check_turn(self, seat):
+        if not self.started:
+            raise ProtocolError("waiting for players")
+        if self.state.winner is not None:
+            raise ProtocolError("the game is over")
+        if seat != self.state.current_player:
+            raise ProtocolError("not your turn")
+
+    def roll(self, seat):
+        self._check_turn(seat)
+        if self.dice is not None:
+            raise ProtocolError("already rolled")
+        dice_roll = self.game_dice.roll(seat)
+        movable = engine.movable_mask(self.state, seat, dice_roll)
+        self.broadcast({'type': 'dice', 'seat': seat, 'value': dice_roll, 'movable': movable})
+        if movable:
+            self.dice = dice_roll
+            if self.events is not None:
+                self.events.roll(seat, dice_roll)
+        else:
+            events = engine.pass_turn(self.state, dice_roll)
+            if self.events is not None:
+                self.events.turn(seat, dice_roll, events)
+            self.broadcast({'type': 'pass', 'seat': seat, 'next': self.state.current_player})
+
+    def move(self, seat, token_id):
+        self._check_turn(seat)
+        if self.dice is None:
+            raise ProtocolError("roll first")
+        # bool is an int subclass, so JSON true would otherwise pass as token 1
+        if type(token_id) is not int or not 0 <= token_id < len(self.state.path_indices[seat]):
+            raise ProtocolError("no such token")
+        try:
+            events = engine.apply_move(self.state, seat, token_id, self.dice)
+        except engine.IllegalMoveError as e:
+            raise ProtocolError(str(e)) from None
+        self.dice = None
+        if self.events is not None:
+            self.events.record(events)
+        self.broadcast(move_message(events, seat, token_id, self.state))
+
+    def leave(self, connection):
+        # Play cannot go on with an empty seat, so the room closes
+        seat = self.connections.index(connection)
+        self.connections.remove(connection)
+        self.closed = True
+        self.broadcast({'type': 'left', 'seat': seat})
+
+
+class Connection:
+    __slots__ = ('writer', 'room', 'seat', 'pending')
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.room = None
+        self.seat = None
+        self.pending = []
+
+    def send(self, data):
+        # Messages queued during one event loop pass go out in a single write
+        if not self.pending:
+            asyncio.get_running_loop().call_soon(self.flush)
+        self.pending.append(data)
+
+    def flush(self):
+        data = b''.join(self.pending)
+        self.pending.clear()
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+
+class LudoServer:
+    def __init__(self, seed=None, event_log=None):
+        self.rooms = {}
+        # Room n rolls GameDice(seed, 'room', n), so a seeded server replays its dice
+        self.seed = random.SystemRandom().getrandbits(63) if seed is None else seed
+        self.rooms_opened = 0
+        # events.EventLog every room's game goes to, or None
+        self.event_log = event_log
+        self.connections = 0
+        self.moves = 0
+
+    def dispatch(self, connection, message):
+        kind = message.get('type')
+        if kind == 'join':
+            if connection.room is not None:
+                raise ProtocolError("already in a room")
+            name = str(message.get('room', ''))[:MAX_NAME]
+            room = self.rooms.get(name)
+            if room is None or room.closed:
+                seats = message.get('seats', MAX_PLAYERS)
+                if type(seats) is not int or not 2 <= seats <= MAX_PLAYERS:
+                    raise ProtocolError(f"seats must be between 2 and {MAX_PLAYERS}")
+                # Each room gets its own dice streams
+                number = self.rooms_opened
+                events = None
+                if self.event_log is not None:
+                    events = GameEvents(self.event_log, f"room-{self.seed}-{number}")
+                room = self.rooms[name] = Room(name, seats, GameDice(self.seed, 'room', number), events)
+                self.rooms_opened += 1
+            connection.seat = room.join(connection, str(message.get('name', 'Player'))[:MAX_NAME])
+            connection.room = room
+        elif connection.room is None:
+            raise ProtocolError("join a room first")
+        elif kind == 'roll':
+            connection.room.roll(connection.seat)
+        elif kind == 'move':
+            connection.room.move(connection.seat, message.get('token'))
+            self.moves += 1
+        else:
+            raise ProtocolError(f"unknown message type {kind!r}")
+
+    async def handle(self, reader, writer):
+        connection = Connection(writer)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    # Line longer than the stream limit, or the peer went away
+                    break
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ProtocolError("expected a JSON object")
+                    self.dispatch(connection, message)
+                except (ValueError, ProtocolError) as e:
+                    connection.send(encode({'type': 'error', 'message': str(e)}))
+                # Back off while this client is not reading its messages
+                await writer.drain()
+        finally:
+            self.connections -= 1
+            room = connection.room
+            if room is not None:
+                room.leave(connection)
+                if not room.connections and self.rooms.get(room.name) is room:
+                    del self.rooms[room.name]
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=DEFAULT_PORT, ready=None):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_LINE)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.server', description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="0 picks a free port")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the dice, for reproducible runs")
+    parser.add_argument('--events', metavar='DIR', help="export every game's events to NDJSON files in DIR")
+    args = parser.parse_args(argv)
+
+    event_log = None
+    if args.events:
+        try:
+            event_log = EventLog(args.events, prefix='server')
+        except OSError as e:
+            parser.exit(1, f"ludo.server: cannot write events to {args.events}: {e}\n")
+    server = LudoServer(args.seed, event_log)
+    ready = lambda port: print(f"listening on {args.host}:{port}", flush=True)
+    try:
+        asyncio.run(server.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if event_log is not None:
+            event_log.close()
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,43 @@
+"""Move-selection strategies for bots and simulations.
+
+A strategy is a callable ``choose(state, player_id, dice_roll, movable, rng)``
+that returns one token id from ``movable`` (a non-empty tuple of legal tokens,
+see engine.movable_tokens). ``rng`` is a ``random.Random`` owned by the caller,
+so games stay reproducible from their seed.
+"""
+
+from . import engine
+from .ai import search_strategy
+
+
+def random_move(state, player_id, dice_roll, movable, rng):
+    return rng.choice(movable)
+
+
+def furthest(state, player_id, dice_roll, movable, rng):
+    # Always advance the token that is furthest along; yard tokens count as -1
+    indices = state.path_indices[player_id]
+    return max(movable, key=lambda token_id: indices[token_id])
+
+
+def prefer_kills(state, player_id, dice_roll, movable, rng):
+    kills = [token_id for token_id in movable if engine.would_capture(state, player_id, token_id, dice_roll)]
+    return furthest(state, player_id, dice_roll, kills or movable, rng)
+
+
+def leave_home(state, player_id, dice_roll, movable, rng):
+    # Bring a new token out whenever a 6 allows it
+    indices = state.path_indices[player_id]
+    for token_id in movable:
+        if indices[token_id] == engine.IN_YARD:
+            return token_id
+    return furthest(state, player_id, dice_roll, movable, rng)
+
+
+STRATEGIES = {
+    'random': random_move,
+    'furthest': furthest,
+    'kill': prefer_kills,
+    'leave_home': leave_home,
+    'search': search_strategy,
+}
@@ -0,0 +1,384 @@
+"""Endgame tablebase: exact win chances once every token is on its home column.
+
+A token on the last arm_length squares of its path (its home column) can no
+longer be captured: no other player ever lands there. In a two-player game
+where neither player has a token anywhere else, the game is a pure race
+that can be solved exactly under the real rules (exact finish, another roll
+after a 6). A player's side of such a position is the sorted tuple of its
+tokens' distances to the finish, 0 to arm_length, and the table holds, for
+every (mover, opponent) pair of sides, the mover's chance of winning before
+rolling and the best move for each roll.
+
+A move lowers the mover's total distance. A pass (no legal move) leaves the
+tokens where they are and, unless the roll was a 6, hands the turn over, so
+a pair and its mirror image depend on each other through passes and are
+solved together as a 2x2 linear system. Pairs are solved level by level in
+increasing total distance, so every move reads a level already written.
+
+The file is TABLEBASE_HEADER followed by one RECORD per pair, at index
+mover rank * number of sides + opponent rank. The generator solves each
+level on a pool of worker processes that read the levels below through the
+same file; after every level it flushes and bumps levels_done in the
+header, so an interrupted run picks up where it stopped. Lookups mmap the
+file and read single records, so the table never has to fit in memory:
+
+    table = Tablebase(default_tablebase_path())
+    if table.covers(state):
+        table.win_rates(state), table.best_move(state, dice_roll)
+
+Tables depend only on the arm length and the tokens per player, so one
+table serves boards with any number of arms.
+
+Usage:
+    python -m ludo.tablebase
+    python -m ludo.tablebase --arm-length 8 --tokens 4 --workers 4
+"""
+
+import argparse
+import functools
+import itertools
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .board import CLASSIC, make_board
+from .persistence import default_save_dir
+
+TABLEBASE_MAGIC = b'LDTB'
+TABLEBASE_VERSION = 1
+# magic, version, arm length, tokens per player, levels written, record size
+TABLEBASE_HEADER = struct.Struct('<4sHBBII')
+# The mover's chance of winning before rolling, then for each roll 1-6 the
+# distance of the token to move (0: no legal move)
+RECORD = struct.Struct('<d6B2x')
+
+
+class TablebaseError(ValueError):
+    pass
+
+
+def default_tablebase_path(arm_length=CLASSIC.arm_length, tokens_per_player=CLASSIC.tokens_per_player):
+    return os.path.join(default_save_dir(), f'endgame-{arm_length}-{tokens_per_player}.ludotb')
+
+
+class _Sides:
+    # Every side (sorted distances of a player's tokens) with its rank, and
+    # the ranks grouped by total distance
+
+    def __init__(self, arm_length, tokens):
+        self.sides = tuple(itertools.combinations_with_replacement(range(arm_length + 1), tokens))
+        self.ranks = {side: rank for rank, side in enumerate(self.sides)}
+        self.by_total = [[] for _ in range(arm_length * tokens + 1)]
+        for rank, side in enumerate(self.sides):
+            self.by_total[sum(side)].append(rank)
+
+
+@functools.lru_cache(maxsize=None)
+def _sides(arm_length, tokens):
+    return _Sides(arm_length, tokens)
+
+
+def level_count(arm_length, tokens):
+    return 2 * arm_length * tokens + 1
+
+
+def table_size(arm_length, tokens):
+    return TABLEBASE_HEADER.size + len(_sides(arm_length, tokens).sides) ** 2 * RECORD.size
+
+
+def _moves(side, dice_roll):
+    # (distance of the token moved, side afterwards) for every distinct legal move
+    moves = []
+    for i, distance in enumerate(side):
+        if distance >= dice_roll and (i == 0 or side[i - 1] != distance):
+            moves.append((distance, tuple(sorted(side[:i] + side[i + 1:] + (distance - dice_roll,)))))
+    return moves
+
+
+class Tablebase:
+    """A tablebase file, memory-mapped read-only.
+
+    Raises TablebaseError if the file is not a complete tablebase; partial
+    opens the tables a generator is still writing, for its workers.
+    """
+
+    def __init__(self, path, partial=False):
+        with open(path, 'rb') as f:
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise TablebaseError(f"{path} is empty") from None
+        try:
+            magic, version, arm_length, tokens, levels, record_size = TABLEBASE_HEADER.unpack_from(self._map)
+        except struct.error:
+            self._map.close()
+            raise TablebaseError(f"{path} is not a tablebase") from None
+        problem = None
+        if magic != TABLEBASE_MAGIC:
+            problem = "is not a tablebase"
+        elif version != TABLEBASE_VERSION or record_size != RECORD.size:
+            problem = f"has unsupported version {version}"
+        elif len(self._map) != table_size(arm_length, tokens):
+            problem = "is truncated"
+        elif levels < level_count(arm_length, tokens) and not partial:
+            problem = "is incomplete; run python -m ludo.tablebase again to finish it"
+        if problem:
+            self._map.close()
+            raise TablebaseError(f"{path} {problem}")
+        self.path = path
+        self.arm_length = arm_length
+        self.tokens_per_player = tokens
+        self._sides = _sides(arm_length, tokens)
+        self._count = len(self._sides.sides)
+
+    def __repr__(self):
+        return f"Tablebase({self.path!r}, arm_length={self.arm_length}, tokens_per_player={self.tokens_per_player})"
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # --- Sides ---
+    def record(self, mover, opponent):
+        """(mover's chance of winning, best distance to move for each roll) of a pair of sides."""
+        ranks = self._sides.ranks
+        chance, *moves = RECORD.unpack_from(self._map, TABLEBASE_HEADER.size
+                                            + (ranks[mover] * self._count + ranks[opponent]) * RECORD.size)
+        return chance, moves
+
+    def chance(self, mover, opponent):
+        ranks = self._sides.ranks
+        return RECORD.unpack_from(self._map, TABLEBASE_HEADER.size
+                                  + (ranks[mover] * self._count + ranks[opponent]) * RECORD.size)[0]
+
+    def chance_after(self, side, opponent, dice_roll):
+        # The mover's chance once it has moved to side by dice_roll
+        if not any(side):
+            return 1.0
+        if dice_roll == 6:
+            return self.chance(side, opponent)
+        return 1.0 - self.chance(opponent, side)
+
+    # --- Game states ---
+    def covers(self, state):
+        """Whether state is a two-player game in progress with every token on its home column or finished."""
+        board = state.rules.board
+        if (state.num_players != 2 or state.winner is not None or board.arm_length != self.arm_length
+                or board.tokens_per_player != self.tokens_per_player):
+            return False
+        start = state.rules.finished - self.arm_length
+        return all(index >= start for indices in state.path_indices for index in indices)
+
+    def _sides_of(self, state):
+        # (mover's side, opponent's side) of a covered state
+        finished = state.rules.finished
+        sides = [tuple(sorted(finished - index for index in indices)) for indices in state.path_indices]
+        return sides[state.current_player], sides[1 - state.current_player]
+
+    def _token(self, state, distance):
+        return state.path_indices[state.current_player].index(state.rules.finished - distance)
+
+    def win_rates(self, state):
+        """Each player's chance of winning, before the player to move rolls."""
+        chance = self.chance(*self._sides_of(state))
+        return (chance, 1.0 - chance) if state.current_player == 0 else (1.0 - chance, chance)
+
+    def best_move(self, state, dice_roll):
+        """Token the player to move should move by dice_roll, or None if none can move."""
+        distance = self.record(*self._sides_of(state))[1][dice_roll - 1]
+        return self._token(state, distance) if distance else None
+
+    def move_chances(self, state, dice_roll):
+        """token -> the mover's chance of winning after moving it by dice_roll, one token per square."""
+        mover, opponent = self._sides_of(state)
+        return {self._token(state, distance): self.chance_after(side, opponent, dice_roll)
+                for distance, side in _moves(mover, dice_roll)}
+
+    def pass_chance(self, state, dice_roll):
+        # The mover's chance after passing with no legal move for dice_roll
+        mover, opponent = self._sides_of(state)
+        if dice_roll == 6:
+            return self.chance(mover, opponent)
+        return 1.0 - self.chance(opponent, mover)
+
+    # --- Generation ---
+    def _expand(self, mover, opponent):
+        # Best value summed over the rolls that have a move, rolls other than
+        # 6 with no move, 1 if a 6 has no move, and the best distance per roll
+        total = 0.0
+        passes = six_passes = 0
+        best_moves = []
+        for dice_roll in range(1, 7):
+            best, best_distance = None, 0
+            for distance, side in _moves(mover, dice_roll):
+                value = self.chance_after(side, opponent, dice_roll)
+                if best is None or value > best:
+                    best, best_distance = value, distance
+            if best is not None:
+                total += best
+            elif dice_roll == 6:
+                six_passes = 1
+            else:
+                passes += 1
+            best_moves.append(best_distance)
+        return total, passes, six_passes, best_moves
+
+    def _solve(self, a, b):
+        # Records of (a, b) and (b, a); a pass with any roll but 6 swaps them
+        if not any(a) or not any(b):
+            # Someone has finished: the game is over
+            return RECORD.pack(float(not any(a)), *bytes(6)), RECORD.pack(float(not any(b)), *bytes(6))
+        total_a, passes_a, six_a, moves_a = self._expand(a, b)
+        total_b, passes_b, six_b, moves_b = self._expand(b, a)
+        # (6 - six_a) Wa + passes_a Wb = total_a + passes_a, and the same for b.
+        # A roll of 1 always has a move, so the determinant is at least 25 - 16
+        det = (6 - six_a) * (6 - six_b) - passes_a * passes_b
+        chance_a = ((total_a + passes_a) * (6 - six_b) - passes_a * (total_b + passes_b)) / det
+        chance_b = ((6 - six_a) * (total_b + passes_b) - passes_b * (total_a + passes_a)) / det
+        return RECORD.pack(chance_a, *moves_a), RECORD.pack(chance_b, *moves_b)
+
+
+def solve_chunk(path, level, movers):
+    """Worker entry point. Solves the pairs of a level whose lower-ranked side is in movers.
+
+    Returns (record indices, records). Lower levels are read from path.
+    """
+    table = Tablebase(path, partial=True)
+    try:
+        sides = table._sides
+        count = table._count
+        indices = []
+        records = []
+        for rank_a in movers:
+            a = sides.sides[rank_a]
+            for rank_b in sides.by_total[level - sum(a)]:
+                if rank_b < rank_a:
+                    continue
+                b = sides.sides[rank_b]
+                record_a, record_b = table._solve(a, b)
+                indices += (rank_a * count + rank_b, rank_b * count + rank_a)
+                records += (record_a, record_b)
+        return indices, b''.join(records)
+    finally:
+        table.close()
+
+
+def _levels_written(path, arm_length, tokens):
+    # Levels an earlier run finished in path, or None if there is no file
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(TABLEBASE_HEADER.size)
+            size = os.fstat(f.fileno()).st_size
+    except FileNotFoundError:
+        return None
+    try:
+        magic, version, file_arm_length, file_tokens, levels, record_size = TABLEBASE_HEADER.unpack(header)
+    except struct.error:
+        raise TablebaseError(f"{path} exists and is not a tablebase") from None
+    if magic != TABLEBASE_MAGIC or version != TABLEBASE_VERSION or record_size != RECORD.size:
+        raise TablebaseError(f"{path} exists and is not a tablebase this version can finish")
+    if (file_arm_length, file_tokens) != (arm_length, tokens):
+        raise TablebaseError(f"{path} holds the table for arm length {file_arm_length} "
+                             f"with {file_tokens} tokens")
+    if size != table_size(arm_length, tokens):
+        raise TablebaseError(f"{path} is truncated")
+    return levels
+
+
+def generate(path, arm_length=CLASSIC.arm_length, tokens=CLASSIC.tokens_per_player, workers=None,
+             progress=None):
+    """Write the tablebase for arm_length and tokens to path, carrying on from an interrupted run.
+
+    progress, if given, is called with (levels written, total levels) after each level.
+    Returns the number of levels solved by this call.
+    """
+    workers = workers or os.cpu_count() or 1
+    sides = _sides(arm_length, tokens)
+    levels = level_count(arm_length, tokens)
+    size = table_size(arm_length, tokens)
+    start = _levels_written(path, arm_length, tokens)
+    if start is None:
+        start = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(TABLEBASE_HEADER.pack(TABLEBASE_MAGIC, TABLEBASE_VERSION, arm_length, tokens, 0, RECORD.size))
+            f.truncate(size)
+    if start >= levels:
+        return 0
+    side_max = arm_length * tokens
+    with open(path, 'r+b') as f, mmap.mmap(f.fileno(), size) as table, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        for level in range(start, levels):
+            movers = [rank for total in range(max(0, level - side_max), min(level, side_max) + 1)
+                      for rank in sides.by_total[total]]
+            chunk_size = max(1, math.ceil(len(movers) / (workers * 4)))
+            futures = [pool.submit(solve_chunk, path, level, movers[i:i + chunk_size])
+                       for i in range(0, len(movers), chunk_size)]
+            for future in futures:
+                indices, records = future.result()
+                for i, index in enumerate(indices):
+                    offset = TABLEBASE_HEADER.size + index * RECORD.size
+                    table[offset:offset + RECORD.size] = records[i * RECORD.size:(i + 1) * RECORD.size]
+            # Records first, then the header that says they are there
+            table.flush()
+            TABLEBASE_HEADER.pack_into(table, 0, TABLEBASE_MAGIC, TABLEBASE_VERSION, arm_length, tokens,
+                                       level + 1, RECORD.size)
+            table.flush()
+            if progress is not None:
+                progress(level + 1, levels)
+    return levels - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.tablebase', description=__doc__.splitlines()[0])
+    parser.add_argument('--arm-length', type=int, default=CLASSIC.arm_length, help="squares along each arm")
+    parser.add_argument('--tokens', type=int, default=CLASSIC.tokens_per_player, help="tokens per player")
+    parser.add_argument('--workers', type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument('--output', metavar='FILE',
+                        help="defaults to endgame-ARM_LENGTH-TOKENS.ludotb in the save directory, "
+                             "where the game looks for it")
+    args = parser.parse_args(argv)
+    try:
+        # Any board with this arm length and tokens can use the table
+        make_board(args.arm_length, CLASSIC.arms, args.tokens)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.arm_length > 255:
+        parser.error("arm_length must be at most 255")
+    path = args.output or default_tablebase_path(args.arm_length, args.tokens)
+
+    count = len(_sides(args.arm_length, args.tokens).sides)
+    print(f"{path}: {count * count:,} positions, {table_size(args.arm_length, args.tokens) / 1e6:,.1f} MB")
+
+    def progress(done, levels):
+        print(f"\rlevel {done}/{levels}", end='', flush=True)
+
+    start = time.perf_counter()
+    try:
+        solved = generate(path, args.arm_length, args.tokens, args.workers, progress)
+    except TablebaseError as e:
+        parser.exit(1, f"ludo.tablebase: {e}\n")
+    if solved:
+        print(f"\nsolved {solved} levels in {time.perf_counter() - start:.1f}s")
+    else:
+        print("already complete")
+
+    with Tablebase(path) as table:
+        # Both players with every token at the start of the home column
+        side = (args.arm_length,) * args.tokens
+        print(f"race from the start of the home columns: the player to move wins "
+              f"{table.chance(side, side):.4f}")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,195 @@
+"""Monte Carlo tournament between bot strategies on every CPU core.
+
+Each game seats the strategies in PLAYER_COLORS order (green, yellow, blue,
+red), rotating the seating from game to game so no strategy keeps the first
+move. Every game gets its own dice (ludo.dice.GameDice, a stream per seat)
+and strategy seed derived from the root seed, so results do not depend on the
+number of workers or the chunk size. Games are split into
+chunks that run in worker processes, and only per-chunk totals travel back to
+the parent.
+
+Games are played on the classic board unless --arms, --arm-length or
+--tokens ask for another one (see ludo.board.make_board), which makes the
+tournament a stress test for the rules on bigger boards.
+
+Usage:
+    python -m ludo.tournament random furthest kill leave_home --games 20000
+    python -m ludo.tournament furthest kill --games 5000 --workers 4 --seed 7
+    python -m ludo.tournament kill kill kill kill kill kill --arms 6 --arm-length 8
+    python -m ludo.tournament furthest kill --games 100000 --events events/
+"""
+
+import argparse
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from . import engine
+from .board import CLASSIC, make_board
+from .dice import GameDice
+from .events import EventLog, GameEvents
+from .strategies import STRATEGIES
+
+MAX_TURNS = 5000
+
+
+def play_game(strategies, rng, max_turns=MAX_TURNS, state=None, board=CLASSIC, dice=None, events=None):
+    """Play one game; strategies[seat] moves for player seat.
+
+    The game starts from state if given (which is played on in place),
+    otherwise from a new game on board. Dice come from dice (a GameDice) if
+    given, otherwise from rng, which the strategies use either way. Every
+    roll and move goes to events (an events.GameEvents) if given. Returns
+    (winning seat or None if max_turns ran out, turns played).
+    """
+    if state is None:
+        state = engine.new_game(len(strategies), board)
+    if events is not None:
+        events.start(state)
+    turns = 0
+    while state.winner is None and turns < max_turns:
+        player_id = state.current_player
+        dice_roll = rng.randint(1, 6) if dice is None else dice.roll(player_id)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if movable:
+            token_id = strategies[player_id](state, player_id, dice_roll, movable, rng)
+            result = engine.apply_move(state, player_id, token_id, dice_roll)
+        else:
+            result = engine.pass_turn(state, dice_roll)
+        if events is not None:
+            events.turn(player_id, dice_roll, result)
+        turns += 1
+    return state.winner, turns
+
+
+def game_seed(root_seed, game):
+    # String seeds are hashed by random.Random, so neighbouring games get unrelated streams
+    return f"ludo-tournament:{root_seed}:{game}"
+
+
+def run_chunk(names, first_game, num_games, root_seed, board=CLASSIC, events_dir=None):
+    """Worker entry point. Returns totals for one chunk of games.
+
+    With an events_dir, every game's events are written there as NDJSON;
+    game ids are "tournament-ROOT_SEED-GAME".
+    """
+    strategies = [STRATEGIES[name] for name in names]
+    wins = [0] * len(names)
+    unfinished = 0
+    total_turns = 0
+    log = None if events_dir is None else EventLog(events_dir, prefix='tournament')
+    start = time.perf_counter()
+    try:
+        for game in range(first_game, first_game + num_games):
+            # Rotate seating so every strategy gets every colour equally often
+            shift = game % len(names)
+            seating = list(range(shift, len(names))) + list(range(shift))
+            rng = random.Random(game_seed(root_seed, game))
+            dice = GameDice(root_seed, 'tournament', game)
+            events = None if log is None else GameEvents(log, f"tournament-{root_seed}-{game}")
+            winner, turns = play_game([strategies[i] for i in seating], rng, board=board, dice=dice, events=events)
+            total_turns += turns
+            if winner is None:
+                unfinished += 1
+            else:
+                wins[seating[winner]] += 1
+    finally:
+        if log is not None:
+            log.close()
+    return wins, unfinished, total_turns, time.perf_counter() - start
+
+
+def wilson_interval(successes, trials, z=1.96):
+    if trials == 0:
+        return 0.0, 0.0
+    p = successes / trials
+    denom = 1 + z * z / trials
+    centre = (p + z * z / (2 * trials)) / denom
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return centre - margin, centre + margin
+
+
+def run_tournament(names, num_games, workers=None, chunk_size=None, seed=0, board=CLASSIC, events_dir=None):
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # A few chunks per worker balances load without much IPC
+        chunk_size = max(1, math.ceil(num_games / (workers * 4)))
+    chunks = [(first_game, min(chunk_size, num_games - first_game))
+              for first_game in range(0, num_games, chunk_size)]
+
+    wins = [0] * len(names)
+    unfinished = 0
+    total_turns = 0
+    busy = 0.0
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_chunk, names, first_game, count, seed, board, events_dir)
+                   for first_game, count in chunks]
+        for future in futures:
+            chunk_wins, chunk_unfinished, chunk_turns, elapsed = future.result()
+            wins = [a + b for a, b in zip(wins, chunk_wins)]
+            unfinished += chunk_unfinished
+            total_turns += chunk_turns
+            busy += elapsed
+    wall = time.perf_counter() - start
+    return {
+        'strategies': list(names),
+        'board': board,
+        'games': num_games,
+        'wins': wins,
+        'unfinished': unfinished,
+        'average_turns': total_turns / num_games if num_games else 0.0,
+        'workers': workers,
+        'wall_seconds': wall,
+        'games_per_sec': num_games / wall if wall else 0.0,
+        'games_per_sec_per_core': num_games / busy if busy else 0.0,
+    }
+
+
+def format_report(result):
+    games = result['games']
+    lines = [f"{games} games, {len(result['strategies'])} players, {result['workers']} workers"]
+    board = result.get('board', CLASSIC)
+    if board is not CLASSIC:
+        lines.append(f"board: {board.arms} arms of {board.arm_length} squares, "
+                     f"{board.tokens_per_player} tokens each, path of {board.path_length} squares")
+    for name, wins in zip(result['strategies'], result['wins']):
+        low, high = wilson_interval(wins, games)
+        lines.append(f"  {name:<12} win rate {wins / games:6.3f}  (95% CI {low:.3f} - {high:.3f})")
+    if result['unfinished']:
+        lines.append(f"  unfinished after {MAX_TURNS} turns: {result['unfinished']}")
+    lines.append(f"average game length: {result['average_turns']:.1f} turns")
+    lines.append(f"throughput: {result['games_per_sec']:,.0f} games/sec total, "
+                 f"{result['games_per_sec_per_core']:,.0f} games/sec per core")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ludo.tournament', description=__doc__.splitlines()[0])
+    parser.add_argument('strategies', nargs='+', choices=sorted(STRATEGIES),
+                        help="one strategy per seat (2-4 on the classic board, one per arm otherwise)")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--workers', type=int, default=None, help="defaults to the number of CPUs")
+    parser.add_argument('--chunk-size', type=int, default=None, help="games per worker task")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--arms', type=int, default=CLASSIC.arms, help="arms of the board, one per seat")
+    parser.add_argument('--arm-length', type=int, default=CLASSIC.arm_length, help="squares along each arm")
+    parser.add_argument('--tokens', type=int, default=CLASSIC.tokens_per_player, help="tokens per player")
+    parser.add_argument('--events', metavar='DIR', help="write every game's events to DIR as NDJSON")
+    args = parser.parse_args(argv)
+    try:
+        board = make_board(args.arm_length, args.arms, args.tokens)
+    except ValueError as e:
+        parser.error(str(e))
+    if not 2 <= len(args.strategies) <= board.max_players:
+        parser.error(f"need between 2 and {board.max_players} strategies")
+
+    result = run_tournament(args.strategies, args.games, args.workers, args.chunk_size, args.seed, board, args.events)
+    print(format_report(result))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,4 @@
+"""Pygame helpers for the front end in main.py.
+
+Unlike the rest of the ludo package, modules here import pygame.
+"""
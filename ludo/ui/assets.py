@@ -0,0 +1,81 @@
+"""On-disk cache for processed image assets.
+
+Decoding a JPEG and smoothscaling it to the window size is most of the cost of
+showing the first frame. The processed pixels are written raw to a cache file
+named after the source file's hash and the target size, so later launches read
+them back with pygame.image.frombytes() instead of decoding and rescaling.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import pygame
+
+CACHE_VERSION = 1
+PIXEL_FORMAT = 'RGB'
+
+
+def default_cache_dir():
+    if os.environ.get('LUDO_CACHE_DIR'):
+        return os.environ['LUDO_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ludo')
+
+
+def file_digest(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cover_scale(img, size):
+    # Scale to cover the whole target size, then crop the centre
+    width, height = size
+    img_rect = img.get_rect()
+    scale = max(width / img_rect.width, height / img_rect.height)
+    new_size = (int(img_rect.width * scale), int(img_rect.height * scale))
+    img = pygame.transform.smoothscale(img, new_size)
+    x_offset = (img.get_width() - width) // 2
+    y_offset = (img.get_height() - height) // 2
+    return img.subsurface((x_offset, y_offset, width, height)).copy()
+
+
+def cache_path(cache_dir, digest, size):
+    return os.path.join(cache_dir, f"v{CACHE_VERSION}-{digest}-{size[0]}x{size[1]}.{PIXEL_FORMAT.lower()}")
+
+
+def load_scaled_image(path, size, cache_dir=None):
+    """Load an image cover-scaled to size. Returns (surface, cache_hit).
+
+    Errors reading or writing the cache are ignored; the image is then decoded
+    as usual.
+    """
+    cache_dir = cache_dir or default_cache_dir()
+    digest = file_digest(path)
+    cached = cache_path(cache_dir, digest, size)
+    try:
+        with open(cached, 'rb') as f:
+            data = f.read()
+        if len(data) == size[0] * size[1] * len(PIXEL_FORMAT):
+            return pygame.image.frombytes(data, size, PIXEL_FORMAT), True
+    except OSError:
+        pass
+
+    surface = cover_scale(pygame.image.load(path), size)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Write to a temporary file first so a crash never leaves a torn cache entry
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pygame.image.tobytes(surface, PIXEL_FORMAT))
+            os.replace(tmp, cached)
+        except OSError:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass
+    return surface, False
@@ -0,0 +1,214 @@
+"""Board and token drawing at any size, on any surface.
+
+A BoardPainter draws one board at one cell size in board coordinates, with
+(0, 0) at the board's top-left corner; main.py draws the window's board
+through one. BoardView renders whole positions off-screen, for thumbnails and
+listings: the static board is drawn once per size and kept, and each
+position only copies it and stamps its tokens on, from token images that are
+also drawn once per size.
+
+    view = BoardView()
+    surface = view.render(state, (128, 128))
+    pygame.image.save(surface, 'position.png')
+
+Neither needs a display; off-screen surfaces work under the SDL dummy driver.
+"""
+
+import pygame
+
+from ..board import CLASSIC
+from .render_cache import RenderCache
+
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (220, 20, 60)
+GREEN = (0, 180, 0)
+BLUE = (30, 144, 255)
+YELLOW = (255, 215, 0)
+
+PURPLE = (148, 62, 201)
+ORANGE = (255, 140, 0)
+
+# The single source of truth for player order. The last two only play on
+# six-arm boards.
+PLAYER_COLORS = [GREEN, YELLOW, BLUE, RED, PURPLE, ORANGE]
+
+# Board width in the original 500x600 window design; outlines scale with it
+BASE_BOARD_WIDTH = 500
+
+
+class BoardPainter:
+    """Draws one board with grid squares cell pixels wide.
+
+    Outline widths are multiplied by scale, which defaults to the board's
+    size relative to the original design.
+    """
+
+    __slots__ = ('board', 'cell', 'scale')
+
+    def __init__(self, board, cell, scale=None):
+        self.board = board
+        self.cell = cell
+        self.scale = cell * board.size / BASE_BOARD_WIDTH if scale is None else scale
+
+    def line_width(self, value):
+        # Outline widths scale too, but never vanish
+        return max(1, round(value * self.scale))
+
+    def tile_centre(self, x, y):
+        # Pixel centre of a grid square; squares off the grid (boards without
+        # four arms) have fractional positions
+        cell = self.cell
+        return round(x * cell) + cell // 2, round(y * cell) + cell // 2
+
+    def token_centre(self, state, player_id, token_id):
+        # A token's square, or its yard slot when it is off the track
+        square = state.square(player_id, token_id)
+        if square is None:
+            square = self.board.home_slots[player_id][token_id]
+        return self.tile_centre(*square)
+
+    def yard(self, surface, color, x, y):
+        cell, side = self.cell, self.board.arm_length
+        pygame.draw.rect(surface, color, (x, y, side*cell, side*cell))
+        pygame.draw.rect(surface, WHITE, (x+cell, y+cell, (side-2)*cell, (side-2)*cell))
+        pygame.draw.rect(surface, BLACK, (x, y, side*cell, side*cell), self.line_width(3))
+
+    def tile(self, surface, x, y, color=WHITE, safe=False):
+        cell = self.cell
+        rect = pygame.Rect(x*cell, y*cell, cell, cell)
+        pygame.draw.rect(surface, color, rect)
+        pygame.draw.rect(surface, BLACK, rect, self.line_width(1))
+        if safe:
+            pygame.draw.circle(surface, BLACK, (x*cell + cell//2, y*cell + cell//2), cell//3, self.line_width(2))
+
+    def board_tile(self, surface, tile, color):
+        # Grid boards draw squares; on other boards the arms are at an angle
+        if self.board.grid:
+            self.tile(surface, *tile.pos, color)
+            return
+        cell = self.cell
+        points = [(x*cell, y*cell) for x, y in tile.corners]
+        pygame.draw.polygon(surface, color, points)
+        pygame.draw.polygon(surface, BLACK, points, self.line_width(1))
+
+    def cross_paths(self, surface):
+        # The white squares of every arm
+        for tile in self.board.tiles:
+            if tile.owner is None:
+                self.board_tile(surface, tile, WHITE)
+
+    def colored_tiles(self, surface, colors=PLAYER_COLORS):
+        # Every player's start square and home column
+        for tile in self.board.tiles:
+            if tile.owner is not None:
+                self.board_tile(surface, tile, colors[tile.owner])
+
+    def center(self, surface, colors=PLAYER_COLORS):
+        # One triangle per arm in the colour of the player seated there
+        board, cell = self.board, self.cell
+        centre = tuple(value * cell for value in board.centre)
+        # Clockwise from the second arm, so neighbouring triangles overlap along
+        # the diagonals the way they always have
+        for arm in range(1, board.arms + 1):
+            player_id = board.seating.index(arm % board.arms)
+            side = board.centre_sides[player_id]
+            pygame.draw.polygon(surface, colors[player_id], [(x*cell, y*cell) for x, y in side] + [centre])
+        if board.grid:
+            x, y = board.centre
+            pygame.draw.rect(surface, BLACK, ((x-1.5)*cell, (y-1.5)*cell, 3*cell, 3*cell), self.line_width(3))
+        else:
+            pygame.draw.polygon(surface, BLACK, [(x*cell, y*cell) for (x, y), _ in board.centre_sides],
+                                self.line_width(3))
+
+    def static_board(self, surface, colors=PLAYER_COLORS):
+        # Yards, arms and centre: everything but the tokens and the names
+        cell = self.cell
+        for player_id, (x, y) in enumerate(self.board.yards):
+            self.yard(surface, colors[player_id], round(x*cell), round(y*cell))
+        self.cross_paths(surface)
+        self.colored_tiles(surface, colors)
+        self.center(surface, colors)
+
+    def token(self, surface, pos, color, movable=False, hinted=False):
+        cell = self.cell
+        pygame.draw.circle(surface, color, pos, cell // 3)
+        # Movable tokens get a white rim after a roll
+        pygame.draw.circle(surface, WHITE if movable else BLACK, pos, cell // 3, self.line_width(3 if movable else 2))
+        if hinted:
+            # The suggested move gets a white dot as well
+            pygame.draw.circle(surface, WHITE, pos, cell // 7)
+            pygame.draw.circle(surface, BLACK, pos, cell // 7, self.line_width(1))
+
+    def token_image(self, color, movable=False, hinted=False):
+        # A token on a transparent surface just big enough for it, and the
+        # offset from its centre to the image's corner
+        radius = self.cell // 3
+        image = pygame.Surface((2*radius + 2, 2*radius + 2), pygame.SRCALPHA)
+        self.token(image, (radius + 1, radius + 1), color, movable, hinted)
+        return image, (-radius - 1, -radius - 1)
+
+
+class BoardView:
+    """Off-screen renders of positions on one board, at any size.
+
+    The board is fitted into each requested size, centred on a white
+    background. colors gives the players' colours by seat (PLAYER_COLORS for
+    seats it leaves out). Static layers and token images are kept for the
+    max_sizes most recently used sizes.
+    """
+
+    def __init__(self, board=CLASSIC, max_sizes=4):
+        self.board = board
+        self.cache = RenderCache(max_sizes=max_sizes)
+
+    def painter(self, size):
+        """The BoardPainter for size, and the pixel offset of the board's corner."""
+        return self.cache.sized(size, 'painter', lambda: self._fit(size))
+
+    def _fit(self, size):
+        width, height = size
+        cell = max(1, min(width, height) // self.board.size)
+        side = cell * self.board.size
+        return BoardPainter(self.board, cell), ((width - side) // 2, (height - side) // 2)
+
+    def palette(self, colors):
+        # A colour for every seat; seats past the given colours keep the default ones
+        seats = self.board.max_players
+        return tuple(map(tuple, colors[:seats])) + tuple(PLAYER_COLORS[len(colors):seats])
+
+    def layer(self, size, colors=PLAYER_COLORS):
+        """The static board at size. Callers must not draw onto the result."""
+        colors = self.palette(colors)
+        return self.cache.sized(size, ('board', colors), lambda: self._compose_layer(size, colors))
+
+    def _compose_layer(self, size, colors):
+        painter, offset = self.painter(size)
+        layer = pygame.Surface(size)
+        layer.fill(WHITE)
+        board_rect = pygame.Rect(offset, (painter.cell * self.board.size,) * 2)
+        painter.static_board(layer.subsurface(board_rect.clip(layer.get_rect())), colors)
+        return layer
+
+    def _token(self, size, color):
+        return self.cache.sized(size, ('token', color), lambda: self.painter(size)[0].token_image(color))
+
+    def render(self, state, size, colors=PLAYER_COLORS, surface=None):
+        """Draw state at size. Into surface if given (of that size), else into a new one."""
+        if state.board is not self.board:
+            raise ValueError(f"this view draws {self.board!r}, not {state.board!r}")
+        colors = self.palette(colors)
+        layer = self.layer(size, colors)
+        if surface is None:
+            surface = layer.copy()
+        else:
+            surface.blit(layer, (0, 0))
+        painter, (x, y) = self.painter(size)
+        stamps = []
+        for player_id in range(state.num_players):
+            image, (dx, dy) = self._token(size, colors[player_id])
+            for token_id in range(self.board.tokens_per_player):
+                cx, cy = painter.token_centre(state, player_id, token_id)
+                stamps.append((image, (x + cx + dx, y + cy + dy)))
+        surface.blits(stamps, doreturn=False)
+        return surface
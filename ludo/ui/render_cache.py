@@ -0,0 +1,101 @@
+"""Cache for fonts, rendered text and precomposed surfaces.
+
+Fonts are built once per (face, size, bold). Text surfaces are memoised by
+(text, font, colour) in a bounded LRU, since player names and messages change
+over a session. Precomposed surfaces (e.g. background plus overlay) are kept
+by a caller-chosen key until cleared. Surfaces drawn for one window size are
+grouped by that size, and only the most recently used sizes are kept, so
+dragging a window through dozens of sizes does not pile up full-screen
+surfaces. Hit and miss counters are available via stats().
+"""
+
+from collections import OrderedDict
+
+import pygame
+
+
+class RenderCache:
+    def __init__(self, max_text_surfaces=256, max_sizes=3):
+        self.max_text_surfaces = max_text_surfaces
+        self.max_sizes = max_sizes
+        self._fonts = {}
+        self._text = OrderedDict()
+        self._surfaces = {}
+        # size -> {key: surface}, least recently used size first
+        self._sized = OrderedDict()
+        self.hits = {'font': 0, 'text': 0, 'surface': 0, 'sized': 0}
+        self.misses = {'font': 0, 'text': 0, 'surface': 0, 'sized': 0}
+
+    def font(self, size, face=None, bold=False):
+        key = (face, size, bold)
+        font = self._fonts.get(key)
+        if font is None:
+            self.misses['font'] += 1
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self._fonts[key] = pygame.font.SysFont(face, size, bold=bold)
+        else:
+            self.hits['font'] += 1
+        return font
+
+    def text(self, text, color, size, face=None, bold=False, antialias=True):
+        """Rendered text surface. Callers must not draw onto the result."""
+        key = (text, face, size, bold, tuple(color), antialias)
+        surface = self._text.get(key)
+        if surface is not None:
+            self.hits['text'] += 1
+            self._text.move_to_end(key)
+            return surface
+        self.misses['text'] += 1
+        surface = self.font(size, face, bold).render(text, antialias, color)
+        self._text[key] = surface
+        if len(self._text) > self.max_text_surfaces:
+            self._text.popitem(last=False)
+        return surface
+
+    def text_size(self, text, size, face=None, bold=False):
+        return self.font(size, face, bold).size(text)
+
+    def surface(self, key, build):
+        """Precomposed surface for key, calling build() to make it on a miss."""
+        surface = self._surfaces.get(key)
+        if surface is None:
+            self.misses['surface'] += 1
+            surface = self._surfaces[key] = build()
+        else:
+            self.hits['surface'] += 1
+        return surface
+
+    def sized(self, size, key, build):
+        """Surface for key drawn at window size, calling build() to make it on a miss.
+
+        Using a size makes it the most recent one; everything drawn for sizes
+        beyond the max_sizes most recent is dropped.
+        """
+        surfaces = self._sized.get(size)
+        if surfaces is None:
+            surfaces = self._sized[size] = {}
+            while len(self._sized) > self.max_sizes:
+                self._sized.popitem(last=False)
+        else:
+            self._sized.move_to_end(size)
+        surface = surfaces.get(key)
+        if surface is None:
+            self.misses['sized'] += 1
+            surface = surfaces[key] = build()
+        else:
+            self.hits['sized'] += 1
+        return surface
+
+    def sizes(self):
+        # Cached window sizes, least recently used first
+        return list(self._sized)
+
+    def clear(self):
+        self._fonts.clear()
+        self._text.clear()
+        self._surfaces.clear()
+        self._sized.clear()
+
+    def stats(self):
+        return {kind: {'hits': self.hits[kind], 'misses': self.misses[kind]} for kind in self.hits}
@@ -0,0 +1,37 @@
+"""Frame scheduling that only spends CPU while something is moving.
+
+While the caller reports that something is animating, next_events() paces
+the loop at a fixed frame rate like pygame.time.Clock.tick(). Otherwise it
+blocks in pygame.event.wait() until input arrives or the idle timeout passes,
+so a board that is just waiting for a click costs no frames at all.
+"""
+
+import pygame
+
+
+class FrameScheduler:
+    def __init__(self, fps=30, idle_timeout_ms=1000):
+        self.fps = fps
+        self.idle_timeout_ms = idle_timeout_ms
+        self.clock = pygame.time.Clock()
+        self._frame_requested = True
+
+    def request_frame(self):
+        # Make the next call return at once, e.g. so a new screen gets drawn
+        self._frame_requested = True
+
+    def next_events(self, animating):
+        """Wait for the next frame and return the events that arrived."""
+        if animating:
+            self.clock.tick(self.fps)
+            return pygame.event.get()
+        if self._frame_requested:
+            self._frame_requested = False
+            # Keep tick() timing sensible for the next animated frame
+            self.clock.tick()
+            return pygame.event.get()
+        event = pygame.event.wait(self.idle_timeout_ms)
+        events = [] if event.type == pygame.NOEVENT else [event]
+        events.extend(pygame.event.get())
+        self.clock.tick()
+        return events
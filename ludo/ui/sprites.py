@@ -0,0 +1,120 @@
+"""Token sprites that glide from square to square.
+
+Every token is a TokenSprite (a pygame.sprite.DirtySprite) in a TokenGroup
+(a pygame.sprite.LayeredDirty), so each draw only restores and repaints the
+old and new rects of the sprites that changed since the previous one. A
+sprite either rests at a position or follows a list of waypoints, reaching
+one every step_ms milliseconds and interpolating in between. Moving sprites
+are lifted to a higher layer so they pass over resting ones.
+"""
+
+import pygame
+
+RESTING, MOVING = 0, 1
+
+
+class TokenSprite(pygame.sprite.DirtySprite):
+    def __init__(self, image, pos):
+        super().__init__()
+        self.image = image
+        self.rect = image.get_rect(center=pos)
+        # Centre the sprite is drawn at
+        self.pos = pos
+        # Waypoints not yet reached, and the point the current leg starts from
+        self.waypoints = ()
+        self.leg_start = pos
+        self.start_ms = 0
+        self.step_ms = 1
+
+    @property
+    def moving(self):
+        return bool(self.waypoints)
+
+    @property
+    def destination(self):
+        return self.waypoints[-1] if self.waypoints else self.pos
+
+    def set_image(self, image):
+        if image is not self.image:
+            self.image = image
+            self.rect = image.get_rect(center=self.pos)
+            self.dirty = 1
+
+    def place(self, pos):
+        # Jump to pos, dropping any animation
+        self.waypoints = ()
+        self._move_to(pos)
+
+    def move_along(self, waypoints, start_ms, step_ms, max_ms=None):
+        """Glide through waypoints, one every step_ms, from start_ms on.
+
+        Waypoints the sprite has not reached yet are kept, so a move that
+        arrives mid-animation continues from where the last one ends; max_ms
+        caps the time to the last waypoint so queued moves catch up.
+        """
+        self.waypoints += tuple(waypoints)
+        self.leg_start = self.pos
+        self.start_ms = start_ms
+        self.step_ms = step_ms if max_ms is None else min(step_ms, max_ms / len(self.waypoints))
+
+    def update(self, now):
+        if not self.waypoints:
+            return
+        elapsed = (now - self.start_ms) / self.step_ms
+        if elapsed <= 0:
+            return
+        step = int(elapsed)
+        if step >= len(self.waypoints):
+            self.place(self.waypoints[-1])
+            return
+        if step:
+            # Drop the waypoints passed since the last update
+            self.leg_start = self.waypoints[step - 1]
+            self.waypoints = self.waypoints[step:]
+            self.start_ms += step * self.step_ms
+        (x0, y0), (x1, y1), t = self.leg_start, self.waypoints[0], elapsed - step
+        self._move_to((round(x0 + (x1 - x0) * t), round(y0 + (y1 - y0) * t)))
+
+    def _move_to(self, pos):
+        if pos != self.pos:
+            self.pos = pos
+            self.rect.center = pos
+            self.dirty = 1
+
+
+class TokenGroup(pygame.sprite.LayeredDirty):
+    """LayeredDirty group of TokenSprites, looked up by a caller-chosen key."""
+
+    def __init__(self):
+        super().__init__(_use_update=True)
+        # LayeredDirty falls back to full-screen repaints after a slow frame;
+        # the board is always cheaper to patch than to redraw
+        self.set_timing_threshold(float('inf'))
+        self.tokens = {}
+
+    def add_token(self, key, image, pos):
+        sprite = self.tokens[key] = TokenSprite(image, pos)
+        self.add(sprite, layer=RESTING)
+        return sprite
+
+    def remove_token(self, key):
+        # The sprite's last rect is restored on the next draw
+        self.remove(self.tokens.pop(key))
+
+    @property
+    def animating(self):
+        return any(sprite.waypoints for sprite in self.tokens.values())
+
+    def update(self, now):
+        for sprite in self.tokens.values():
+            sprite.update(now)
+            layer = MOVING if sprite.waypoints else RESTING
+            if sprite.layer != layer:
+                self.change_layer(sprite, layer)
+                sprite.dirty = 1
+
+    def draw(self, surface, bgsurf=None, special_flags=None):
+        # Skip the passes over every sprite when nothing needs repainting
+        if not self.lostsprites and not any(sprite.dirty for sprite in self.tokens.values()):
+            return []
+        return super().draw(surface, bgsurf, special_flags)
@@ -1,247 +1,781 @@
 
+import time
+startup_start = time.perf_counter()
+
+import argparse
+import atexit
+import os
 import pygame
 import sys
 import random
-
-pygame.init()
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from ludo import engine, persistence, replay
+from ludo.profiler import FrameProfiler
+from ludo.ai import Searcher
+from ludo.analysis import Analyst
+from ludo.client import Client
+from ludo.dice import GameDice
+from ludo.events import EventLog, GameEvents
+from ludo.history import History
+from ludo.packed import pack
+from ludo.tablebase import Tablebase, TablebaseError, default_tablebase_path
+from ludo.board import CLASSIC, MIN_ARMS, make_board
+from ludo.ui.assets import cover_scale, load_scaled_image
+from ludo.ui.board_view import BLACK, GREEN, PLAYER_COLORS, RED, WHITE, YELLOW, BoardPainter
+from ludo.ui.render_cache import RenderCache
+from ludo.ui.scheduler import FrameScheduler
+from ludo.ui.sprites import TokenGroup
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # --- Screen setup ---
-WIDTH, HEIGHT = 500, 600
-CELL = WIDTH // 15
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Ludo Board")
-
-# --- Colors ---
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-RED = (220, 20, 60)
-GREEN = (0, 180, 0)
-BLUE = (30, 144, 255)
-YELLOW = (255, 215, 0)
-
-# The single source of truth for player order.
-PLAYER_COLORS = [GREEN, YELLOW, BLUE, RED]
+# pygame subsystems are started on first use rather than with pygame.init():
+# the display by init_display(), fonts by the render cache, the mixer by the
+# first dice sound.
+BASE_WIDTH, BASE_HEIGHT = 500, 600
+screen = None
+
+def init_display(size=(BASE_WIDTH, BASE_HEIGHT)):
+    global screen
+    pygame.display.init()
+    screen = pygame.display.set_mode(size, pygame.RESIZABLE)
+    pygame.display.set_caption("Ludo Board")
+    apply_layout(*screen.get_size())
+
+def resize_window(width, height):
+    # VIDEORESIZE: lay out for the new size. Surfaces for it are drawn on first
+    # use, so a burst of resize events during a drag only pays for the last one.
+    global screen
+    screen = pygame.display.get_surface()
+    if screen.get_size() != (width, height):
+        screen = pygame.display.set_mode((width, height), pygame.RESIZABLE)
+    apply_layout(*screen.get_size())
+
+def window_size(text):
+    # argparse type for --size: 'WIDTHxHEIGHT'
+    try:
+        width, height = map(int, text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got {text!r}") from None
+    return width, height
+
+# --- Board ---
+# Geometry of the board being played (see ludo.board). Other boards can be
+# picked with --arms, --arm-length and --tokens; saves and recordings only
+# hold games on the classic board.
+game_board = CLASSIC
+
+# --- Layout ---
+# The window may have any size. The original 500x600 design is scaled by SCALE
+# and centred in it; apply_layout() recomputes everything below for the
+# current size. The board fills the width of the design whatever its size in
+# cells.
+MIN_SCALE = 0.5
+WIDTH, HEIGHT = BASE_WIDTH, BASE_HEIGHT
+SCALE = 1.0
+CELL = WIDTH // game_board.size
+# Top-left corner of the board (and of the controls under it)
+BOARD_X = BOARD_Y = 0
+
+def scaled(value):
+    return round(value * SCALE)
+
+def line_width(value):
+    # Outline widths scale too, but never vanish
+    return max(1, scaled(value))
+
+def board_rect():
+    return pygame.Rect(BOARD_X, BOARD_Y, game_board.size * CELL, game_board.size * CELL)
+
+def apply_layout(width, height):
+    global WIDTH, HEIGHT, SCALE, CELL, BOARD_X, BOARD_Y, FONT_SMALL, FONT_MEDIUM, FONT_LARGE
+    global dice_size, dice_rect, roll_button, quit_button, add_player_button, remove_player_button, reset_button
+    global token_sprites_key, painter
+    WIDTH, HEIGHT = width, height
+    SCALE = max(MIN_SCALE, min(width / BASE_WIDTH, height / BASE_HEIGHT))
+    CELL = int(BASE_WIDTH * SCALE) // game_board.size
+    # Draws the board and tokens at this size (see ludo.ui.board_view)
+    painter = BoardPainter(game_board, CELL, SCALE)
+    BOARD_X = max(0, (width - scaled(BASE_WIDTH)) // 2)
+    BOARD_Y = max(0, (height - scaled(BASE_HEIGHT)) // 2)
+    bottom = BOARD_Y + scaled(BASE_HEIGHT)
+    FONT_SMALL, FONT_MEDIUM, FONT_LARGE = scaled(18), scaled(24), scaled(32)
+    dice_size = scaled(40)
+    dice_rect = pygame.Rect(BOARD_X + scaled(BASE_WIDTH) // 2 - dice_size // 2, bottom - dice_size - scaled(60),
+                            dice_size, dice_size)
+    button_width, button_height, button_gap = scaled(60), scaled(28), scaled(8)
+    # Roll button to the right of the dice, the others in a row along the bottom
+    roll_button = pygame.Rect(dice_rect.right + scaled(10), dice_rect.centery - button_height // 2,
+                              button_width, button_height)
+    quit_button = pygame.Rect(BOARD_X + scaled(30), bottom - scaled(50), button_width, button_height)
+    add_player_button = quit_button.move(button_width + button_gap, 0)
+    remove_player_button = add_player_button.move(button_width + button_gap, 0)
+    reset_button = remove_player_button.move(button_width + button_gap, 0)
+    # Every token sprite needs a new image and position
+    token_sprites_key = None
+
+apply_layout(WIDTH, HEIGHT)
 
 # --- Game state ---
 current_dice = 1
 rolling = False
-roll_timer = 0
-ROLL_DURATION = 20
-dice_size = 40  
-dice_rect = pygame.Rect(WIDTH // 2 - dice_size // 2, HEIGHT - dice_size - 60, dice_size, dice_size)
+# Timers are deadlines in pygame.time.get_ticks() milliseconds, so they run
+# at the same speed whatever the frame rate
+FPS = 30
+roll_end_time = 0
+ROLL_DURATION_MS = 667
 dragging = False
-button_width, button_height = 60, 28 
-
-# Position roll button to the right of the dice
-roll_button = pygame.Rect(dice_rect.right + 10, dice_rect.centery - button_height // 2, button_width, button_height)
-# Arrange buttons with minimal gaps
-button_gap = 8
-base_x = 30
-quit_button = pygame.Rect(base_x, HEIGHT - 50, button_width, button_height)
-add_player_button = pygame.Rect(quit_button.right + button_gap, HEIGHT - 50, button_width, button_height)
-remove_player_button = pygame.Rect(add_player_button.right + button_gap, HEIGHT - 50, button_width, button_height)
-reset_button = pygame.Rect(remove_player_button.right + button_gap, HEIGHT - 50, button_width, button_height)
 
 # --- Player info ---
 num_players = 0
 players = []
-current_player_idx = 0
 input_boxes = []
 active_input = None
 dice_rolled = False
 
-# Token positions and state
-token_positions = []
-token_path_indices = []
-token_is_home = []
-token_is_safe = []
+# Rules state (token progress and whose turn it is) lives in the engine
+state = engine.new_game(0)
+
+# --- Profiling ---
+# Draw phases and rules calls are timed while the HUD (F3) or a trace (F4,
+# --trace) is active; otherwise the hooks cost one flag check.
+profiler = FrameProfiler()
+TRACE_FRAMES = 120
+# HUD text, refreshed a few times a second so it stays readable
+hud_lines = ()
+hud_refresh_at = 0
 
 # --- Fonts ---
-font_small = pygame.font.SysFont(None, 18)
-font_medium = pygame.font.SysFont(None, 24)
-font_large = pygame.font.SysFont(None, 32)
+# Fonts and rendered text come from render_cache; the point sizes FONT_SMALL,
+# FONT_MEDIUM and FONT_LARGE are set by apply_layout()
+render_cache = RenderCache()
+
+def render_text(text, color, size, bold=False):
+    return render_cache.text(text, color, size, bold=bold)
+
+# Set by load_background() from __main__
+background_img = None
 
-# --- Load dice sound ---
-try:
-    dice_sound = pygame.mixer.Sound("dice.wav")
-except pygame.error:
-    dice_sound = None
+def load_background():
+    global background_img
+    try:
+        img, cache_hit = load_scaled_image(os.path.join(ASSET_DIR, "background.jpg"), (WIDTH, HEIGHT))
+        background_img = img.convert()
+    except Exception:
+        background_img, cache_hit = None, False
+    return cache_hit
+
+# The decoded image, loaded the first time the window is resized
+background_source = None
+
+def background_for_size():
+    # The background cover-scaled to the window, or None without the image
+    global background_source
+    if background_img is None or background_img.get_size() == (WIDTH, HEIGHT):
+        return background_img
+    if background_source is None:
+        background_source = pygame.image.load(os.path.join(ASSET_DIR, "background.jpg")).convert()
+    return cover_scale(background_source, (WIDTH, HEIGHT))
+
+# --- Dice sound ---
+# Loaded (and the mixer started) the first time it is needed
+dice_sound = None
+dice_sound_loaded = False
+
+def play_dice_sound():
+    global dice_sound, dice_sound_loaded
+    if not dice_sound_loaded:
+        dice_sound_loaded = True
+        try:
+            pygame.mixer.init()
+            dice_sound = pygame.mixer.Sound(os.path.join(ASSET_DIR, "dice.wav"))
+        except pygame.error:
+            dice_sound = None
+    if dice_sound:
+        dice_sound.play()
+
+# --- Startup profiling ---
+# Filled in by startup_phase() and printed after the first interactive frame
+# when running with --profile-startup.
+profile_startup = False
+startup_phases = []
+
+@contextmanager
+def startup_phase(name):
+    # Yields a dict whose 'name' may be changed to annotate the phase
+    phase = {'name': name}
+    start = time.perf_counter()
+    try:
+        yield phase
+    finally:
+        startup_phases.append((phase['name'], time.perf_counter() - start))
 
+def report_startup():
+    global profile_startup
+    profile_startup = False
+    total = time.perf_counter() - startup_start
+    print("startup profile:", file=sys.stderr)
+    for name, seconds in startup_phases:
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms", file=sys.stderr)
+    print(f"  {'first interactive frame':<28} {total * 1000:8.1f} ms", file=sys.stderr)
 
 
 
-# --- Board Logic ---
-def create_paths():
-    """
-    Defines the complete path for each player from their start tile to the home triangle.
-    
-    """
-    paths = []
-
-    # The path starts at the green colored square and ends at the home triangle entry.
-    green_path_master = []
-    # Segment 1: Right from home entry
-    for i in range(1, 6): green_path_master.append((i, 6))
-    # Segment 2: Up to the corner
-    green_path_master.append((6, 5))
-    for i in range(4, -1, -1): green_path_master.append((6, i))
-    # Segment 3: Across the top
-    green_path_master.append((7, 0))
-    green_path_master.append((8, 0))
-    # Segment 4: Down
-    for i in range(1, 6): green_path_master.append((8, i))
-    green_path_master.append((9, 6))
-    # Segment 5: Right
-    for i in range(10, 15): green_path_master.append((i, 6))
-    # Segment 6: Across the bottom (turn)
-    green_path_master.append((14, 7))
-    green_path_master.append((14, 8))
-    # Segment 7: Left
-    for i in range(13, 8, -1): green_path_master.append((i, 8))
-    green_path_master.append((8, 9))
-    # Segment 8: Down
-    for i in range(10, 15): green_path_master.append((8, i))
-    # Segment 9: Left (turn)
-    green_path_master.append((7, 14))
-    green_path_master.append((6, 14))
-    # Segment 10: Up
-    for i in range(13, 8, -1): green_path_master.append((6, i))
-    green_path_master.append((5, 8))
-    # Segment 11: Left
-    for i in range(4, -1, -1): green_path_master.append((i, 8))
-    # Segment 12: Top (turn)
-    green_path_master.append((0, 7))
-    green_path_master.append((0, 6))
-    # Segment 13: The home stretch
-    for i in range(1, 7): green_path_master.append((i, 7))
-    paths.append(green_path_master)
-
-    # Yellow's path (Player 1) - 90 degrees clockwise from Green
-    # Rotates (x, y) to (14-y, x)
-    yellow_path = [(14-y, x) for x, y in green_path_master]
-    paths.append(yellow_path)
-
-    # Blue's path (Player 2) - 270 degrees clockwise from Green
-    # Rotates (x, y) to (y, 14-x)
-    blue_path = [(y, 14-x) for x, y in green_path_master]
-    paths.append(blue_path)
-
-    # Red's path (Player 3) - 180 degrees from Green
-    # Rotates (x, y) to (14-x, 14-y)
-    red_path = [(14-x, 14-y) for x, y in green_path_master]
-    paths.append(red_path)
-
-    return paths
-
-full_paths = create_paths()
 
+# --- Board Logic ---
 def get_home_coords(player_id, token_id):
-    home_pos = [
-        [(1, 1), (1, 3), (3, 1), (3, 3)],  # GREEN (Player 0)
-        [(10, 1), (10, 3), (12, 1), (12, 3)],  # YELLOW (Player 1)
-        [(1, 10), (1, 12), (3, 10), (3, 12)],  # BLUE (Player 2)
-        [(10, 10), (10, 12), (12, 10), (12, 12)],  # RED (Player 3)
-    ]
-    return (home_pos[player_id][token_id][0] * CELL + CELL // 2,
-            home_pos[player_id][token_id][1] * CELL + CELL // 2)
+    return get_tile_coords(*game_board.home_slots[player_id][token_id])
 
 def get_tile_coords(x, y):
-    return x * CELL + CELL // 2, y * CELL + CELL // 2
+    # Window pixel centre of a grid square; squares off the grid (boards
+    # without four arms) have fractional positions
+    return BOARD_X + round(x * CELL) + CELL // 2, BOARD_Y + round(y * CELL) + CELL // 2
+
+def get_token_coords(player_id, token_id):
+    # Pixel centre of a token: its yard slot when off the track, else its square
+    square = state.square(player_id, token_id)
+    if square is None:
+        return get_home_coords(player_id, token_id)
+    return get_tile_coords(*square)
+
+def index_coords(player_id, token_id, index):
+    # Pixel centre for a path index; the yard slot when off the track
+    return get_tile_coords(*game_board.square_coords(state.rules.token_square(player_id, token_id, index)))
+
+def iter_token_coords():
+    for player_id in range(state.num_players):
+        for token_id in range(game_board.tokens_per_player):
+            yield player_id, token_id, get_token_coords(player_id, token_id)
+
+def tokens_at(pos, player_id=None):
+    # Tokens under a pixel position, found through the engine's occupancy index
+    square = game_board.square_at((pos[0] - BOARD_X) / CELL, (pos[1] - BOARD_Y) / CELL)
+    if square is None:
+        return []
+    hits = []
+    for owner, token_id in state.occupants(square):
+        if player_id is not None and owner != player_id:
+            continue
+        cx, cy = get_token_coords(owner, token_id)
+        if (pos[0] - cx) ** 2 + (pos[1] - cy) ** 2 < (CELL // 3) ** 2:
+            hits.append((owner, token_id))
+    return hits
 
 def initialize_tokens():
-    global token_positions, token_path_indices, token_is_home
-    token_positions = []
-    token_path_indices = []
-    token_is_home = []
-    for player_id in range(num_players):
-        player_tokens = []
-        player_path_indices = []
-        player_home_state = []
-        for token_id in range(4):
-            player_tokens.append(get_home_coords(player_id, token_id))
-            player_path_indices.append(-1)
-            player_home_state.append(True)
-        token_positions.append(player_tokens)
-        token_path_indices.append(player_path_indices)
-        token_is_home.append(player_home_state)
-
+    global state, winner_announced
+    state = engine.new_game(num_players, game_board)
+    winner_announced = False
+    autosave_snapshot()
+    start_history()
+    seed = new_dice_seed()
+    start_recording(seed)
+    start_game_events(dice_seed=seed)
+
+@profiler.timed()
 def move_token(player_id, token_id, steps):
-    current_path_index = token_path_indices[player_id][token_id]
-    path_length = len(full_paths[player_id])
-    # If token is home, needs 6 to move out
-    if token_is_home[player_id][token_id]:
-        if steps == 6:
-            token_is_home[player_id][token_id] = False
-            token_path_indices[player_id][token_id] = 0
-            x, y = full_paths[player_id][0]
-            token_positions[player_id][token_id] = get_tile_coords(x, y)
-            return True
+    if not engine.can_move_token(state, player_id, token_id, steps):
         return False
+    handle_game_events(engine.apply_move(state, player_id, token_id, steps))
+    autosave(save_store.record_move, player_id, token_id, steps)
+    record_game(persistence.MOVE, player_id, token_id, steps)
+    record_history(persistence.MOVE, player_id, token_id, steps)
+    return True
+
+@profiler.timed()
+def can_move_any_token(player_id, dice_roll):
+    return engine.can_move_any_token(state, player_id, dice_roll)
+
+# --- Recording ---
+# Every game is recorded for ludo.replay, starting from the position it was
+# started or resumed at. Local dice come from game_dice, seeded per
+# recording; the roll animation draws from its cosmetic stream, so the game
+# rolls follow from the seed alone.
+recorder = None
+game_dice = GameDice(0)
+# Set while replay_viewer() shows a recording
+replaying = False
+REPLAY_SPEED = 4
+
+def new_dice_seed():
+    global game_dice
+    seed = random.SystemRandom().getrandbits(63)
+    game_dice = GameDice(seed)
+    return seed
+
+def start_recording(seed=None):
+    # seed is None when the dice come from a server
+    global recorder
+    if recorder is not None:
+        recorder.close()
+        # A recording without moves is only clutter
+        if recorder.moves == 0:
+            try:
+                os.remove(recorder.path)
+            except OSError:
+                pass
+        recorder = None
+    if num_players < 2 or game_board is not CLASSIC:
+        return
+    try:
+        recorder = replay.Recorder(replay.new_recording_path(), state, players, seed)
+    except OSError as e:
+        print(f"recording failed: {e}", file=sys.stderr)
+
+def record_game(kind, player_id, token_id, dice_roll):
+    global recorder
+    if recorder is None:
+        return
+    try:
+        if kind == persistence.MOVE:
+            recorder.record_move(player_id, token_id, dice_roll)
+        else:
+            recorder.record_pass(player_id, dice_roll)
+    except OSError as e:
+        print(f"recording failed: {e}", file=sys.stderr)
+        recorder = None
+
+# --- Event export ---
+# With --events DIR, every game's rolls, moves, captures and passes are
+# written to NDJSON files in DIR for analytics (see ludo.events). Exporting
+# only queues the events; a writer thread does the formatting and the disk
+# writes, so frames never wait on it.
+event_log = None
+game_events = None
+
+def start_game_events(**info):
+    # New game id from the current state; info goes on the start event
+    global game_events
+    game_events = None
+    if event_log is not None and num_players >= 2:
+        game_events = GameEvents(event_log)
+        game_events.start(state, online=net_client is not None, **info)
+
+def export_roll(player_id, dice_roll):
+    if game_events is not None:
+        game_events.roll(player_id, dice_roll)
+
+def replay_viewer(path, speed=REPLAY_SPEED):
+    # Show a recorded game. Space pauses, Left/Right step one move, Up/Down
+    # change the speed (moves per second), Home/End jump to the start or end.
+    global state, num_players, current_dice, replaying, message_text
+    recording = replay.read_recording(path)
+    players[:] = recording.players
+    num_players = recording.state.num_players
+    viewer = replay.Replay(recording)
+    replaying = True
+    scheduler = FrameScheduler(FPS)
+    paused = False
+    next_move_at = 0
+    caption = None
+    while True:
+        playing = not paused and viewer.position < len(viewer)
+        for event in scheduler.next_events(animating=playing or token_sprites.animating or message_text is not None):
+            if event.type == pygame.QUIT or (event.type == pygame.MOUSEBUTTONDOWN and quit_button.collidepoint(event.pos)):
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.VIDEORESIZE:
+                resize_window(event.w, event.h)
+            if event.type != pygame.KEYDOWN:
+                continue
+            if event.key == pygame.K_SPACE:
+                paused = not paused
+            elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                paused = True
+                viewer.seek(viewer.position + (1 if event.key == pygame.K_RIGHT else -1))
+            elif event.key == pygame.K_UP:
+                speed = min(speed * 2, 4096)
+            elif event.key == pygame.K_DOWN:
+                speed = max(speed / 2, 0.25)
+            elif event.key == pygame.K_HOME:
+                viewer.seek(0)
+            elif event.key == pygame.K_END:
+                viewer.seek(len(viewer))
+        now = pygame.time.get_ticks()
+        if playing and now >= next_move_at:
+            # Above the frame rate several moves go by per frame
+            for _ in range(max(1, int(speed / FPS))):
+                events = viewer.step()
+                if speed <= REPLAY_SPEED:
+                    handle_game_events(events)
+            next_move_at = now + 1000 / speed
+        state = viewer.state
+        current_dice = viewer.last_dice() or 1
+        new_caption = f"Ludo replay - move {viewer.position}/{len(viewer)} - {speed:g} moves/s" + (" (paused)" if paused else "")
+        if new_caption != caption:
+            caption = new_caption
+            pygame.display.set_caption(caption)
+        if message_text is not None and now >= message_end_time:
+            message_text = None
+        dirty = update_board()
+        if dirty:
+            pygame.display.update(dirty)
+
+# --- Network play ---
+# With --connect, ludo.server owns the dice and the rules. Its messages arrive
+# as NET_MESSAGE events and are applied to the local state one at a time, each
+# dice message after its roll animation.
+NET_MESSAGE = pygame.USEREVENT + 1
+net_client = None
+net_seat = None
+net_inbox = deque()
+# Last dice message; the roll animation lands on its value
+net_roll = None
+# A roll or move was sent and the server has not answered yet
+net_waiting = False
+
+def connect_network(address, room, name, seats):
+    global net_client
+    on_message = lambda message: pygame.event.post(pygame.event.Event(NET_MESSAGE, message=message))
+    net_client = Client(address, on_message)
+    net_client.join(room, name, seats)
+
+def my_turn():
+    # Whether the local player may act: always offline, only on our seat online,
+    # never while watching a replay
+    return not replaying and (net_client is None or state.current_player == net_seat)
+
+def network_lobby():
+    # Wait until every seat in the room is taken, then set up the game
+    global num_players, state, net_seat
+    scheduler = FrameScheduler(FPS)
+    names, seats, status = [], 0, "Connecting..."
+    # Redrawn only after input or a server message, not on idle wakeups
+    dirty = True
+    while True:
+        events = scheduler.next_events(animating=False)
+        dirty = dirty or bool(events)
+        for event in events:
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            if event.type == pygame.VIDEORESIZE:
+                resize_window(event.w, event.h)
+            if event.type != NET_MESSAGE:
+                continue
+            message = event.message
+            if message['type'] == 'joined':
+                net_seat, seats, names = message['seat'], message['seats'], list(message['players'])
+            elif message['type'] == 'player':
+                names.append(message['name'])
+            elif message['type'] == 'start':
+                num_players = seats
+                players[:] = [{'name': name, 'color': PLAYER_COLORS[i]} for i, name in enumerate(names)]
+                state = engine.new_game(seats)
+                state.current_player = message['current']
+                start_recording()
+                start_game_events()
+                return
+            elif message['type'] in ('error', 'disconnected'):
+                print(f"ludo: {message.get('message', 'connection closed')}", file=sys.stderr)
+                pygame.quit()
+                sys.exit(1)
+            status = f"Waiting for players ({len(names)}/{seats})"
+        if not dirty:
+            continue
+        dirty = False
+        if background_img:
+            screen.blit(render_cache.sized((WIDTH, HEIGHT), 'setup-background', compose_setup_background), (0, 0))
+        else:
+            screen.fill(WHITE)
+        lines = [(status, (0, 80, 180), FONT_LARGE)] + [(name, BLACK, FONT_MEDIUM) for name in names]
+        for i, (text, color, size) in enumerate(lines):
+            label = render_text(text, color, size, bold=i == 0)
+            screen.blit(label, label.get_rect(center=(WIDTH//2, HEIGHT//3 + i*scaled(40))))
+        pygame.display.flip()
+
+def handle_net_message(message):
+    # Apply one server message to the local state
+    global net_roll, net_waiting
+    kind = message['type']
+    if kind == 'dice':
+        net_roll = message
+        if message['seat'] == net_seat:
+            net_waiting = False
+        start_roll()
+    elif kind == 'pass':
+        record_game(persistence.PASS, message['seat'], 0, current_dice)
+        handle_game_events(engine.pass_turn(state, current_dice))
+    elif kind == 'move':
+        if message['seat'] == net_seat:
+            net_waiting = False
+        record_game(persistence.MOVE, message['seat'], message['token'], current_dice)
+        handle_game_events(engine.apply_move(state, message['seat'], message['token'], current_dice))
+    elif kind == 'left':
+        show_message(f"{players[message['seat']]['name']} left the game", duration_ms=6000)
+    elif kind == 'error':
+        net_waiting = False
+        show_message(message['message'])
+    elif kind == 'disconnected':
+        show_message("Connection to the server lost", duration_ms=6000)
+
+def finish_net_roll():
+    # The roll animation ended: show the server's value
+    global current_dice, dice_rolled
+    current_dice = net_roll['value']
+    export_roll(net_roll['seat'], current_dice)
+    dice_rolled = net_roll['seat'] == net_seat and net_roll['movable'] != 0
+
+# --- Computer players ---
+# Seats with 'bot': True in players are played by the search in ludo.ai
+bot_searcher = Searcher()
+bot_executor = None
+# Endgame tablebase (ludo.tablebase) for bots and hints, or None
+tablebase = None
+
+def load_tablebase(path=None):
+    # The table in the save directory is used if it has been generated;
+    # an explicit path must open
+    global tablebase
+    if path is None:
+        try:
+            table = Tablebase(default_tablebase_path(game_board.arm_length, game_board.tokens_per_player))
+        except (OSError, TablebaseError):
+            return
     else:
-        new_index = current_path_index + steps
-        # Check if move lands exactly at home
-        if new_index == path_length:
-            # Token reaches home
-            token_is_home[player_id][token_id] = True
-            token_path_indices[player_id][token_id] = -1
-            token_positions[player_id][token_id] = get_home_coords(player_id, token_id)
-            # Show message when token reaches home
-            show_message(f"{players[player_id]['name']} token is home!", color=players[player_id]['color'])
-            check_winner(player_id)
-            return True
-        elif new_index < path_length:
-            # Move token
-            token_path_indices[player_id][token_id] = new_index
-            x, y = full_paths[player_id][new_index]
-            token_positions[player_id][token_id] = get_tile_coords(x, y)
-            # Kill rule: check for opponent tokens on same tile (not safe tiles)
-            if not is_safe_tile(x, y):
-                for opp_id in range(num_players):
-                    if opp_id == player_id:
-                        continue
-                    for opp_token in range(4):
-                        if not token_is_home[opp_id][opp_token]:
-                            opp_idx = token_path_indices[opp_id][opp_token]
-                            if opp_idx >= 0 and full_paths[opp_id][opp_idx] == (x, y):
-                                # Send opponent token home
-                                token_is_home[opp_id][opp_token] = True
-                                token_path_indices[opp_id][opp_token] = -1
-                                token_positions[opp_id][opp_token] = get_home_coords(opp_id, opp_token)
-                                show_message(f"{players[player_id]['name']} killed {players[opp_id]['name']}!", color=players[player_id]['color'])
-                                if dice_sound:
-                                    dice_sound.play()
-            return True
+        table = Tablebase(path)
+        if (table.arm_length, table.tokens_per_player) != (game_board.arm_length, game_board.tokens_per_player):
+            table.close()
+            raise TablebaseError(f"{path} is for arm length {table.arm_length} with "
+                                 f"{table.tokens_per_player} tokens, not this board")
+    tablebase = bot_searcher.tablebase = table
+
+def is_bot(player_id):
+    return bool(players[player_id].get('bot'))
+
+def start_roll():
+    global rolling, roll_end_time
+    rolling = True
+    roll_end_time = pygame.time.get_ticks() + ROLL_DURATION_MS
+    play_dice_sound()
+
+def start_bot_search():
+    # Search on a worker thread so the render loop keeps drawing frames.
+    # Returns a future for the ludo.ai.SearchResult.
+    global bot_executor
+    if bot_executor is None:
+        bot_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ludo-bot')
+    return bot_executor.submit(bot_searcher.choose, state.copy(), state.current_player, current_dice)
+
+# --- Hints ---
+# H toggles a panel with every player's chance of winning and, once a human
+# player has rolled, marks the token ludo.analysis suggests. The rollouts run
+# on worker processes; a roll or move starts a new analysis and cancels the
+# stale one, and finished chunks post ANALYSIS_READY to wake the main loop.
+ANALYSIS_READY = pygame.USEREVENT + 2
+hints_enabled = False
+analyst = None
+# Position being analysed, and the latest estimate for it
+analysis_key = None
+analysis = None
+# Win chances on the panel; kept while a new analysis starts so it does not flicker
+hint_rates = None
+
+def toggle_hints():
+    global hints_enabled, hint_rates
+    hints_enabled = not hints_enabled
+    hint_rates = None
+
+def post_analysis_ready():
+    # Called on a pool thread
+    try:
+        pygame.event.post(pygame.event.Event(ANALYSIS_READY))
+    except pygame.error:
+        # The display closed while a chunk was finishing
+        pass
+
+@profiler.timed()
+def update_analysis():
+    # Restart the analysis if the position changed, then take in new results
+    global analyst, analysis_key, analysis, hint_rates
+    key = None
+    if hints_enabled and players and state.winner is None and not replaying:
+        key = (pack(state), current_dice if dice_rolled else None)
+    if key != analysis_key:
+        analysis_key = key
+        analysis = None
+        if key is not None:
+            if analyst is None:
+                analyst = Analyst(on_result=post_analysis_ready, tablebase=tablebase)
+            analyst.analyse(state, key[1])
+        elif analyst is not None:
+            analyst.cancel()
+    if analyst is not None:
+        estimate = analyst.poll()
+        if estimate is not None:
+            analysis = estimate
+            hint_rates = estimate.win_rates
+
+def hinted_token():
+    # Token to mark for the local player after a roll, or None
+    if analysis is None or not dice_rolled or not my_turn() or is_bot(state.current_player):
+        return None
+    return analysis.hint
+
+def close_analyst():
+    if analyst is not None:
+        analyst.close()
+
+@profiler.timed()
+def handle_game_events(events):
+    # Turn engine events into on-screen messages, sounds and token animations
+    global winner_announced
+    if game_events is not None and not replaying:
+        game_events.record(events)
+    animate_tokens(events)
+    for event in events:
+        if isinstance(event, engine.TokenHome):
+            player = players[event.player]
+            show_message(f"{player['name']} token is home!", color=player['color'])
+        elif isinstance(event, engine.TokenCaptured):
+            player = players[event.player]
+            show_message(f"{player['name']} killed {players[event.victim]['name']}!", color=player['color'])
+            play_dice_sound()
+        elif isinstance(event, engine.PlayerWon):
+            winner_announced = True
+            player = players[event.player]
+            show_message(f"{player['name']} wins!", color=player['color'], duration_ms=6000)
+
+# --- Save / load ---
+# Every roll, move and pass is appended to the journal as it happens; a full
+# snapshot is only written for a new game or when the journal gets long.
+save_store = persistence.SaveStore(persistence.default_save_dir())
+LEGACY_SAVE = os.path.join(ASSET_DIR, "ludo_save.json")
+
+def autosave_snapshot():
+    if num_players < 2 or game_board is not CLASSIC:
+        return
+    try:
+        save_store.start(state, players)
+    except OSError as e:
+        print(f"autosave failed: {e}", file=sys.stderr)
+
+def autosave(record, *args):
+    if game_board is not CLASSIC:
+        return
+    try:
+        record(*args)
+        # Compact after moves and passes only, so a pending roll is never lost
+        if record != save_store.record_roll and save_store.needs_snapshot():
+            save_store.start(state, players)
+    except OSError as e:
+        print(f"autosave failed: {e}", file=sys.stderr)
+
+def saved_game_available():
+    if game_board is not CLASSIC:
         return False
+    return save_store.has_save() or os.path.exists(LEGACY_SAVE)
 
-# Helper to check safe tiles
-SAFE_TILES = set([
-    (1,6),(8,1),(13,8),(6,13), # colored safe tiles
-    (6,1),(8,13),(13,6),(1,8), # center cross safe tiles
-])
-def is_safe_tile(x, y):
-    return (x, y) in SAFE_TILES
+def resume_saved_game():
+    # Restore the last game (or import the legacy JSON save). Returns True on success.
+    global state, num_players, current_dice, dice_rolled, winner_announced
+    try:
+        if save_store.has_save():
+            loaded_state, loaded_players, pending = save_store.resume()
+        else:
+            loaded_state, loaded_players = persistence.load_legacy_json(LEGACY_SAVE)
+            pending = None
+            save_store.start(loaded_state, loaded_players)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"could not load saved game: {e}", file=sys.stderr)
+        return False
+    state = loaded_state
+    players[:] = loaded_players
+    num_players = state.num_players
+    winner_announced = state.winner is not None
+    dice_rolled = pending is not None
+    current_dice = pending or 1
+    start_history()
+    seed = new_dice_seed()
+    start_recording(seed)
+    start_game_events(dice_seed=seed, resumed=True)
+    return True
+
+# --- Undo / redo ---
+# Offline games keep every position they pass through in a ludo.history tree.
+# Ctrl+Z goes back to before the last move made at this machine, taking back
+# the computer moves after it too, with the same roll on the dice; moving
+# another token then starts a branch and keeps the old line. Ctrl+Y goes
+# forward to the next move made here, along the branch B picks. The save,
+# the recording and the event export carry on from the new position.
+history = None
+
+def start_history():
+    global history
+    history = History(state) if net_client is None and num_players >= 2 else None
+
+def record_history(kind, player_id, token_id, dice_roll):
+    if history is not None:
+        history.record(state, kind, player_id, token_id, dice_roll)
+
+def is_choice(move):
+    # A move picked at this machine, rather than by a computer player or forced
+    return move[0] == persistence.MOVE and not is_bot(move[1])
+
+def show_history_node(node):
+    # Go to node with the roll of the move chosen there next, if there is one
+    global current_dice, dice_rolled, winner_announced
+    history.goto(node, state)
+    winner_announced = state.winner is not None
+    following = node.children[node.redo] if node.children else None
+    dice_rolled = following is not None and is_choice(following.move)
+    autosave_snapshot()
+    if dice_rolled:
+        current_dice = following.move[3]
+        autosave(save_store.record_roll, state.current_player, current_dice)
+    # The dice no longer follow the game's seed
+    start_recording()
+    if game_events is not None:
+        game_events.start(state, rewound=True)
+
+def undo_moves():
+    node = history.node
+    while node.parent is not None:
+        move, node = node.move, node.parent
+        if is_choice(move):
+            break
+    if node is history.node:
+        return False
+    show_history_node(node)
+    return True
+
+def redo_moves():
+    node = history.node
+    if not node.children:
+        return False
+    node = node.children[node.redo]
+    while node.children and not is_choice(node.children[node.redo].move):
+        node = node.children[node.redo]
+    show_history_node(node)
+    return True
+
+def next_branch():
+    node = history.node
+    count = len(node.children or ())
+    if count < 2:
+        return False
+    history.select_branch((node.redo + 1) % count)
+    show_history_node(node)
+    show_message(f"Redo follows branch {node.redo + 1} of {count}")
+    return True
 
 # Message display
 message_text = None
 message_color = BLACK
-message_timer = 0
+message_end_time = 0
 
-def show_message(text, color=BLACK, duration=60):
+def show_message(text, color=BLACK, duration_ms=2000):
 # Show a message on the screen for a set duration
-    global message_text, message_color, message_timer
+    global message_text, message_color, message_end_time
     message_text = text
     message_color = color
-    message_timer = duration
+    message_end_time = pygame.time.get_ticks() + duration_ms
 
 # Winner check
 winner_announced = False
 
-def check_winner(player_id):
-    global winner_announced
-    if all(token_is_home[player_id]):
-        winner_announced = True
-        show_message(f"{players[player_id]['name']} wins!", color=players[player_id]['color'], duration=180)
-
 # --- UI Functions ---
 class InputBox:
     # InputBox: Handles text input for player names and numbers
@@ -250,7 +784,6 @@ class InputBox:
         self.rect = pygame.Rect(x, y, w, h)
         self.color = BLACK
         self.text = text
-        self.txt_surface = font_medium.render(text, True, self.color)
         self.active = False
 
     def handle_event(self, event):
@@ -265,173 +798,202 @@ class InputBox:
             else:
                 if len(self.text) < 10:
                     self.text += event.unicode
-            self.txt_surface = font_medium.render(self.text, True, BLACK)
 
     def draw(self, screen):
+        # The text is rendered at the current font size (render_cache keeps it)
         pygame.draw.rect(screen, WHITE, self.rect)
-        pygame.draw.rect(screen, BLACK, self.rect, 2)
-        screen.blit(self.txt_surface, (self.rect.x + 5, self.rect.y + 5))
+        pygame.draw.rect(screen, BLACK, self.rect, line_width(2))
+        screen.blit(render_text(self.text, self.color, FONT_MEDIUM), (self.rect.x + scaled(5), self.rect.y + scaled(5)))
+
+def compose_setup_background():
+    # Background image with a semi-transparent overlay for text visibility
+    surface = background_for_size().convert()
+    overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+    overlay.fill((255,255,255,120))  # White with alpha
+    surface.blit(overlay, (0,0))
+    return surface
+
+def seat_toggle_rect(box):
+    # Human/Computer switch to the right of a name box
+    return pygame.Rect(box.rect.right + scaled(10), box.rect.y + scaled(8), scaled(110), box.rect.height - scaled(16))
+
+def layout_setup_boxes(num_box):
+    # Place the input boxes for the current window size
+    num_box.rect.size = scaled(140), scaled(55)
+    num_box.rect.midtop = WIDTH // 2, HEIGHT // 2 + scaled(60)
+    # Space out input boxes vertically to avoid overlap
+    box_height, gap = scaled(50), scaled(40)
+    total_height = len(input_boxes) * box_height + (len(input_boxes)-1) * gap
+    start_y = HEIGHT//2 - total_height//2
+    for i, box in enumerate(input_boxes):
+        box.rect.size = scaled(200), box_height
+        box.rect.midtop = WIDTH // 2, start_y + i * (box_height + gap)
+
+def draw_setup_screen(surface, step, num_box, can_resume, bot_seats=()):
+    # One frame of the player selection screen
+    # Draw background image if available
+    if background_img:
+        surface.blit(render_cache.sized((WIDTH, HEIGHT), 'setup-background', compose_setup_background), (0, 0))
+    else:
+        surface.fill(WHITE)
+    layout_setup_boxes(num_box)
+    top = BOARD_Y
+    if step == 1:
+        # Show welcome text only on step 1
+        welcome_text = render_text("Welcome to Ludo!", (0, 80, 180), scaled(48), bold=True)
+        welcome_rect = pygame.Rect(WIDTH//2 - scaled(160), top + scaled(30), scaled(320), scaled(60))
+        pygame.draw.rect(surface, (255,255,255), welcome_rect, border_radius=scaled(18))
+        pygame.draw.rect(surface, (0,80,180), welcome_rect, line_width(3), border_radius=scaled(18))
+        surface.blit(welcome_text, welcome_text.get_rect(center=welcome_rect.center))
+        # Decorate player number prompt
+        # Enlarge and center prompt above input box
+        prompt_text = render_text(f"Enter number of players (2-{game_board.max_players})", (180,0,80), scaled(38), bold=True)
+        prompt_rect = pygame.Rect(0, 0, scaled(340), scaled(50))
+        prompt_rect.midbottom = WIDTH // 2, num_box.rect.y - scaled(18)
+        pygame.draw.rect(surface, (255,255,255), prompt_rect, border_radius=scaled(14))
+        pygame.draw.rect(surface, (180,0,80), prompt_rect, line_width(2), border_radius=scaled(14))
+        surface.blit(prompt_text, (WIDTH//2 - prompt_text.get_width()//2, prompt_rect.y + (prompt_rect.height - prompt_text.get_height())//2))
+        num_box.draw(surface)
+        if can_resume:
+            hint_text = render_text("or press L to load the saved game", (0, 80, 180), FONT_MEDIUM)
+            surface.blit(hint_text, hint_text.get_rect(center=(WIDTH//2, num_box.rect.bottom + scaled(30))))
+    elif step == 2:
+        # Remove welcome text for player name page
+        prompt_text = render_text("Enter player names:", (0,180,80), scaled(32), bold=True)
+        prompt_rect = pygame.Rect(WIDTH//2 - scaled(130), top + scaled(50), scaled(260), scaled(40))
+        pygame.draw.rect(surface, (255,255,255), prompt_rect, border_radius=scaled(12))
+        pygame.draw.rect(surface, (0,180,80), prompt_rect, line_width(2), border_radius=scaled(12))
+        surface.blit(prompt_text, (WIDTH//2 - prompt_text.get_width()//2, top + scaled(60)))
+        for i, box in enumerate(input_boxes):
+            box.draw(surface)
+            bot = i < len(bot_seats) and bot_seats[i]
+            toggle = seat_toggle_rect(box)
+            pygame.draw.rect(surface, (0, 80, 180) if bot else WHITE, toggle, border_radius=scaled(10))
+            pygame.draw.rect(surface, BLACK, toggle, line_width(2), border_radius=scaled(10))
+            label = render_text("Computer" if bot else "Human", WHITE if bot else BLACK, FONT_SMALL, bold=True)
+            surface.blit(label, label.get_rect(center=toggle.center))
 
 def setup_screen():
+    # Returns True if a saved game was loaded instead of starting a new one
     global num_players, input_boxes
-    clock = pygame.time.Clock()
+    scheduler = FrameScheduler(FPS)
     choosing_players = True
     step = 1
-    # Enlarge and center input box for better alignment
-    box_width, box_height = 140, 55
-    box_x = WIDTH // 2 - box_width // 2
-    box_y = HEIGHT // 2 + 60
-    num_box = InputBox(box_x, box_y, box_width, box_height)
+    # Boxes are sized and centred by layout_setup_boxes()
+    num_box = InputBox(0, 0, 0, 0)
     input_boxes = []
+    bot_seats = []
+    layout_setup_boxes(num_box)
+    can_resume = saved_game_available()
+    # Redrawn only after input, not on idle wakeups
+    dirty = True
     while choosing_players:
-        # Draw background image if available
-        if background_img:
-            screen.blit(background_img, (0, 0))
-            # Draw a semi-transparent overlay for text visibility
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((255,255,255,120))  # White with alpha
-            screen.blit(overlay, (0,0))
-        else:
-            screen.fill(WHITE)
-        # Show welcome text only on step 1
-        if step == 1:
-            welcome_font = pygame.font.SysFont(None, 48, bold=True)
-            welcome_text = welcome_font.render("Welcome to Ludo!", True, (0, 80, 180))
-            pygame.draw.rect(screen, (255,255,255), (WIDTH//2-160, 30, 320, 60), border_radius=18)
-            pygame.draw.rect(screen, (0,80,180), (WIDTH//2-160, 30, 320, 60), 3, border_radius=18)
-            screen.blit(welcome_text, welcome_text.get_rect(center=(WIDTH//2, 60)))
-
-        for event in pygame.event.get():
+        # Nothing animates here, so this sleeps until there is input
+        events = scheduler.next_events(animating=False)
+        dirty = dirty or bool(events)
+        for event in events:
             if event.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
+            if event.type == pygame.VIDEORESIZE:
+                resize_window(event.w, event.h)
+                layout_setup_boxes(num_box)
+                continue
 
             if step == 1:
+                if can_resume and event.type == pygame.KEYDOWN and event.key == pygame.K_l:
+                    if resume_saved_game():
+                        return True
+                    can_resume = False
+                    continue
                 num_box.handle_event(event)
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
                     try:
                         n = int(num_box.text)
-                        if 2 <= n <= 4:
+                        if 2 <= n <= game_board.max_players:
                             num_players = n
                             input_boxes = []
                             for i in range(n):
-                                input_boxes.append(InputBox(WIDTH//2 - 100, 150 + i*70, 200, 50))
+                                input_boxes.append(InputBox(0, 0, 0, 0))
+                            layout_setup_boxes(num_box)
+                            bot_seats = [False] * n
                             step = 2
                     except:
                         pass
             elif step == 2:
-                for box in input_boxes:
+                for i, box in enumerate(input_boxes):
                     box.handle_event(event)
+                    if event.type == pygame.MOUSEBUTTONDOWN and seat_toggle_rect(box).collidepoint(event.pos):
+                        bot_seats[i] = not bot_seats[i]
                 if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
-                    if all(box.text.strip() != '' for box in input_boxes):
+                    # Computer seats may be left unnamed
+                    if all(box.text.strip() != '' or bot for box, bot in zip(input_boxes, bot_seats)):
                         for i, box in enumerate(input_boxes):
-                            players.append({'name': box.text.strip(), 'color': PLAYER_COLORS[i]})
+                            player = {'name': box.text.strip() or f"Computer {i+1}", 'color': PLAYER_COLORS[i]}
+                            if bot_seats[i]:
+                                player['bot'] = True
+                            players.append(player)
                         choosing_players = False
 
-        if step == 1:
-            # Decorate player number prompt
-            prompt_font = pygame.font.SysFont(None, 32, bold=True)
-            prompt_text = prompt_font.render("Enter number of players (2-4)", True, (180,0,80))
-            # Enlarge and center prompt above input box
-            prompt_font = pygame.font.SysFont(None, 38, bold=True)
-            prompt_text = prompt_font.render("Enter number of players (2-4)", True, (180,0,80))
-            prompt_rect_width, prompt_rect_height = 340, 50
-            prompt_rect_x = WIDTH // 2 - prompt_rect_width // 2
-            prompt_rect_y = box_y - prompt_rect_height - 18
-            pygame.draw.rect(screen, (255,255,255), (prompt_rect_x, prompt_rect_y, prompt_rect_width, prompt_rect_height), border_radius=14)
-            pygame.draw.rect(screen, (180,0,80), (prompt_rect_x, prompt_rect_y, prompt_rect_width, prompt_rect_height), 2, border_radius=14)
-            screen.blit(prompt_text, (WIDTH//2 - prompt_text.get_width()//2, prompt_rect_y + (prompt_rect_height - prompt_text.get_height())//2))
-            num_box.draw(screen)
-        elif step == 2:
-            # Remove welcome text for player name page
-            prompt_font = pygame.font.SysFont(None, 32, bold=True)
-            prompt_text = prompt_font.render("Enter player names:", True, (0,180,80))
-            pygame.draw.rect(screen, (255,255,255), (120, 50, 260, 40), border_radius=12)
-            pygame.draw.rect(screen, (0,180,80), (120, 50, 260, 40), 2, border_radius=12)
-            screen.blit(prompt_text, (WIDTH//2 - prompt_text.get_width()//2, 60))
-            # Space out input boxes vertically to avoid overlap
-            y_start = 150
-            box_height = input_boxes[0].rect.height if input_boxes else 50
-            total_height = len(input_boxes) * box_height + (len(input_boxes)-1) * 40
-            start_y = HEIGHT//2 - total_height//2
-            for i, box in enumerate(input_boxes):
-                box.rect.x = WIDTH//2 - box.rect.width//2
-                box.rect.y = start_y + i * (box_height + 40)
-                box.draw(screen)
-
-        pygame.display.flip()
-        clock.tick(30)
+        if dirty:
+            dirty = False
+            draw_setup_screen(screen, step, num_box, can_resume, bot_seats)
+            pygame.display.flip()
+        if profile_startup:
+            report_startup()
+    return False
 
 # --- Board drawing functions ---
-def draw_token_area(color, x, y, player_id=None):
-    pygame.draw.rect(screen, color, (x, y, 6*CELL, 6*CELL))
-    pygame.draw.rect(screen, WHITE, (x+CELL, y+CELL, 4*CELL, 4*CELL))
-    pygame.draw.rect(screen, BLACK, (x, y, 6*CELL, 6*CELL), 3)
+@profiler.timed()
+def draw_token_area(surface, color, x, y, player_id=None):
+    side = game_board.arm_length
+    painter.yard(surface, color, x, y)
     # Draw player name cell on top (editable if added player)
     if player_id is not None and player_id < len(players):
-        name_rect = pygame.Rect(x+CELL, y+CELL//4, 4*CELL, CELL//1.5)
-        pygame.draw.rect(screen, WHITE, name_rect, border_radius=6)
-        pygame.draw.rect(screen, BLACK, name_rect, 2, border_radius=6)
-        name_text = font_small.render(players[player_id]['name'], True, BLACK)
-        screen.blit(name_text, name_text.get_rect(center=name_rect.center))
+        name_rect = pygame.Rect(x+CELL, y+CELL//4, (side-2)*CELL, CELL//1.5)
+        pygame.draw.rect(surface, WHITE, name_rect, border_radius=scaled(6))
+        pygame.draw.rect(surface, BLACK, name_rect, line_width(2), border_radius=scaled(6))
+        name_text = render_text(players[player_id]['name'], BLACK, FONT_SMALL)
+        surface.blit(name_text, name_text.get_rect(center=name_rect.center))
         # Editable name: if clicked, show input box
         if hasattr(players[player_id], 'editing') and players[player_id]['editing']:
             input_box = InputBox(name_rect.x+5, name_rect.y+5, name_rect.width-10, int(name_rect.height-10), players[player_id]['name'])
             input_box.active = True
-            input_box.draw(screen)
+            input_box.draw(surface)
             players[player_id]['input_box'] = input_box
         else:
             players[player_id]['input_box'] = None
 
-def draw_tile(x, y, color=WHITE, safe=False):
-    rect = pygame.Rect(x*CELL, y*CELL, CELL, CELL)
-    pygame.draw.rect(screen, color, rect)
-    pygame.draw.rect(screen, BLACK, rect, 1)
-    if safe:
-        pygame.draw.circle(screen, BLACK, (x*CELL + CELL//2, y*CELL + CELL//2), CELL//3, 2)
-
-def draw_cross_paths():
-    for y in range(15):
-        for x in range(6, 9):
-            draw_tile(x, y)
-    for x in range(15):
-        for y in range(6, 9):
-            draw_tile(x, y)
-    for i in range(6):
-        draw_tile(7, i+1, YELLOW, safe=(i==1))
-        draw_tile(7, 13-i, BLUE, safe=(i==1))
-        draw_tile(i+1, 7, GREEN, safe=(i==1))
-        draw_tile(13-i, 7, RED, safe=(i==1))
-
-def draw_center():
-    pygame.draw.polygon(screen, YELLOW, [(6*CELL, 6*CELL), (9*CELL, 6*CELL), (7.5*CELL,7.5*CELL)])
-    pygame.draw.polygon(screen, RED, [(9*CELL,6*CELL), (9*CELL,9*CELL), (7.5*CELL,7.5*CELL)])
-    pygame.draw.polygon(screen, BLUE, [(6*CELL,9*CELL), (9*CELL,9*CELL), (7.5*CELL,7.5*CELL)])
-    pygame.draw.polygon(screen, GREEN, [(6*CELL,6*CELL),(6*CELL,9*CELL),(7.5*CELL,7.5*CELL)])
-    pygame.draw.rect(screen, BLACK, (6*CELL,6*CELL,3*CELL,3*CELL), 3)
-
-def draw_colored_left_tiles():
-    for x in range(1,6):
-        draw_tile(x,7,GREEN)
-    draw_tile(1,6,GREEN)
-    for x in range(13,8,-1):
-        draw_tile(x,7,RED)
-    draw_tile(13,8,RED)
-    for y in range(1,6):
-        draw_tile(7,y,YELLOW)
-    draw_tile(8,1,YELLOW)
-    for y in range(13,8,-1):
-        draw_tile(7,y,BLUE)
-    draw_tile(6,13,BLUE)
-
-def draw_tokens():
-    for player_id, player_tokens in enumerate(token_positions):
-        for pos in player_tokens:
-            pygame.draw.circle(screen, PLAYER_COLORS[player_id], pos, CELL // 3)
-            pygame.draw.circle(screen, BLACK, pos, CELL // 3, 2)
-
-def draw_dice(value, color):
-    pygame.draw.rect(screen, color, dice_rect, border_radius=8)
+def draw_tile(surface, x, y, color=WHITE, safe=False):
+    painter.tile(surface, x, y, color, safe)
+
+def draw_board_tile(surface, tile, color):
+    painter.board_tile(surface, tile, color)
+
+@profiler.timed()
+def draw_cross_paths(surface):
+    painter.cross_paths(surface)
+
+@profiler.timed()
+def draw_center(surface):
+    painter.center(surface)
+
+@profiler.timed()
+def draw_colored_left_tiles(surface):
+    painter.colored_tiles(surface)
+
+@profiler.timed()
+def draw_token(surface, pos, color, movable=False, hinted=False):
+    painter.token(surface, pos, color, movable, hinted)
+
+@profiler.timed()
+def draw_tokens(surface):
+    for player_id, _, pos in iter_token_coords():
+        draw_token(surface, pos, PLAYER_COLORS[player_id])
+
+@profiler.timed()
+def draw_dice(surface, value, color):
+    pygame.draw.rect(surface, color, dice_rect, border_radius=scaled(8))
     dot_color = WHITE
     cx, cy = dice_rect.center
     offset = dice_size // 4
@@ -444,102 +1006,383 @@ def draw_dice(value, color):
         6: [(cx-offset,cy-offset),(cx+offset,cy-offset),(cx-offset,cy),(cx+offset,cy),(cx-offset,cy+offset),(cx+offset,cy+offset)]
     }
     for pos in positions[value]:
-        pygame.draw.circle(screen, dot_color, pos, dice_size // 8)
-
-def draw_roll_button(color):
-    pygame.draw.rect(screen, color, roll_button, border_radius=10)
-    pygame.draw.rect(screen, BLACK, roll_button, 2, border_radius=10)
-    text = font_small.render("ROLL", True, BLACK)
-    screen.blit(text, text.get_rect(center=roll_button.center))
-
-def draw_control_buttons():
-    pygame.draw.rect(screen, RED, quit_button, border_radius=8)
-    pygame.draw.rect(screen, BLACK, quit_button, 2, border_radius=8)
-    text = font_small.render("QUIT", True, WHITE)
-    screen.blit(text, text.get_rect(center=quit_button.center))
-
-
-
-
-    pygame.draw.rect(screen, GREEN, add_player_button, border_radius=8)
-    pygame.draw.rect(screen, BLACK, add_player_button, 2, border_radius=8)
-    text = font_small.render("ADD", True, WHITE)
-    text2 = font_small.render("PLAYER", True, WHITE)
+        pygame.draw.circle(surface, dot_color, pos, dice_size // 8)
+
+@profiler.timed()
+def draw_roll_button(surface, color):
+    pygame.draw.rect(surface, color, roll_button, border_radius=scaled(10))
+    pygame.draw.rect(surface, BLACK, roll_button, line_width(2), border_radius=scaled(10))
+    text = render_text("ROLL", BLACK, FONT_SMALL)
+    surface.blit(text, text.get_rect(center=roll_button.center))
+
+@profiler.timed()
+def draw_message(surface, text, color):
+    msg = render_text(text, color, FONT_LARGE)
+    surface.blit(msg, msg.get_rect(center=(WIDTH//2, HEIGHT//2)))
+
+@profiler.timed()
+def draw_control_buttons(surface):
+    pygame.draw.rect(surface, RED, quit_button, border_radius=scaled(8))
+    pygame.draw.rect(surface, BLACK, quit_button, line_width(2), border_radius=scaled(8))
+    text = render_text("QUIT", WHITE, FONT_SMALL)
+    surface.blit(text, text.get_rect(center=quit_button.center))
+
+    pygame.draw.rect(surface, GREEN, add_player_button, border_radius=scaled(8))
+    pygame.draw.rect(surface, BLACK, add_player_button, line_width(2), border_radius=scaled(8))
+    text = render_text("ADD", WHITE, FONT_SMALL)
+    text2 = render_text("PLAYER", WHITE, FONT_SMALL)
     # Center both lines in the button
-    text_rect = text.get_rect(center=(add_player_button.centerx, add_player_button.centery - 8))
-    text2_rect = text2.get_rect(center=(add_player_button.centerx, add_player_button.centery + 8))
-    screen.blit(text, text_rect)
-    screen.blit(text2, text2_rect)
+    text_rect = text.get_rect(center=(add_player_button.centerx, add_player_button.centery - scaled(8)))
+    text2_rect = text2.get_rect(center=(add_player_button.centerx, add_player_button.centery + scaled(8)))
+    surface.blit(text, text_rect)
+    surface.blit(text2, text2_rect)
 
-    pygame.draw.rect(screen, YELLOW, reset_button, border_radius=8)
-    pygame.draw.rect(screen, BLACK, reset_button, 2, border_radius=8)
-    text = font_small.render("RESET", True, BLACK)
-    screen.blit(text, text.get_rect(center=reset_button.center))
+    pygame.draw.rect(surface, YELLOW, reset_button, border_radius=scaled(8))
+    pygame.draw.rect(surface, BLACK, reset_button, line_width(2), border_radius=scaled(8))
+    text = render_text("RESET", BLACK, FONT_SMALL)
+    surface.blit(text, text.get_rect(center=reset_button.center))
 
     # Draw remove player button
-    pygame.draw.rect(screen, RED, remove_player_button, border_radius=8)
-    pygame.draw.rect(screen, BLACK, remove_player_button, 2, border_radius=8)
-    text = font_small.render("REMOVE", True, WHITE)
-    text2 = font_small.render("PLAYER", True, WHITE)
-    text_rect = text.get_rect(center=(remove_player_button.centerx, remove_player_button.centery - 8))
-    text2_rect = text2.get_rect(center=(remove_player_button.centerx, remove_player_button.centery + 8))
-    screen.blit(text, text_rect)
-    screen.blit(text2, text2_rect)
+    pygame.draw.rect(surface, RED, remove_player_button, border_radius=scaled(8))
+    pygame.draw.rect(surface, BLACK, remove_player_button, line_width(2), border_radius=scaled(8))
+    text = render_text("REMOVE", WHITE, FONT_SMALL)
+    text2 = render_text("PLAYER", WHITE, FONT_SMALL)
+    text_rect = text.get_rect(center=(remove_player_button.centerx, remove_player_button.centery - scaled(8)))
+    text2_rect = text2.get_rect(center=(remove_player_button.centerx, remove_player_button.centery + scaled(8)))
+    surface.blit(text, text_rect)
+    surface.blit(text2, text2_rect)
+
+@profiler.timed()
+def draw_static_board(surface):
+    # Everything that only changes when the seating or the window size changes
+    surface.fill(WHITE)
+    # The board is drawn in its own coordinates, with (0, 0) at its corner
+    board = surface.subsurface(board_rect().clip(surface.get_rect()))
+    for player_id, (x, y) in enumerate(game_board.yards):
+        draw_token_area(board, PLAYER_COLORS[player_id], round(x*CELL), round(y*CELL), player_id=player_id)
+    draw_cross_paths(board)
+    draw_colored_left_tiles(board)
+    draw_center(board)
+    draw_control_buttons(surface)
+
+# --- Layered renderer ---
+# The static board and buttons are rendered once per window size into a board
+# layer, kept in render_cache, and only redrawn when the player names on it
+# change. Tokens are sprites drawn over it (see Token sprites below). The dice,
+# the roll button and messages make up the dynamic layer: each item has a
+# signature, and only items whose signature changed get their old and new
+# rects restored from the board layer and redrawn.
+board_layer = None
+layer_items = {}
+
+def get_board_layer():
+    # Returns (surface, changed); changed when it is not the layer on screen
+    global board_layer
+    key = ('board',) + tuple(player['name'] for player in players)
+    layer = render_cache.sized((WIDTH, HEIGHT), key, compose_board_layer)
+    changed = layer is not board_layer
+    board_layer = layer
+    return layer, changed
+
+def compose_board_layer():
+    # Made in the screen's pixel format rather than converted: at 4K the copy
+    # costs as much as drawing the board
+    layer = pygame.Surface((WIDTH, HEIGHT), 0, screen)
+    draw_static_board(layer)
+    return layer
+
+def invalidate_board_layer():
+    # Something else was drawn on screen; repaint everything next frame
+    global board_layer
+    board_layer = None
+
+def token_rect(pos):
+    radius = CELL // 3
+    return pygame.Rect(pos[0] - radius - 1, pos[1] - radius - 1, 2*radius + 2, 2*radius + 2)
+
+# --- Token sprites ---
+# Every token is a sprite in token_sprites. sync_token_sprites() keeps them in
+# step with the engine state: moves and captures passed to handle_game_events()
+# glide square by square, any other change (new game, resume, replay seek) is
+# shown at once.
+TOKEN_STEP_MS = 70
+CAPTURE_MS = 250
+# Longest glide; moves that queue up on a moving token speed it up instead
+MAX_GLIDE_MS = 6 * TOKEN_STEP_MS
+token_sprites = TokenGroup()
+# Token positions and rims the sprites were last matched to
+token_sprites_key = None
+
+def token_image(color, movable, hinted=False):
+    return render_cache.sized((WIDTH, HEIGHT), ('token', color, movable, hinted),
+                              lambda: compose_token(color, movable, hinted))
+
+def compose_token(color, movable, hinted):
+    rect = token_rect((0, 0))
+    image = pygame.Surface(rect.size, pygame.SRCALPHA)
+    draw_token(image, (-rect.x, -rect.y), color, movable, hinted)
+    return image.convert_alpha()
+
+def animate_tokens(events):
+    # Start the animations for the events of one move
+    now = pygame.time.get_ticks()
+    # When the moving token lands; a captured token leaves then
+    arrival = now
+    for event in events:
+        if isinstance(event, engine.TokenEntered):
+            waypoints = [index_coords(event.player, event.token, 0)]
+        elif isinstance(event, engine.TokenMoved):
+            waypoints = [index_coords(event.player, event.token, index) for index in range(event.start + 1, event.end + 1)]
+        elif isinstance(event, engine.TokenCaptured):
+            sprite = token_sprites.tokens.get((event.victim, event.victim_token))
+            if sprite is not None:
+                sprite.move_along([get_home_coords(event.victim, event.victim_token)], arrival, CAPTURE_MS)
+            continue
+        else:
+            continue
+        sprite = token_sprites.tokens.get((event.player, event.token))
+        if sprite is not None:
+            sprite.move_along(waypoints, now, TOKEN_STEP_MS, MAX_GLIDE_MS)
+            arrival = now + len(sprite.waypoints) * sprite.step_ms
+
+@profiler.timed()
+def sync_token_sprites():
+    # Match the sprites to the seating and the engine state, then advance their animations
+    global token_sprites_key
+    movable_mask = engine.movable_mask(state, state.current_player, current_dice) if dice_rolled else 0
+    hint = hinted_token()
+    key = (state.current_player, movable_mask, hint, tuple(map(tuple, state.path_indices)))
+    if key != token_sprites_key:
+        # Only tokens whose path index, rim or hint mark changed are looked at
+        old_player, old_mask, old_hint, old_indices = token_sprites_key or (None, 0, None, ())
+        token_sprites_key = key
+        for player_id, indices in enumerate(key[3]):
+            old = old_indices[player_id] if player_id < len(old_indices) else ()
+            for token_id, index in enumerate(indices):
+                movable = player_id == state.current_player and bool(movable_mask >> token_id & 1)
+                was_movable = player_id == old_player and bool(old_mask >> token_id & 1)
+                hinted = player_id == state.current_player and token_id == hint
+                was_hinted = player_id == old_player and token_id == old_hint
+                if old and old[token_id] == index and movable == was_movable and hinted == was_hinted:
+                    continue
+                image = token_image(PLAYER_COLORS[player_id], movable, hinted)
+                pos = index_coords(player_id, token_id, index)
+                sprite = token_sprites.tokens.get((player_id, token_id))
+                if sprite is None:
+                    token_sprites.add_token((player_id, token_id), image, pos)
+                    continue
+                sprite.set_image(image)
+                if sprite.destination != pos:
+                    sprite.place(pos)
+        for stale in [stale for stale in token_sprites.tokens if stale[0] >= state.num_players]:
+            token_sprites.remove_token(stale)
+    token_sprites.update(pygame.time.get_ticks())
+
+@profiler.timed()
+def dynamic_layer():
+    # Returns {item_id: (signature, rect, draw_fn)} in drawing order
+    items = {}
+    if hints_enabled and players:
+        # Drawn first, so a dragged dice passes over it
+        rates = hint_rates if hint_rates and len(hint_rates) == len(players) else None
+        shown = rates and tuple(round(rate * 100) for rate in rates)
+        # Rollouts behind the rates, or 'exact' for tablebase positions
+        source = analysis and ('exact' if analysis.exact else analysis.rollouts)
+        rect = hint_panel_rect()
+        items['hints'] = (('hints', shown, source, rect.topleft), rect,
+                          lambda surface, shown=shown, source=source: draw_hint_panel(surface, shown, source))
+    if players:
+        color = players[state.current_player]['color']
+        items['dice'] = (('dice', current_dice, color, dice_rect.topleft), dice_rect.copy(),
+                         lambda surface, value=current_dice, color=color: draw_dice(surface, value, color))
+        if not rolling and not dice_rolled and my_turn():
+            items['roll'] = (('roll', color), roll_button.copy(),
+                             lambda surface, color=color: draw_roll_button(surface, color))
+    if message_text:
+        text, color = message_text, message_color
+        rect = pygame.Rect((0, 0), render_cache.text_size(text, FONT_LARGE))
+        rect.center = (WIDTH//2, HEIGHT//2)
+        items['message'] = ((text, color), rect,
+                            lambda surface, text=text, color=color: draw_message(surface, text, color))
+    if profiler.hud and hud_lines:
+        items['hud'] = (hud_lines, hud_rect(hud_lines), lambda surface, lines=hud_lines: draw_hud(surface, lines))
+    return items
+
+@profiler.timed()
+def draw_hint_panel(surface, percents, source):
+    # Win chance bars, one per player, in the space right of the roll button
+    rect = hint_panel_rect()
+    pygame.draw.rect(surface, WHITE, rect, border_radius=scaled(6))
+    pygame.draw.rect(surface, BLACK, rect, line_width(1), border_radius=scaled(6))
+    surface.blit(render_text("Win chance", BLACK, FONT_SMALL), (rect.x + scaled(6), rect.y + scaled(4)))
+    if source:
+        if source == 'exact':
+            label = source
+        else:
+            label = f"{source / 1000:.1f}k" if source >= 1000 else str(source)
+        count = render_text(label, BLACK, FONT_SMALL)
+        surface.blit(count, count.get_rect(topright=(rect.right - scaled(6), rect.y + scaled(4))))
+    # Rows shrink to fit boards with more than four seats
+    pitch = min(scaled(17), (rect.height - scaled(26)) // max(1, len(players)))
+    bar = pygame.Rect(rect.x + scaled(6), rect.y + scaled(24), rect.width - scaled(46), min(scaled(11), pitch - 2))
+    for player_id, player in enumerate(players):
+        if percents:
+            pygame.draw.rect(surface, player['color'], (bar.x, bar.y, bar.width * percents[player_id] // 100, bar.height))
+            text = render_text(f"{percents[player_id]}%", BLACK, FONT_SMALL)
+            surface.blit(text, text.get_rect(midleft=(bar.right + scaled(4), bar.centery)))
+        pygame.draw.rect(surface, player['color'] if percents else BLACK, bar, line_width(1))
+        bar.move_ip(0, pitch)
+
+def hint_panel_rect():
+    left = roll_button.right + scaled(10)
+    top = board_rect().bottom + scaled(4)
+    return pygame.Rect(left, top, BOARD_X + scaled(BASE_WIDTH) - scaled(4) - left, scaled(94))
+
+@profiler.timed()
+def draw_hud(surface, lines):
+    rect = hud_rect(lines)
+    pygame.draw.rect(surface, WHITE, rect)
+    pygame.draw.rect(surface, BLACK, rect, 1)
+    for i, line in enumerate(lines):
+        surface.blit(render_text(line, BLACK, FONT_SMALL), (rect.x + scaled(4), rect.y + scaled(3) + i * scaled(16)))
+
+def hud_rect(lines):
+    width = max(render_cache.text_size(line, FONT_SMALL)[0] for line in lines)
+    return pygame.Rect(2, 2, width + scaled(8), len(lines) * scaled(16) + scaled(6))
+
+def refresh_hud(now):
+    global hud_lines, hud_refresh_at
+    if now < hud_refresh_at:
+        return
+    hud_refresh_at = now + 250
+    frame_ms, fps, phases = profiler.summary()
+    hud_lines = (f"frame {frame_ms:.2f} ms  {fps:.0f} FPS",) + tuple(f"{name} {ms:.2f} ms" for name, ms in phases)
+
+def toggle_trace():
+    # F4: start recording TRACE_FRAMES frames, or save what was recorded so far
+    if profiler.tracing:
+        finish_trace()
+    else:
+        profiler.start_trace(TRACE_FRAMES, time.strftime("ludo-trace-%Y%m%d-%H%M%S.json"))
+        show_message(f"Tracing {TRACE_FRAMES} frames...")
 
+def finish_trace():
+    try:
+        path = profiler.finish_trace()
+    except OSError as e:
+        show_message("Could not save trace", color=RED)
+        print(f"trace export failed: {e}", file=sys.stderr)
+        return
+    if path:
+        show_message(f"Trace saved: {os.path.basename(path)}")
+        print(f"trace written to {path}", file=sys.stderr)
+
+@profiler.timed()
 def draw_board():
-    screen.fill(WHITE)
-    draw_token_area(GREEN,0,0,player_id=0)
-    draw_token_area(YELLOW,9*CELL,0,player_id=1)
-    draw_token_area(BLUE,0,9*CELL,player_id=2)
-    draw_token_area(RED,9*CELL,9*CELL,player_id=3)
-    draw_cross_paths()
-    draw_colored_left_tiles()
-    draw_center()
-    if players:
-        draw_dice(current_dice, players[current_player_idx]['color'])
-        if not rolling and not dice_rolled:
-            draw_roll_button(players[current_player_idx]['color'])
-    draw_tokens()
-    draw_control_buttons()
-    # Draw message if any
-    if message_text and message_timer > 0:
-        msg = font_large.render(message_text, True, message_color)
-        screen.blit(msg, msg.get_rect(center=(WIDTH//2, HEIGHT//2)))
+    # Full repaint: static layer, tokens and every dynamic item
+    global layer_items
+    layer, _ = get_board_layer()
+    sync_token_sprites()
+    token_sprites.repaint_rect(screen.get_rect())
+    token_sprites.draw(screen, layer)
+    layer_items = dynamic_layer()
+    for _, _, draw in layer_items.values():
+        draw(screen)
+
+@profiler.timed()
+def update_board():
+    # Incremental repaint. Returns the list of rects that changed on screen.
+    global layer_items
+    layer, changed = get_board_layer()
+    if changed:
+        draw_board()
+        return [screen.get_rect()]
+    items = dynamic_layer()
+    changed = []
+    for item_id, (signature, rect, _) in layer_items.items():
+        if item_id not in items or items[item_id][0] != signature:
+            changed.append(rect)
+    for item_id, (signature, rect, _) in items.items():
+        if item_id not in layer_items or layer_items[item_id][0] != signature:
+            changed.append(rect)
+    layer_items = items
+    # Changed items are restored from the board layer by the sprite group,
+    # together with the old and new rects of every sprite that moved
+    for rect in merge_rects(changed):
+        token_sprites.repaint_rect(rect)
+    sync_token_sprites()
+    dirty = token_sprites.draw(screen, layer)
+    # Redraw the items over each repainted area, clipped so untouched
+    # neighbours on screen are left alone
+    for rect in dirty:
+        screen.set_clip(rect)
+        for _, item_rect, draw in items.values():
+            if item_rect.colliderect(rect):
+                draw(screen)
+    screen.set_clip(None)
+    return dirty
+
+def merge_rects(rects):
+    # Union overlapping rects, so nothing is drawn twice onto the same pixels
+    merged = []
+    for rect in rects:
+        rect = rect.copy()
+        i = rect.collidelist(merged)
+        while i >= 0:
+            rect.union_ip(merged.pop(i))
+            i = rect.collidelist(merged)
+        merged.append(rect)
+    return merged
+
+hover_cursor = None
+
+def update_hover_cursor(pos):
+    # Hand cursor over a token the current player can move with the rolled dice
+    global hover_cursor
+    movable_mask = engine.movable_mask(state, state.current_player, current_dice) if dice_rolled else 0
+    movable = any(movable_mask >> token_id & 1 for _, token_id in tokens_at(pos, state.current_player))
+    cursor = pygame.SYSTEM_CURSOR_HAND if movable else pygame.SYSTEM_CURSOR_ARROW
+    if cursor != hover_cursor:
+        hover_cursor = cursor
+        try:
+            pygame.mouse.set_system_cursor(cursor)
+        except pygame.error:
+            # Some video drivers have no system cursors
+            pass
 
 # --- Main loop ---
 def main_game():
-    global current_dice, rolling, roll_timer, current_player_idx, dragging, dice_rect, roll_button, dice_rolled, message_timer, winner_announced, num_players
-    clock = pygame.time.Clock()
-    initialize_tokens()
+    global current_dice, rolling, roll_end_time, dragging, dice_rect, roll_button, dice_rolled, message_text, winner_announced, num_players, net_waiting
+    scheduler = FrameScheduler(FPS)
 
     def restart_game():
 # Restart the game to initial state
-        global current_player_idx, current_dice, rolling, roll_timer, dice_rolled
-        current_player_idx = 0
+        global current_dice, rolling, dice_rolled
         current_dice = 1
         rolling = False
-        roll_timer = 0
         dice_rolled = False
         initialize_tokens()
 
     def reset_game():
 # Reset the game and return to player selection
-        global num_players, players, current_player_idx, current_dice, rolling, roll_timer, dice_rolled
+        global num_players, players, current_dice, rolling, dice_rolled
         num_players = 0
         players.clear()
-        current_player_idx = 0
         current_dice = 1
         rolling = False
-        roll_timer = 0
         dice_rolled = False
         initialize_tokens()
-        setup_screen()
-        restart_game()
+        resumed = setup_screen()
+        # setup_screen painted over the board; force a full repaint
+        invalidate_board_layer()
+        scheduler.request_frame()
+        if not resumed:
+            restart_game()
 
     def add_player():
-# Add a new player to the game (max 4)
+# Add a new player to the game (one per arm of the board)
         global num_players
-        if num_players < 4:
+        if num_players < game_board.max_players:
             name = f"Player {num_players+1}"
             players.append({'name': name, 'color': PLAYER_COLORS[num_players]})
             num_players += 1
@@ -549,55 +1392,94 @@ def main_game():
 # Remove the last player (min 2)
 # Setup the initial screen for player selection
 # Main game loop and event handling
-        global num_players, current_player_idx
+        global num_players
         if num_players > 2:
             players.pop()
             num_players -= 1
-            if current_player_idx >= num_players:
-                current_player_idx = 0
             initialize_tokens()
 
     def quit_game():
+        close_analyst()
         pygame.quit()
         sys.exit()
 
+    # Pending computer move and the state it was searched from
+    bot_move = None
+    bot_move_state = None
+
+    online = net_client is not None
+
     while True:
-        for event in pygame.event.get():
+        bot_turn = bool(players) and state.winner is None and is_bot(state.current_player)
+        # Run at FPS only while the dice, a token, a message, a drag, a computer turn or the HUD needs frames
+        animating = (rolling or dragging or token_sprites.animating or message_text is not None
+                     or bot_turn or profiler.hud)
+        events = scheduler.next_events(animating)
+        profiler.begin_frame()
+        profiler.phase('events')
+        for event in events:
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                quit_game()
+            elif event.type == pygame.VIDEORESIZE:
+                # Drops a dice drag in progress; the dice goes back to its place
+                resize_window(event.w, event.h)
+                dragging = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.set_hud(not profiler.hud)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                toggle_trace()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                toggle_hints()
+            elif (event.type == pygame.KEYDOWN and event.key in (pygame.K_z, pygame.K_y, pygame.K_b)
+                  and history is not None and not rolling):
+                if event.key == pygame.K_b:
+                    jumped = next_branch()
+                elif event.mod & pygame.KMOD_CTRL:
+                    jumped = undo_moves() if event.key == pygame.K_z else redo_moves()
+                else:
+                    jumped = False
+                if jumped:
+                    # A computer move being searched is for the old position
+                    bot_move = None
+            elif event.type == NET_MESSAGE:
+                net_inbox.append(event.message)
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if quit_button.collidepoint(event.pos):
                     quit_game()
-                
-                elif reset_button.collidepoint(event.pos):
+                # Seats are fixed by the server room in network play
+                elif reset_button.collidepoint(event.pos) and not online:
                     reset_game()
-                elif add_player_button.collidepoint(event.pos):
-                    if num_players < 4:
+                elif add_player_button.collidepoint(event.pos) and not online:
+                    if num_players < game_board.max_players:
                         add_player()
-                elif remove_player_button.collidepoint(event.pos):
+                elif remove_player_button.collidepoint(event.pos) and not online:
                     remove_player()
-                elif roll_button.collidepoint(event.pos) and not rolling and not dice_rolled:
-                    rolling = True
-                    roll_timer = ROLL_DURATION
-                    if dice_sound:
-                        dice_sound.play()
+                elif roll_button.collidepoint(event.pos) and not rolling and not dice_rolled and not bot_turn and my_turn():
+                    if online:
+                        if not net_waiting and state.winner is None:
+                            net_waiting = True
+                            net_client.roll()
+                    else:
+                        start_roll()
                 elif dice_rect.collidepoint(event.pos):
                     dragging = True
                     mouse_x, mouse_y = event.pos
                     offset_x = dice_rect.x - mouse_x
                     offset_y = dice_rect.y - mouse_y
-                elif dice_rolled:
-                    player_tokens = token_positions[current_player_idx]
-                    for i, pos in enumerate(player_tokens):
-                        distance = ((event.pos[0] - pos[0]) ** 2 + (event.pos[1] - pos[1]) ** 2) ** 0.5
-                        if distance < CELL // 3:
-                            moved = move_token(current_player_idx, i, current_dice)
-                            if moved:
-                                dice_rolled = False
-                                if current_dice != 6:
-                                    current_player_idx = (current_player_idx + 1) % num_players
-                                break
+                elif dice_rolled and online:
+                    for player_id, token_id in tokens_at(event.pos, net_seat):
+                        if engine.can_move_token(state, player_id, token_id, current_dice):
+                            # The move is shown once the server confirms it
+                            dice_rolled = False
+                            net_waiting = True
+                            net_client.move(token_id)
+                            break
+                elif dice_rolled and not bot_turn:
+                    for player_id, token_id in tokens_at(event.pos, state.current_player):
+                        # move_token also hands the dice on unless it was a 6
+                        if move_token(player_id, token_id, current_dice):
+                            dice_rolled = False
+                            break
 
             elif event.type == pygame.MOUSEBUTTONUP:
                 dragging = False
@@ -605,58 +1487,129 @@ def main_game():
                 mouse_x, mouse_y = event.pos
                 dice_rect.x = mouse_x + offset_x
                 dice_rect.y = mouse_y + offset_y
+            elif event.type == pygame.MOUSEMOTION:
+                update_hover_cursor(event.pos)
 
+        profiler.phase('logic')
+        now = pygame.time.get_ticks()
         if rolling:
-            current_dice = random.randint(1,6)
-            roll_timer -= 1
-            if roll_timer <= 0:
+            current_dice = game_dice.cosmetic.roll()
+            if now >= roll_end_time and online:
+                rolling = False
+                finish_net_roll()
+            elif now >= roll_end_time:
                 rolling = False
                 dice_rolled = True
-                # Fix: ensure can_move_any_token is defined
-                if 'can_move_any_token' in globals() and not can_move_any_token(current_player_idx, current_dice):
+                current_dice = game_dice.roll(state.current_player)
+                export_roll(state.current_player, current_dice)
+                autosave(save_store.record_roll, state.current_player, current_dice)
+                if not can_move_any_token(state.current_player, current_dice):
+                    dice_rolled = False
+                    player_id = state.current_player
+                    handle_game_events(engine.pass_turn(state, current_dice))
+                    autosave(save_store.record_pass, player_id, current_dice)
+                    record_game(persistence.PASS, player_id, 0, current_dice)
+                    record_history(persistence.PASS, player_id, 0, current_dice)
+        # Server messages wait while a roll is animating
+        while net_inbox and not rolling:
+            handle_net_message(net_inbox.popleft())
+        # Computer turns: roll once the last move has landed, search in the background, then move
+        if bot_turn and not rolling and not dice_rolled and not token_sprites.animating:
+            start_roll()
+        elif bot_turn and dice_rolled and bot_move is None:
+            bot_move = start_bot_search()
+            bot_move_state = state
+        if bot_move is not None and bot_move.done():
+            result = bot_move.result()
+            bot_move = None
+            # Drop the result if the game was restarted while searching
+            if state is bot_move_state and dice_rolled and result.token is not None:
+                if move_token(state.current_player, result.token, current_dice):
                     dice_rolled = False
-                    if current_dice != 6:
-                        current_player_idx = (current_player_idx + 1) % num_players
+        # Hints follow the position after this frame's rolls and moves
+        update_analysis()
         # Message timer update
-        if message_timer > 0:
-            message_timer -= 1
-            if message_timer == 0:
-                global message_text
-                message_text = None
-        draw_board()
-        pygame.display.flip()
-        clock.tick(30)
-
-def can_move_any_token(player_id, dice_roll):
-    # Can move out of home with 6
-    if dice_roll == 6 and any(token_is_home[player_id]):
-        return True
-    for i in range(4):
-        if not token_is_home[player_id][i]:
-            current_path_index = token_path_indices[player_id][i]
-            path_length = len(full_paths[player_id])
-            # Can move if not exceeding path
-            if current_path_index + dice_roll <= path_length:
-                return True
-    return False
+        if message_text is not None and now >= message_end_time:
+            message_text = None
+        if profiler.hud:
+            refresh_hud(now)
+        profiler.phase('render')
+        dirty = update_board()
+        profiler.phase('present')
+        if dirty:
+            pygame.display.update(dirty)
+        profiler.end_frame()
+        if profiler.trace_ready:
+            finish_trace()
 
 if __name__ == "__main__":
 # Entry point: start the game
-    # Background image setup
-    background_img = None
+    parser = argparse.ArgumentParser(description="Ludo board game")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print time spent in each startup phase")
+    parser.add_argument("--connect", metavar="HOST:PORT",
+                        help="play online through a ludo.server instead of at this machine")
+    parser.add_argument("--room", default="ludo", help="server room to join (with --connect)")
+    parser.add_argument("--name", default="Player", help="your name (with --connect)")
+    parser.add_argument("--seats", type=int, default=4, choices=(2, 3, 4),
+                        help="room size if the room is new (with --connect)")
+    parser.add_argument("--trace", metavar="FILE", help="write a Chrome trace of the first game frames to FILE")
+    parser.add_argument("--trace-frames", type=int, default=TRACE_FRAMES, help="frames to trace (with --trace)")
+    parser.add_argument("--hud", action="store_true", help="start with the profiling HUD on (toggle with F3)")
+    parser.add_argument("--hints", action="store_true", help="start with the win chance panel and hints on (toggle with H)")
+    parser.add_argument("--replay", metavar="FILE", help="watch a recorded game (.ludorec)")
+    parser.add_argument("--speed", type=float, default=REPLAY_SPEED, help="replay speed in moves per second")
+    parser.add_argument("--size", type=window_size, default=(BASE_WIDTH, BASE_HEIGHT), metavar="WxH",
+                        help="starting window size (the window can also be resized)")
+    parser.add_argument("--arms", type=int, default=CLASSIC.arms, choices=range(MIN_ARMS, len(PLAYER_COLORS) + 1),
+                        help="arms of the board, one per seat")
+    parser.add_argument("--arm-length", type=int, default=CLASSIC.arm_length, help="squares along each arm")
+    parser.add_argument("--tokens", type=int, default=CLASSIC.tokens_per_player, help="tokens per player")
+    parser.add_argument("--tablebase", metavar="FILE",
+                        help="endgame tablebase from python -m ludo.tablebase (by default the one in the "
+                             "save directory, if generated)")
+    parser.add_argument("--events", metavar="DIR", help="export every game's events to NDJSON files in DIR")
+    args = parser.parse_args()
     try:
-        img = pygame.image.load("background.jpg")
-        img_rect = img.get_rect()
-        scale_w = WIDTH / img_rect.width
-        scale_h = HEIGHT / img_rect.height
-        scale = max(scale_w, scale_h)
-        new_size = (int(img_rect.width * scale), int(img_rect.height * scale))
-        img = pygame.transform.smoothscale(img, new_size)
-        x_offset = (img.get_width() - WIDTH) // 2
-        y_offset = (img.get_height() - HEIGHT) // 2
-        background_img = img.subsurface((x_offset, y_offset, WIDTH, HEIGHT)).copy()
-    except Exception:
-        background_img = None
-
-    setup_screen()
-    main_game()
\ No newline at end of file
+        game_board = make_board(args.arm_length, args.arms, args.tokens)
+    except ValueError as e:
+        parser.error(str(e))
+    if game_board is not CLASSIC and (args.connect or args.replay):
+        parser.error("online games and replays use the classic board")
+    try:
+        load_tablebase(args.tablebase)
+    except (OSError, TablebaseError) as e:
+        parser.exit(1, f"ludo: cannot open tablebase: {e}\n")
+    if args.events:
+        try:
+            event_log = EventLog(args.events, prefix='ludo')
+        except OSError as e:
+            parser.exit(1, f"ludo: cannot write events to {args.events}: {e}\n")
+        # Writes out the queued events and finishes the file however the game exits
+        atexit.register(event_log.close)
+    profile_startup = args.profile_startup
+    startup_phases.append(("imports", time.perf_counter() - startup_start))
+
+    with startup_phase("display init"):
+        init_display(args.size)
+    with startup_phase("background") as phase:
+        phase['name'] += " (cached)" if load_background() else " (decoded)"
+
+    profiler.set_hud(args.hud)
+    hints_enabled = args.hints
+    if args.trace:
+        profiler.start_trace(args.trace_frames, args.trace)
+    if args.replay:
+        try:
+            replay_viewer(args.replay, args.speed)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f"ludo: cannot replay {args.replay}: {e}\n")
+    if args.connect:
+        try:
+            connect_network(args.connect, args.room, args.name, args.seats)
+        except OSError as e:
+            parser.exit(1, f"ludo: cannot connect to {args.connect}: {e}\n")
+        network_lobby()
+    elif not setup_screen():
+        initialize_tokens()
+    main_game()
@@ -0,0 +1,48 @@
+import random
+import time
+
+from ludo import ai, engine
+
+# Scheduling noise on a loaded machine; the search itself stops within a
+# fraction of a millisecond of its deadline
+TOLERANCE = 0.01
+
+
+def searched_positions(count, num_players=4, seed=0):
+    # Positions with a roll that leaves more than one distinct move, so the search runs
+    rng = random.Random(seed)
+    found = []
+    while len(found) < count:
+        state = ai.random_positions(rng, 1, num_players)[0]
+        for dice_roll in range(1, 7):
+            if len(ai.distinct_moves(state, state.current_player, dice_roll)) > 1:
+                found.append((state, dice_roll))
+                break
+    return found
+
+
+def test_search_stays_within_budget():
+    searcher = ai.Searcher(budget=ai.DEFAULT_BUDGET)
+    for state, dice_roll in searched_positions(3):
+        start = time.perf_counter()
+        result = searcher.choose(state, state.current_player, dice_roll)
+        elapsed = time.perf_counter() - start
+        assert result.token in engine.movable_tokens(state, state.current_player, dice_roll)
+        assert elapsed <= ai.DEFAULT_BUDGET + TOLERANCE
+
+
+def test_search_completes_fixed_depth():
+    searcher = ai.Searcher(budget=None, max_depth=1)
+    for state, dice_roll in searched_positions(3):
+        result = searcher.choose(state, state.current_player, dice_roll)
+        assert result.depth == 1
+        assert result.token in ai.distinct_moves(state, state.current_player, dice_roll)
+
+
+def test_search_leaves_state_unchanged():
+    for state, dice_roll in searched_positions(3, seed=1):
+        before = state.copy()
+        result = ai.Searcher(budget=None, max_depth=2).choose(state, state.current_player, dice_roll)
+        assert result.token in engine.movable_tokens(state, state.current_player, dice_roll)
+        assert state.path_indices == before.path_indices
+        assert state.current_player == before.current_player
@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+from ludo import analysis, engine
+
+ROLLOUTS = 64
+
+
+def poll_until_complete(analyst, timeout=30):
+    deadline = time.monotonic() + timeout
+    estimate = None
+    while estimate is None or not estimate.complete:
+        assert time.monotonic() < deadline, "analysis never completed"
+        time.sleep(0.01)
+        estimate = analyst.poll() or estimate
+    return estimate
+
+
+def failing_first_chunk(state, dice_roll, token_id, count, seed, policy=analysis.DEFAULT_POLICY):
+    # The first chunk of every analysis raises; the rest run normally
+    if seed.endswith(':0'):
+        raise ValueError("rollout failed")
+    return run_rollouts(state, dice_roll, token_id, count, seed, policy)
+
+
+run_rollouts = analysis.run_rollouts
+
+
+def test_failed_chunk_is_run_again(monkeypatch):
+    monkeypatch.setattr(analysis, 'run_rollouts', failing_first_chunk)
+    analyst = analysis.Analyst(workers=2, max_rollouts=ROLLOUTS, processes=False)
+    try:
+        analyst.analyse(engine.new_game(2))
+        estimate = poll_until_complete(analyst)
+    finally:
+        analyst.close()
+    assert estimate.rollouts == ROLLOUTS
+    assert abs(sum(estimate.win_rates) - 1.0) < 1e-9
+
+
+def dying_worker(state, dice_roll, token_id, count, seed, policy=analysis.DEFAULT_POLICY):
+    # The worker process running the first chunk exits without a result
+    if seed.endswith(':0'):
+        os._exit(1)
+    return run_rollouts(state, dice_roll, token_id, count, seed, policy)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason="workers must inherit the patch")
+def test_dead_worker_restarts_pool(monkeypatch):
+    monkeypatch.setattr(analysis, 'run_rollouts', dying_worker)
+    analyst = analysis.Analyst(workers=1, max_rollouts=ROLLOUTS)
+    try:
+        analyst.analyse(engine.new_game(2))
+        broken_pool = analyst._pool
+        estimate = poll_until_complete(analyst)
+        assert analyst._pool is not broken_pool
+    finally:
+        analyst.close()
+    assert estimate.rollouts == ROLLOUTS
+
+
+def always_failing(state, dice_roll, token_id, count, seed, policy=analysis.DEFAULT_POLICY):
+    raise ValueError("rollout failed")
+
+
+def test_failing_chunks_are_given_up(monkeypatch):
+    monkeypatch.setattr(analysis, 'run_rollouts', always_failing)
+    analyst = analysis.Analyst(workers=1, max_rollouts=ROLLOUTS, processes=False)
+    try:
+        analyst.analyse(engine.new_game(2))
+        deadline = time.monotonic() + 30
+        while analyst.busy:
+            assert time.monotonic() < deadline, "failing chunks were run forever"
+            time.sleep(0.01)
+            analyst.poll()
+    finally:
+        analyst.close()
+    assert analyst.estimate is None
@@ -0,0 +1,74 @@
+import pickle
+
+import pytest
+
+from ludo import board
+from ludo.board import CLASSIC, make_board
+
+
+def baseline_paths():
+    # create_paths() of the original main.py
+    green = [(i, 6) for i in range(1, 6)]
+    green += [(6, 5)] + [(6, i) for i in range(4, -1, -1)]
+    green += [(7, 0), (8, 0)]
+    green += [(8, i) for i in range(1, 6)] + [(9, 6)]
+    green += [(i, 6) for i in range(10, 15)]
+    green += [(14, 7), (14, 8)]
+    green += [(i, 8) for i in range(13, 8, -1)] + [(8, 9)]
+    green += [(8, i) for i in range(10, 15)]
+    green += [(7, 14), (6, 14)]
+    green += [(6, i) for i in range(13, 8, -1)] + [(5, 8)]
+    green += [(i, 8) for i in range(4, -1, -1)]
+    green += [(0, 7), (0, 6)]
+    green += [(i, 7) for i in range(1, 7)]
+    return [
+        green,
+        [(14 - y, x) for x, y in green],
+        [(y, 14 - x) for x, y in green],
+        [(14 - x, 14 - y) for x, y in green],
+    ]
+
+
+BASELINE_HOME_POS = [
+    [(1, 1), (1, 3), (3, 1), (3, 3)],
+    [(10, 1), (10, 3), (12, 1), (12, 3)],
+    [(1, 10), (1, 12), (3, 10), (3, 12)],
+    [(10, 10), (10, 12), (12, 10), (12, 12)],
+]
+
+BASELINE_SAFE_TILES = {(1, 6), (8, 1), (13, 8), (6, 13), (6, 1), (8, 13), (13, 6), (1, 8)}
+
+
+def test_classic_board_is_shared():
+    assert make_board(6, 4, 4) is CLASSIC
+    assert make_board() is CLASSIC
+    assert pickle.loads(pickle.dumps(CLASSIC)) is CLASSIC
+
+
+def test_classic_board_matches_baseline():
+    assert [list(path) for path in CLASSIC.full_paths] == baseline_paths()
+    assert CLASSIC.path_length == board.PATH_LENGTH == len(baseline_paths()[0])
+    assert CLASSIC.safe_tiles == BASELINE_SAFE_TILES
+    assert [list(slots) for slots in CLASSIC.home_slots] == BASELINE_HOME_POS
+    assert CLASSIC.size == 15
+    assert CLASSIC.max_players == 4
+
+
+@pytest.mark.parametrize('arm_length,arms,tokens', [(6, 3, 4), (7, 4, 4), (6, 6, 3), (8, 5, 2)])
+def test_other_boards_are_consistent(arm_length, arms, tokens):
+    variant = make_board(arm_length, arms, tokens)
+    assert variant.max_players == arms
+    assert all(len(path) == variant.path_length for path in variant.full_paths)
+    assert all(len(slots) == tokens for slots in variant.home_slots)
+    # Every square has one id, and the ids map back to the squares
+    for path in variant.full_paths:
+        assert len(set(path)) == len(path)
+        for pos in path:
+            assert variant.square_coords(variant.square_id(*pos)) == pos
+    assert variant.safe_tiles <= {pos for path in variant.full_paths for pos in path}
+
+
+@pytest.mark.parametrize('arm_length,arms,tokens', [(6, 1, 4), (2, 4, 4), (6, 4, 0)])
+def test_bad_specs_are_rejected(arm_length, arms, tokens):
+    with pytest.raises(ValueError):
+        make_board(arm_length, arms, tokens)
@@ -0,0 +1,137 @@
+import random
+
+import pytest
+
+from ludo import engine
+from ludo.board import CLASSIC, FULL_PATHS, PATH_LENGTH, SAFE_TILES
+
+
+class BaselineRules:
+    """The move rules of the original main.py, on token_path_indices and token_is_home.
+
+    Finished tokens went back to -1 with token_is_home set, and a player won
+    once every token had finished.
+    """
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.indices = [[-1] * 4 for _ in range(num_players)]
+        self.is_home = [[True] * 4 for _ in range(num_players)]
+        self.finished = [[False] * 4 for _ in range(num_players)]
+
+    def can_move(self, player_id, token_id, steps):
+        if self.finished[player_id][token_id]:
+            return False
+        if self.is_home[player_id][token_id]:
+            return steps == 6
+        return self.indices[player_id][token_id] + steps <= PATH_LENGTH
+
+    def move(self, player_id, token_id, steps):
+        if self.is_home[player_id][token_id]:
+            self.is_home[player_id][token_id] = False
+            self.indices[player_id][token_id] = 0
+            return
+        new_index = self.indices[player_id][token_id] + steps
+        if new_index == PATH_LENGTH:
+            self.is_home[player_id][token_id] = True
+            self.finished[player_id][token_id] = True
+            self.indices[player_id][token_id] = -1
+            return
+        self.indices[player_id][token_id] = new_index
+        square = FULL_PATHS[player_id][new_index]
+        if square in SAFE_TILES:
+            return
+        for opp_id in range(self.num_players):
+            if opp_id == player_id:
+                continue
+            for opp_token in range(4):
+                opp_index = self.indices[opp_id][opp_token]
+                if not self.is_home[opp_id][opp_token] and FULL_PATHS[opp_id][opp_index] == square:
+                    self.is_home[opp_id][opp_token] = True
+                    self.indices[opp_id][opp_token] = -1
+
+    def engine_indices(self):
+        # The engine keeps finished tokens at FINISHED instead of -1
+        return [[engine.FINISHED if done else index for index, done in zip(indices, finished)]
+                for indices, finished in zip(self.indices, self.finished)]
+
+
+@pytest.mark.parametrize('num_players,seed', [(2, 0), (3, 1), (4, 2), (4, 3)])
+def test_engine_matches_baseline_rules(num_players, seed):
+    rng = random.Random(seed)
+    state = engine.new_game(num_players)
+    baseline = BaselineRules(num_players)
+    current = 0
+    for _ in range(3000):
+        if state.winner is not None:
+            break
+        dice_roll = rng.randint(1, 6)
+        movable = engine.movable_tokens(state, current, dice_roll)
+        assert list(movable) == [token_id for token_id in range(4) if baseline.can_move(current, token_id, dice_roll)]
+        if movable:
+            token_id = rng.choice(movable)
+            engine.apply_move(state, current, token_id, dice_roll)
+            baseline.move(current, token_id, dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+        if dice_roll != 6:
+            current = (current + 1) % num_players
+        assert state.path_indices == baseline.engine_indices()
+        assert state.is_home == baseline.is_home
+        assert state.current_player == current
+    assert state.winner is not None
+    assert all(baseline.finished[state.winner])
+
+
+def test_six_enters_and_keeps_the_turn():
+    state = engine.new_game(2)
+    assert engine.movable_tokens(state, 0, 5) == ()
+    events = engine.apply_move(state, 0, 2, 6)
+    assert events == [engine.TokenEntered(0, 2)]
+    assert state.path_indices[0][2] == 0
+    assert state.current_player == 0
+    engine.apply_move(state, 0, 2, 3)
+    assert state.current_player == 1
+
+
+def test_capture_sends_victim_to_yard():
+    state = engine.new_game(2)
+    # Player 1's token two squares ahead of player 0's, off the safe squares
+    square = CLASSIC.full_paths[0][10]
+    victim_index = CLASSIC.full_paths[1].index(square)
+    state.place(0, 0, 8)
+    state.place(1, 3, victim_index)
+    events = engine.apply_move(state, 0, 0, 2)
+    assert engine.TokenCaptured(0, 1, 3, square) in events
+    assert state.path_indices[1][3] == engine.IN_YARD
+    assert state.occupants(CLASSIC.path_squares[0][10]) == [(0, 0)]
+
+
+def test_no_capture_on_safe_square():
+    state = engine.new_game(2)
+    index = next(i for i, square in enumerate(CLASSIC.full_paths[0]) if i > 2 and square in SAFE_TILES)
+    state.place(0, 0, index - 2)
+    state.place(1, 0, CLASSIC.full_paths[1].index(CLASSIC.full_paths[0][index]))
+    events = engine.apply_move(state, 0, 0, 2)
+    assert not any(isinstance(event, engine.TokenCaptured) for event in events)
+    assert state.path_indices[1][0] != engine.IN_YARD
+
+
+def test_exact_roll_finishes_and_wins():
+    state = engine.new_game(2, CLASSIC)
+    for token_id in range(3):
+        state.place(0, token_id, engine.FINISHED)
+    state.place(0, 3, engine.FINISHED - 4)
+    assert engine.movable_tokens(state, 0, 5) == ()
+    with pytest.raises(engine.IllegalMoveError):
+        engine.apply_move(state, 0, 3, 5)
+    events = engine.apply_move(state, 0, 3, 4)
+    assert events[-2:] == [engine.TokenHome(0, 3), engine.PlayerWon(0)]
+    assert state.winner == 0
+    assert state.is_home[0] == [True] * 4
+
+
+def test_move_out_of_turn_is_illegal():
+    state = engine.new_game(2)
+    with pytest.raises(engine.IllegalMoveError):
+        engine.apply_move(state, 1, 0, 6)
@@ -0,0 +1,69 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from ludo import engine, events
+
+
+def test_close_writes_everything(tmp_path):
+    log = events.EventLog(tmp_path, flush_seconds=60)
+    game = events.GameEvents(log, 'game')
+    state = engine.new_game(2)
+    game.start(state)
+    game.turn(0, 3, engine.pass_turn(state, 3))
+    log.close()
+    (path,) = log.files
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert [line['type'] for line in lines] == ['start', 'roll', 'pass']
+    assert [line['seq'] for line in lines] == [0, 1, 2]
+    assert not any(name.endswith('.part') for name in os.listdir(tmp_path))
+
+
+def test_emit_after_close_raises(tmp_path):
+    log = events.EventLog(tmp_path)
+    log.close()
+    with pytest.raises(ValueError):
+        log.emit({'type': 'late'})
+    with pytest.raises(ValueError):
+        events.GameEvents(log).roll(0, 6)
+
+
+def test_failed_write_drops_instead_of_raising(tmp_path):
+    log = events.EventLog(tmp_path, flush_records=1)
+    # Not JSON: formatting it fails on the writer thread
+    log.emit({'type': 'bad', 'value': object()})
+    deadline = time.monotonic() + 10
+    while not log.dropped:
+        assert time.monotonic() < deadline, "the failure was never counted"
+        time.sleep(0.01)
+    game = events.GameEvents(log, 'game')
+    game.start(engine.new_game(2))
+    game.roll(0, 6)
+    log.close()
+    assert log.dropped == 3
+    assert log.written == 0
+
+
+def test_emits_racing_close_are_written(tmp_path):
+    log = events.EventLog(tmp_path, flush_records=64, flush_seconds=0.001)
+    accepted = 0
+
+    def emit_until_closed():
+        nonlocal accepted
+        while True:
+            try:
+                log.emit({'type': 'tick', 'n': accepted})
+            except ValueError:
+                return
+            accepted += 1
+
+    emitter = threading.Thread(target=emit_until_closed)
+    emitter.start()
+    time.sleep(0.05)
+    log.close()
+    emitter.join()
+    assert accepted and log.written == accepted
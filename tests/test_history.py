@@ -0,0 +1,125 @@
+import random
+
+import pytest
+
+from ludo import engine
+from ludo.history import History
+from ludo.packed import pack
+from ludo.persistence import MOVE, PASS
+
+
+def play(state, game, rng, moves):
+    # Random moves recorded in game; returns the position after each one
+    positions = []
+    for _ in range(moves):
+        if state.winner is not None:
+            break
+        player_id, dice_roll = state.current_player, rng.randint(1, 6)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if movable:
+            token_id = rng.choice(movable)
+            engine.apply_move(state, player_id, token_id, dice_roll)
+            game.record(state, MOVE, player_id, token_id, dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+            game.record(state, PASS, player_id, 0, dice_roll)
+        positions.append(state.copy())
+    return positions
+
+
+def test_undo_and_redo_round_trip():
+    state = engine.new_game(4)
+    start = state.copy()
+    game = History(state)
+    positions = play(state, game, random.Random(0), 120)
+    assert not game.can_redo()
+    for position in reversed(positions[:-1]):
+        assert game.undo(state) is not None
+        assert state == position
+        assert state.is_home == position.is_home
+    assert game.undo(state) is not None
+    assert state == start
+    assert not game.can_undo()
+    assert game.undo(state) is None
+    for position in positions:
+        assert game.redo(state) is not None
+        assert state == position
+    assert game.redo(state) is None
+    assert game.size == len(positions) + 1
+
+
+def test_new_move_after_undo_starts_a_branch():
+    state = engine.new_game(2)
+    game = History(state)
+    play(state, game, random.Random(1), 30)
+    old_line = game.line()
+    for _ in range(10):
+        game.undo(state)
+    fork = game.node
+    old_branch = game.branches()[0]
+    # Play until a move differs from the undone one
+    rng = random.Random(2)
+    while game.node is fork or game.node.move == old_branch:
+        if game.node is not fork:
+            game.undo(state)
+        play(state, game, rng, 1)
+    assert game.node.parent is fork
+    assert len(fork.children) == 2
+    new_line = game.line()
+    assert new_line[:-1] == old_line[:len(new_line) - 1]
+    assert new_line[-1] != old_line[len(new_line) - 1]
+
+    # Redo follows the branch last played, select_branch() picks the old one
+    game.undo(state)
+    assert game.branches() == [old_branch, new_line[-1]]
+    game.redo(state)
+    assert game.line() == new_line
+    game.undo(state)
+    game.select_branch(0)
+    while game.redo(state) is not None:
+        pass
+    assert game.line() == old_line
+    with pytest.raises(IndexError):
+        game.select_branch(2)
+
+
+def test_recording_a_known_move_follows_it():
+    state = engine.new_game(2)
+    game = History(state)
+    play(state, game, random.Random(3), 5)
+    size, node = game.size, game.node
+    game.undo(state)
+    kind, player_id, token_id, dice_roll = node.move
+    if kind == MOVE:
+        engine.apply_move(state, player_id, token_id, dice_roll)
+    else:
+        engine.pass_turn(state, dice_roll)
+    assert game.record(state, kind, player_id, token_id, dice_roll) is node
+    assert game.size == size
+
+
+def test_goto_any_node():
+    state = engine.new_game(3)
+    game = History(state)
+    rng = random.Random(4)
+    for _ in range(20):
+        play(state, game, rng, rng.randint(1, 15))
+        for _ in range(rng.randint(0, 10)):
+            game.undo(state)
+    nodes = []
+    pending = [game.root]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.children or ())
+    rng.shuffle(nodes)
+    for node in nodes:
+        game.goto(node, state)
+        assert pack(state) == node.key
+        assert len(game.line()) == node.depth
+    # Redo from the root now leads to the last node visited
+    target = game.node
+    game.goto(game.root, state)
+    for _ in range(target.depth):
+        game.redo(state)
+    assert game.node is target
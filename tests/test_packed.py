@@ -0,0 +1,36 @@
+import random
+
+from ludo import ai, engine, packed
+
+
+def test_unpack_into_reuses_state():
+    states = ai.random_positions(random.Random(2), 50)
+    target = engine.new_game(4)
+    for state in states:
+        key = packed.pack(state)
+        assert packed.unpack(key, into=target) is target
+        assert target == state
+        fresh = packed.unpack(key)
+        assert target.occupancy.keys() == fresh.occupancy.keys()
+        assert target.is_home == fresh.is_home
+
+
+def test_restore_from_current_key():
+    rng = random.Random(3)
+    state = engine.new_game(4)
+    packing = packed.packing_for(state.board)
+    keys = []
+    while state.winner is None and len(keys) < 300:
+        dice_roll = rng.randint(1, 6)
+        movable = engine.movable_tokens(state, state.current_player, dice_roll)
+        if movable:
+            engine.apply_move(state, state.current_player, rng.choice(movable), dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+        keys.append(packed.pack(state))
+    current = keys[-1]
+    for key in reversed(keys):
+        packing.restore(state, key, current)
+        assert packed.pack(state) == key
+        assert state == packed.unpack(key)
+        current = key
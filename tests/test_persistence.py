@@ -0,0 +1,133 @@
+import json
+import random
+
+import pytest
+
+from ludo import engine, persistence
+from ludo.persistence import MOVE, PASS, SaveFormatError
+
+PLAYERS = [{'name': 'ifra', 'color': (0, 180, 0)}, {'name': 'abdi', 'color': (255, 215, 0), 'bot': True}]
+
+
+def played_game(moves, seed=0):
+    # A two-player game after some random moves, with its journal records
+    rng = random.Random(seed)
+    state = engine.new_game(2)
+    records = []
+    for _ in range(moves):
+        player_id, dice_roll = state.current_player, rng.randint(1, 6)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if movable:
+            token_id = rng.choice(movable)
+            engine.apply_move(state, player_id, token_id, dice_roll)
+            records.append((MOVE, player_id, token_id, dice_roll))
+        else:
+            engine.pass_turn(state, dice_roll)
+            records.append((PASS, player_id, 0, dice_roll))
+        if state.winner is not None:
+            break
+    return state, records
+
+
+def test_snapshot_round_trip():
+    state, _ = played_game(80)
+    decoded, players, generation = persistence.decode_snapshot(persistence.encode_snapshot(state, PLAYERS, 7))
+    assert decoded == state
+    assert decoded.is_home == state.is_home
+    assert players == PLAYERS
+    assert generation == 7
+
+
+def test_resume_replays_journal(tmp_path):
+    start, _ = played_game(30)
+    state = start.copy()
+    store = persistence.SaveStore(str(tmp_path))
+    store.start(state, PLAYERS)
+    rng = random.Random(1)
+    for _ in range(40):
+        player_id, dice_roll = state.current_player, rng.randint(1, 6)
+        store.record_roll(player_id, dice_roll)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if movable:
+            engine.apply_move(state, player_id, movable[0], dice_roll)
+            store.record_move(player_id, movable[0], dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+            store.record_pass(player_id, dice_roll)
+        if state.winner is not None:
+            break
+    store.record_roll(state.current_player, 4)
+    store.close()
+
+    resumed = persistence.SaveStore(str(tmp_path))
+    loaded, players, pending = resumed.resume()
+    resumed.close()
+    assert loaded == state
+    assert players == PLAYERS
+    assert pending == 4
+
+
+def test_torn_journal_record_is_dropped(tmp_path):
+    state = engine.new_game(2)
+    store = persistence.SaveStore(str(tmp_path))
+    store.start(state, PLAYERS)
+    store.record_move(0, 1, 6)
+    store.close()
+    with open(store.journal_path, 'ab') as f:
+        f.write(b'\x02\x00')
+    engine.apply_move(state, 0, 1, 6)
+    loaded, _, pending = persistence.SaveStore(str(tmp_path)).resume()
+    assert loaded == state
+    assert pending is None
+
+
+def corrupted(data, offset, value):
+    data = bytearray(data)
+    data[offset] = value
+    return bytes(data)
+
+
+@pytest.mark.parametrize('field,value', [('current_player', 2), ('winner', 3), ('num_players', 7)])
+def test_corrupt_header_is_rejected(field, value):
+    data = persistence.encode_snapshot(engine.new_game(2), PLAYERS)
+    offset = {'num_players': 5, 'current_player': 6, 'winner': 7}[field]
+    with pytest.raises(SaveFormatError):
+        persistence.decode_snapshot(corrupted(data, offset, value))
+
+
+def test_corrupt_path_index_is_rejected():
+    data = persistence.encode_snapshot(engine.new_game(2), PLAYERS)
+    with pytest.raises(SaveFormatError):
+        persistence.decode_snapshot(corrupted(data, len(data) - 1, engine.FINISHED + 1))
+
+
+def write_legacy(tmp_path, indices, is_home, current_player=1):
+    path = tmp_path / 'ludo_save.json'
+    path.write_text(json.dumps({
+        'num_players': 2,
+        'players': [{'name': player['name'], 'color': list(player['color'])} for player in PLAYERS],
+        'current_player_idx': current_player,
+        'token_positions': [[[0, 0]] * 4] * 2,
+        'token_path_indices': indices,
+        'token_is_home': is_home,
+    }))
+    return str(path)
+
+
+def test_legacy_json_import(tmp_path):
+    path = write_legacy(tmp_path, [[-1, 5, -1, 51], [-1, -1, -1, -1]],
+                        [[True, False, True, True], [True, True, True, True]])
+    state, players = persistence.load_legacy_json(path)
+    assert state.path_indices == [[engine.IN_YARD, 5, engine.IN_YARD, engine.FINISHED], [engine.IN_YARD] * 4]
+    assert state.current_player == 1
+    assert [player['name'] for player in players] == ['ifra', 'abdi']
+
+
+@pytest.mark.parametrize('indices,is_home,current_player', [
+    ([[-1, 99, -1, -1], [-1] * 4], [[True, False, True, True], [True] * 4], 0),
+    ([[-1, -1, -1, -1], [-1] * 4], [[False, True, True, True], [True] * 4], 0),
+    ([[-1] * 4, [-1] * 4], [[True] * 4, [True] * 4], 2),
+])
+def test_corrupt_legacy_json_is_rejected(tmp_path, indices, is_home, current_player):
+    with pytest.raises(SaveFormatError):
+        persistence.load_legacy_json(write_legacy(tmp_path, indices, is_home, current_player))
@@ -0,0 +1,90 @@
+import random
+
+import pytest
+
+from ludo import engine, replay
+from ludo.persistence import SaveFormatError
+
+PLAYERS = [{'name': name, 'color': (i, i, i)} for i, name in enumerate(('ifra', 'abdi', 'sam'))]
+
+
+def record_game(path, moves, seed=0):
+    # Plays a three-player game into a recording; returns the position after every move
+    rng = random.Random(seed)
+    state = engine.new_game(3)
+    recorder = replay.Recorder(path, state, PLAYERS, seed=seed)
+    positions = [state.copy()]
+    while recorder.moves < moves and state.winner is None:
+        player_id, dice_roll = state.current_player, rng.randint(1, 6)
+        movable = engine.movable_tokens(state, player_id, dice_roll)
+        if movable:
+            token_id = rng.choice(movable)
+            engine.apply_move(state, player_id, token_id, dice_roll)
+            recorder.record_move(player_id, token_id, dice_roll)
+        else:
+            engine.pass_turn(state, dice_roll)
+            recorder.record_pass(player_id, dice_roll)
+        positions.append(state.copy())
+    recorder.close()
+    return positions
+
+
+def test_recording_round_trip(tmp_path):
+    path = str(tmp_path / ('game' + replay.RECORDING_SUFFIX))
+    positions = record_game(path, 50, seed=3)
+    recording = replay.read_recording(path)
+    assert recording.seed == 3
+    assert recording.players == PLAYERS
+    assert recording.state == positions[0]
+    assert len(recording.records) == len(positions) - 1
+
+
+def test_seek_matches_stepping(tmp_path):
+    path = str(tmp_path / ('game' + replay.RECORDING_SUFFIX))
+    positions = record_game(path, 5 * replay.KEYFRAME_INTERVAL + 10)
+    game = replay.Replay(replay.read_recording(path))
+    assert len(game) == len(positions) - 1
+    assert len(game) > 2 * replay.KEYFRAME_INTERVAL
+    assert len(game.keyframes) == len(game) // replay.KEYFRAME_INTERVAL + 1
+    for position in range(len(positions)):
+        assert game.state == positions[position]
+        game.step()
+    # Backwards, forwards and across keyframes, in random order
+    targets = list(range(len(positions)))
+    random.Random(1).shuffle(targets)
+    for position in targets + [0, replay.KEYFRAME_INTERVAL, replay.KEYFRAME_INTERVAL - 1, len(positions) - 1]:
+        game.seek(position)
+        assert game.position == position
+        assert game.state == positions[position]
+        assert game.state.is_home == positions[position].is_home
+
+
+def test_seek_clamps_to_the_recording(tmp_path):
+    path = str(tmp_path / ('game' + replay.RECORDING_SUFFIX))
+    positions = record_game(path, 20)
+    game = replay.Replay(replay.read_recording(path))
+    game.seek(len(game) + 100)
+    assert game.state == positions[-1]
+    assert game.step() == []
+    game.seek(-5)
+    assert game.position == 0
+    assert game.last_dice() is None
+
+
+def test_torn_record_is_ignored(tmp_path):
+    path = str(tmp_path / ('game' + replay.RECORDING_SUFFIX))
+    positions = record_game(path, 20)
+    with open(path, 'ab') as f:
+        f.write(b'\x02\x01')
+    recording = replay.read_recording(path)
+    assert len(recording.records) == len(positions) - 1
+
+
+def test_move_that_does_not_fit_is_rejected(tmp_path):
+    path = str(tmp_path / ('game' + replay.RECORDING_SUFFIX))
+    recorder = replay.Recorder(path, engine.new_game(2), PLAYERS[:2])
+    # No token can leave the yard on a 3
+    recorder.record_move(0, 0, 3)
+    recorder.close()
+    with pytest.raises(SaveFormatError):
+        replay.Replay(replay.read_recording(path))
@@ -0,0 +1,42 @@
+import pytest
+
+from ludo import engine
+from ludo.dice import GameDice
+from ludo.server import ProtocolError, Room
+
+
+class FakeConnection:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data):
+        self.sent.append(data)
+
+
+def rolled_room():
+    # A started two-seat room where the player to move has a roll to use
+    room = Room('test', 2, GameDice(0))
+    for name in ('a', 'b'):
+        room.join(FakeConnection(), name)
+    while room.dice is None:
+        room.roll(room.state.current_player)
+    return room
+
+
+@pytest.mark.parametrize('token', [True, False, 1.0, '1', None, -1, 4])
+def test_move_rejects_bad_token(token):
+    room = rolled_room()
+    seat = room.state.current_player
+    before = [list(indices) for indices in room.state.path_indices]
+    with pytest.raises(ProtocolError):
+        room.move(seat, token)
+    assert room.state.path_indices == before
+    assert room.dice is not None
+
+
+def test_move_accepts_movable_token():
+    room = rolled_room()
+    seat = room.state.current_player
+    token = engine.movable_tokens(room.state, seat, room.dice)[0]
+    room.move(seat, token)
+    assert room.dice is None